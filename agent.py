@@ -13,13 +13,28 @@ from .sub_agents.creative.agent import agent as creative_agent
 
 # Shared Tools
 from .tools.visualization import plot_and_save_artifacts
+from .tools.specialists import build_run_specialists
+from .tools.tracing import instrument_agent
+from .tools.coalescing import coalesce_request, finish_flight
+from .router import route_orchestrator
 from .prompts import ORCHESTRATOR_INSTRUCTION
 
 load_dotenv()
 
+# Agent, model and tool spans for every agent (exported to JSONL and /metrics)
+for _agent in (data_agent, research_agent, performance_agent, creative_agent):
+    instrument_agent(_agent)
+
 # Wrap function tool
 plot_tool = FunctionTool(plot_and_save_artifacts)
 
+# Specialists run concurrently in a single tool call
+specialists_tool = FunctionTool(build_run_specialists({
+    "performance": performance_agent,
+    "creative": creative_agent,
+    "research": research_agent,
+}))
+
 # Build Root Agent
 agent_kwargs = dict(
     name="orchestrator_agent",
@@ -27,11 +42,14 @@ agent_kwargs = dict(
     description="Control-plane orchestrator for תמי4 marketing system",
     tools=[
         AgentTool(agent=data_agent),
-        AgentTool(agent=research_agent),
-        AgentTool(agent=performance_agent),
-        AgentTool(agent=creative_agent),
+        specialists_tool,
         plot_tool,
     ],
+    # Identical concurrent questions share one pipeline run
+    before_agent_callback=coalesce_request,
+    after_agent_callback=finish_flight,
+    # Known request types are planned locally; the model writes the final answer
+    before_model_callback=route_orchestrator,
 )
 
 # Handle ADK version differences for 'instruction' param
@@ -41,4 +59,4 @@ if "instructions" in sig.parameters:
 else:
     agent_kwargs["instruction"] = ORCHESTRATOR_INSTRUCTION
 
-root_agent = LlmAgent(**agent_kwargs)
+root_agent = instrument_agent(LlmAgent(**agent_kwargs))
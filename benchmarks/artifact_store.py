@@ -0,0 +1,62 @@
+"""
+Memory held by the artifact service under sustained chart traffic:
+InMemoryArtifactService (ADK default) vs LocalArtifactService (tools/artifact_store.py).
+
+Each simulated request saves a few PNG-sized charts into its own session, some of
+them re-saved as new versions. Reports Python heap in use (tracemalloc) and bytes on disk.
+
+    python -m tami4_agent.benchmarks.artifact_store --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+from google.genai import types
+
+from tami4_agent.tools.artifact_store import LocalArtifactService
+
+CHART_BYTES = 80_000
+
+
+async def _traffic(service, requests: int, charts: int) -> float:
+    body = os.urandom(CHART_BYTES)
+    started = time.perf_counter()
+    for i in range(requests):
+        for c in range(charts):
+            # A new bytes object per chart, as rendering produces
+            png = types.Part.from_bytes(data=body + (i * charts + c).to_bytes(4, "big"), mime_type="image/png")
+            await service.save_artifact(app_name="bench", user_id="u", session_id=f"s{i}", filename=f"chart_{c % 2}.png", artifact=png)
+        await service.load_artifact(app_name="bench", user_id="u", session_id=f"s{i}", filename="chart_0.png")
+    return time.perf_counter() - started
+
+
+def _run(name: str, service, requests: int, charts: int) -> None:
+    tracemalloc.start()
+    elapsed = asyncio.run(_traffic(service, requests, charts))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    on_disk = service.total_bytes() if hasattr(service, "total_bytes") else 0
+    print(
+        f"{name:10} {requests * charts / elapsed:8.0f} saves/s  heap={current / 1e6:8.1f} MB  "
+        f"peak={peak / 1e6:8.1f} MB  on_disk={on_disk / 1e6:8.1f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--charts", type=int, default=3, help="Chart saves per request")
+    parser.add_argument("--max-mb", type=int, default=50, help="Global budget of the local store")
+    args = parser.parse_args()
+
+    _run("in_memory", InMemoryArtifactService(), args.requests, args.charts)
+    with tempfile.TemporaryDirectory() as root:
+        _run("local", LocalArtifactService(root_dir=root, max_bytes=args.max_mb * 1024 ** 2), args.requests, args.charts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Burst of near-identical questions (the "morning report" pattern) with and without
+request coalescing (tools/coalescing.py), on the offline stand-ins of benchmarks/fakes.py.
+
+Reports wall time and how many model calls and BigQuery queries the burst cost.
+
+    python -m tami4_agent.benchmarks.coalescing --burst 20 --model-latency-ms 300
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from tami4_agent.agent import root_agent
+from tami4_agent.benchmarks.e2e import APP_NAME, _SpanCollector
+from tami4_agent.benchmarks.fakes import install_fakes
+from tami4_agent.sub_agents.data.cache import query_cache
+from tami4_agent.tools import coalescing, tracing, visualization
+
+VARIANTS = [
+    "ביצועי תמי4 ב-30 הימים האחרונים",
+    "ביצועי תמי 4 ב 30 ימים אחרונים?",
+    "מה ביצועי תמי4 ב-30 הימים האחרונים",
+]
+
+
+async def _burst(runner: InMemoryRunner, burst: int) -> float:
+    async def one(i: int) -> None:
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=f"marketer{i}")
+        message = types.Content(role="user", parts=[types.Part(text=VARIANTS[i % len(VARIANTS)])])
+        async for _ in runner.run_async(user_id=f"marketer{i}", session_id=session.id, new_message=message):
+            pass
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(burst)))
+    return time.perf_counter() - started
+
+
+async def _run(burst: int, enabled: bool) -> None:
+    coalescing.COALESCING_ENABLED = enabled
+    query_cache.clear()
+    visualization._png_cache.clear()
+    collector = _SpanCollector()
+    tracing._exporter = collector
+    wall = await _burst(InMemoryRunner(agent=root_agent, app_name=APP_NAME), burst)
+    kinds = Counter(r["kind"] for r in collector.records)
+    print(f"coalescing={'on ' if enabled else 'off'}  wall={wall:6.2f}s  model_calls={kinds['model']:4}  bigquery={kinds['bigquery']:4}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=20, help="Concurrent near-identical requests")
+    parser.add_argument("--model-latency-ms", type=float, default=300.0)
+    parser.add_argument("--bq-latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    install_fakes(root_agent, model_latency_ms=args.model_latency_ms, bq_latency_ms=args.bq_latency_ms)
+    asyncio.run(_run(args.burst, enabled=False))
+    asyncio.run(_run(args.burst, enabled=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Offline end-to-end benchmark of the orchestrator pipeline.
+
+Replays a corpus of Hebrew marketing requests through root_agent with a scripted
+model and an in-memory SQLite copy of synthetic MARTS tables (benchmarks/fakes.py),
+so it runs on a plain Linux box without network or credentials.
+
+Reports request latency (p50/p95), throughput at the given concurrency and a
+per-stage breakdown taken from the tracing spans (tools/tracing.py).
+
+    python -m tami4_agent.benchmarks.e2e --requests 40 --concurrency 4
+    python -m tami4_agent.benchmarks.e2e --model-latency-ms 800 --bq-latency-ms 300 --cold
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from tami4_agent.agent import root_agent
+from tami4_agent.benchmarks.fakes import install_fakes
+from tami4_agent.sub_agents.data.cache import query_cache
+from tami4_agent.tools import tracing, visualization
+
+APP_NAME = "tami4_bench"
+
+CORPUS = [
+    "מה הביצועים של הקמפיינים ב-30 הימים האחרונים?",
+    "השווה עלות ולידים לפי פלטפורמה בשבוע האחרון",
+    "מי 10 הקריאייטיבים המובילים לפי הוצאה?",
+    "הראה את מגמת השחיקה של 5 המודעות המובילות לאורך זמן ב-60 ימים",
+    "מה ה-CPL לפי מכשיר ב-14 הימים האחרונים?",
+    "תן לי סיכום ביצועים וגם מה המתחרים עושים בשוק מטהרי המים",
+    "כמה הוצאנו על פרסום ב-7 ימים האחרונים?",
+    "איך נראית מגמת ה-CTR היומית?",
+    "דוח לידים ועלות לליד לפי ערוץ ב-90 הימים האחרונים",
+    "אילו טבלאות קיימות ומה הסכמה שלהן?",
+]
+
+
+class _SpanCollector:
+    """Replaces the JSONL exporter so spans are aggregated in memory."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def export(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def _one(runner: InMemoryRunner, question: str, cold: bool) -> Dict[str, Any]:
+    if cold:
+        query_cache.clear()
+        visualization._png_cache.clear()
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id="bench")
+    message = types.Content(role="user", parts=[types.Part(text=question)])
+    started = time.perf_counter()
+    events, error = 0, None
+    try:
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            events += 1
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"question": question, "ms": (time.perf_counter() - started) * 1000, "events": events, "error": error}
+
+
+async def _run(requests: int, concurrency: int, cold: bool) -> Dict[str, Any]:
+    runner = InMemoryRunner(agent=root_agent, app_name=APP_NAME)
+    collector = _SpanCollector()
+    tracing._exporter = collector
+
+    # Warm up imports, font caches and the SQLite engine outside the measurement
+    for question in CORPUS:
+        await _one(runner, question, cold=True)
+    collector.records.clear()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(i: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await _one(runner, CORPUS[i % len(CORPUS)], cold)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_bounded(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies = [r["ms"] for r in results if r["error"] is None]
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for record in collector.records:
+        stages[f"{record['kind']}:{record['name']}"].append(record["duration_ms"])
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": [r for r in results if r["error"]][:3],
+        "error_count": sum(1 for r in results if r["error"]),
+        "wall_s": round(wall, 3),
+        "rps": round(requests / wall, 2) if wall else None,
+        "p50_ms": round(_pct(latencies, 0.5), 1),
+        "p95_ms": round(_pct(latencies, 0.95), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else None,
+        "stages": {
+            name: {
+                "count": len(values),
+                "per_request": round(len(values) / requests, 2),
+                "p50_ms": round(_pct(values, 0.5), 2),
+                "p95_ms": round(_pct(values, 0.95), 2),
+                "total_ms_per_request": round(sum(values) / requests, 2),
+            }
+            for name, values in sorted(stages.items(), key=lambda kv: -sum(kv[1]))
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated latency per model call")
+    parser.add_argument("--bq-latency-ms", type=float, default=0.0, help="Simulated latency per BigQuery query")
+    parser.add_argument("--days", type=int, default=180, help="Days of synthetic mart data")
+    parser.add_argument("--cold", action="store_true", help="Clear the query and chart caches before every request")
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    install_fakes(root_agent, model_latency_ms=args.model_latency_ms, bq_latency_ms=args.bq_latency_ms, days=args.days)
+    report = asyncio.run(_run(args.requests, args.concurrency, args.cold))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"requests={report['requests']} concurrency={report['concurrency']} errors={report['error_count']}")
+    print(f"p50={report['p50_ms']:.1f} ms  p95={report['p95_ms']:.1f} ms  throughput={report['rps']} req/s")
+    for error in report["errors"]:
+        print(f"  error: {error['question']!r}: {error['error']}")
+    print(f"\n{'stage':48} {'n/req':>6} {'p50 ms':>9} {'p95 ms':>9} {'ms/req':>9}")
+    for name, s in report["stages"].items():
+        print(f"{name:48} {s['per_request']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['total_ms_per_request']:>9}")
+
+
+if __name__ == "__main__":
+    main()
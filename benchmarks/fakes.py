@@ -0,0 +1,434 @@
+"""
+Offline stand-ins for Vertex and BigQuery used by the end-to-end benchmarks.
+
+- ScriptedLlm: a BaseLlm that plays each agent's role deterministically
+  (function calls in the order the orchestrator prompt prescribes, canned JSON
+  from the specialists), with an optional simulated model latency.
+- FakeBigQueryClient: answers the templated and scripted queries from an
+  in-memory SQLite copy of synthetic MARTS tables.
+
+install_fakes(root_agent) wires both into the agent tree in place.
+"""
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.function_tool import FunctionTool
+from google.genai import types
+
+PLATFORMS = ["facebook", "google", "tiktok", "taboola"]
+
+
+# --- Synthetic MARTS ---------------------------------------------------------
+
+def build_marts(days: int = 180, creatives: int = 40, seed: int = 7, today: Optional[date] = None) -> sqlite3.Connection:
+    """SQLite database with synthetic mart_platforms_performance / mart_facebook_creatives."""
+    rng = random.Random(seed)
+    today = today or datetime.now(timezone.utc).date()
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE mart_platforms_performance (date TEXT, platform TEXT, campaign_name TEXT, "
+        "cost REAL, impressions INTEGER, clicks INTEGER, leads INTEGER, purchases INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE mart_facebook_creatives (date TEXT, ad_name TEXT, ad_url TEXT, description TEXT, "
+        "cost REAL, impressions INTEGER, reach INTEGER, clicks INTEGER, leads INTEGER)"
+    )
+
+    perf, creative_rows = [], []
+    for offset in range(days, 0, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        for i, platform in enumerate(PLATFORMS):
+            for campaign in ("brand", "performance"):
+                impressions = rng.randint(20_000, 120_000) // (i + 1)
+                clicks = int(impressions * rng.uniform(0.005, 0.03))
+                leads = int(clicks * rng.uniform(0.02, 0.1))
+                perf.append((
+                    day, platform, f"tami4_{platform}_{campaign}", round(impressions * rng.uniform(0.01, 0.04), 2),
+                    impressions, clicks, leads, int(leads * rng.uniform(0.05, 0.3)),
+                ))
+        for n in range(creatives):
+            # Older creatives fatigue: their CTR decays with age
+            age = days - offset + n
+            impressions = rng.randint(2_000, 20_000)
+            clicks = int(impressions * max(0.002, 0.025 - 0.0001 * age) * rng.uniform(0.8, 1.2))
+            creative_rows.append((
+                day, f"ad_{n:03d}", f"https://example.com/ads/{n:03d}", f"מודעת תמי4 מספר {n} - בר מים חכם",
+                round(impressions * rng.uniform(0.01, 0.03), 2), impressions, int(impressions * 0.7),
+                clicks, int(clicks * rng.uniform(0.02, 0.08)),
+            ))
+    conn.executemany("INSERT INTO mart_platforms_performance VALUES (?, ?, ?, ?, ?, ?, ?, ?)", perf)
+    conn.executemany("INSERT INTO mart_facebook_creatives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", creative_rows)
+    conn.commit()
+    return conn
+
+
+class _AnyValue:
+    def __init__(self):
+        self.value = None
+
+    def step(self, value):
+        if self.value is None:
+            self.value = value
+
+    def finalize(self):
+        return self.value
+
+
+def _to_sqlite(sql: str) -> str:
+    """Translates the BigQuery dialect used by the templates/prompt into SQLite."""
+    sql = re.sub(r"`(?:[\w-]+\.)*(\w+)`", r"\1", sql)
+    sql = re.sub(r"\bDATE\s+'(\d{4}-\d{2}-\d{2})'", r"'\1'", sql, flags=re.IGNORECASE)
+    sql = re.sub(
+        r"DATE_SUB\(\s*CURRENT_DATE\(\)\s*,\s*INTERVAL\s+(\d+)\s+DAY\s*\)",
+        r"date('now', '-\1 day')", sql, flags=re.IGNORECASE,
+    )
+    sql = re.sub(r"CURRENT_DATE\(\)", "date('now')", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bAS\s+STRING\b", "AS TEXT", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bAPPROX_COUNT_DISTINCT\(", "COUNT(DISTINCT ", sql, flags=re.IGNORECASE)
+    return sql
+
+
+_LOWER_BOUND_RE = re.compile(r"\bdate\s*(?:>=|>|between)\s*(date\('now', '-\d+ day'\)|'\d{4}-\d{2}-\d{2}')")
+
+
+class _RowIterator(list):
+    total_bytes_processed: Optional[int] = None
+    total_bytes_billed: Optional[int] = None
+    job_id: Optional[str] = None
+
+
+_TYPES = {"TEXT": "STRING", "REAL": "FLOAT64", "INTEGER": "INT64"}
+
+
+class _Field:
+    def __init__(self, name: str, field_type: str = "STRING"):
+        self.name = name
+        self.field_type = field_type
+        self.mode = "NULLABLE"
+        self.description = None
+
+
+class _Partitioning:
+    type_ = "DAY"
+    field = "date"
+
+
+class _Ref:
+    def __init__(self, dataset_id: str, table_id: Optional[str] = None):
+        self.dataset_id = dataset_id
+        self.table_id = table_id
+
+
+class _Table:
+    def __init__(self, modified: datetime, columns: List[str], table_id: str = "", types: Optional[List[str]] = None, num_rows: int = 0):
+        self.table_id = table_id
+        self.table_type = "TABLE"
+        self.modified = modified
+        self.schema = [_Field(c, t) for c, t in zip(columns, types or ["STRING"] * len(columns))]
+        self.time_partitioning = _Partitioning() if "date" in columns else None
+        self.clustering_fields = None
+        self.num_rows = num_rows
+        self.num_bytes = 8 * num_rows * len(columns)
+
+    def to_api_repr(self) -> Dict[str, Any]:
+        project, dataset, table = (["", ""] + self.table_id.split("."))[-3:]
+        return {
+            "tableReference": {"projectId": project, "datasetId": dataset, "tableId": table},
+            "schema": {"fields": [{"name": f.name, "type": f.field_type, "mode": f.mode} for f in self.schema]},
+            "numRows": str(self.num_rows),
+            "timePartitioning": {"type": "DAY", "field": "date"} if self.time_partitioning else None,
+        }
+
+
+class _DryRunJob:
+    def __init__(self, total_bytes_processed: int):
+        self.total_bytes_processed = total_bytes_processed
+        self.statement_type = "SELECT"
+
+
+class FakeBigQueryClient:
+    """The subset of bigquery.Client used by the executor, the cost gate, the query cache and the schema catalog."""
+
+    def __init__(self, conn: sqlite3.Connection, latency_ms: float = 0.0):
+        self.conn = conn
+        self.latency_ms = latency_ms
+        self.loaded_at = datetime.now(timezone.utc)
+        self.queries = 0
+        self._lock = threading.Lock()
+        conn.create_function("SAFE_DIVIDE", 2, lambda a, b: None if a is None or not b else a / b)
+        conn.create_aggregate("ANY_VALUE", 1, _AnyValue)
+
+    def query_and_wait(self, sql: str, job_config: Any = None, project: Optional[str] = None, max_results: Optional[int] = None, **_: Any) -> _RowIterator:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.queries += 1
+            cur = self.conn.execute(_to_sqlite(sql))
+            names = [d[0] for d in cur.description]
+            raw = cur.fetchmany(max_results) if max_results else cur.fetchall()
+        rows = _RowIterator(dict(zip(names, r)) for r in raw)
+        # Rough stand-in for bytes scanned: 8 bytes per returned cell
+        rows.total_bytes_processed = rows.total_bytes_billed = 8 * len(names) * max(len(raw), 1)
+        rows.job_id = f"fake_{self.queries}"
+        return rows
+
+    def query(self, sql: str, job_config: Any = None, project: Optional[str] = None, **_: Any) -> _DryRunJob:
+        """
+        Dry runs only: 8 bytes per row for every referenced column of every referenced
+        table, counting only the rows at or after the loosest lower bound on `date`
+        (partition pruning).
+        """
+        if not getattr(job_config, "dry_run", False):
+            raise NotImplementedError("FakeBigQueryClient.query only supports dry runs")
+        text = _to_sqlite(sql).lower()
+        select_all = re.search(r"select\s+(?:\w+\.)?\*", text) is not None
+        scanned = 0
+        with self._lock:
+            for table, in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                if not re.search(rf"\b{table}\b", text):
+                    continue
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+                used = columns if select_all else [c for c in columns if re.search(rf"\b{c}\b", text)]
+                bounds = _LOWER_BOUND_RE.findall(text)
+                where = f" WHERE date >= MIN({', '.join(bounds)}, '9999')" if bounds else ""
+                rows = self.conn.execute(f"SELECT COUNT(*) FROM {table}{where}").fetchone()[0]
+                scanned += 8 * rows * len(used)
+        return _DryRunJob(scanned)
+
+    def get_table(self, table_id: str) -> _Table:
+        table = table_id.split(".")[-1]
+        with self._lock:
+            info = list(self.conn.execute(f"PRAGMA table_info({table})"))
+            num_rows = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] if info else 0
+        if not info:
+            raise LookupError(f"Not found: Table {table_id}")
+        columns = [row[1] for row in info]
+        types = ["DATE" if row[1] == "date" else _TYPES.get(row[2], "STRING") for row in info]
+        return _Table(self.loaded_at, columns, table_id, types, num_rows)
+
+    def list_datasets(self, project: Optional[str] = None) -> List[_Ref]:
+        return [_Ref("MARTS")]
+
+    def get_dataset(self, dataset_id: str) -> Any:
+        project, dataset = dataset_id.split(".")
+        repr_ = {"datasetReference": {"projectId": project, "datasetId": dataset}, "location": "US"}
+        return type("_Dataset", (), {"to_api_repr": lambda self: repr_})()
+
+    def list_tables(self, dataset_id: str) -> List[_Ref]:
+        with self._lock:
+            names = [r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        return [_Ref(dataset_id.split(".")[-1], name) for name in names]
+
+
+# --- Scripted model ----------------------------------------------------------
+
+_RESEARCH_RE = re.compile(r"מתחר|שוק|טרנד|research|competitor|market", re.IGNORECASE)
+_CREATIVE_RE = re.compile(r"קריאייטיב|קריאטיב|מודע|באנר|creative|ads?\b|שחיק", re.IGNORECASE)
+
+_SPECIALIST_OUTPUTS = {
+    "performance": {
+        "status": "SUCCESS",
+        "summary": "העלות לליד יציבה; פייסבוק מוביל בנפח לידים.",
+        "kpis": {"cpl_trend": "flat"},
+        "recommendations": ["להעביר 10% תקציב מטאבולה לפייסבוק."],
+    },
+    "creative": {
+        "status": "SUCCESS",
+        "summary": "שלוש מודעות מציגות סימני שחיקה.",
+        "fatigued_creatives": ["ad_000", "ad_001", "ad_002"],
+        "recommendations": ["לרענן קריאייטיב למודעות הוותיקות."],
+    },
+    "research": {
+        "status": "SUCCESS",
+        "summary": "המתחרים מדגישים מחיר ומבצעי התקנה.",
+        "sources": [],
+    },
+}
+
+
+def _text_of(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(p.text or "" for p in content.parts)
+
+
+def _function_responses(llm_request: LlmRequest) -> List[types.FunctionResponse]:
+    return [p.function_response for c in llm_request.contents for p in (c.parts or []) if p.function_response]
+
+
+def _first_user_text(llm_request: LlmRequest) -> str:
+    for content in llm_request.contents:
+        if content.role == "user":
+            text = _text_of(content)
+            if text:
+                return text
+    return ""
+
+
+def _parse(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {"result"}:
+        value = value["result"]
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class ScriptedLlm(BaseLlm):
+    """Deterministic model that plays one agent's role in the pipeline."""
+
+    role: str
+    latency_ms: float = 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        step = getattr(self, f"_{self.role}")
+        yield step(llm_request)
+
+    def _reply(self, parts: List[types.Part], llm_request: LlmRequest) -> LlmResponse:
+        prompt_tokens = sum(len(_text_of(c)) for c in llm_request.contents) // 4 + 1
+        output_tokens = sum(len(p.text or "") for p in parts) // 4 + 8
+        return LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+    def _call(self, name: str, args: Dict[str, Any], llm_request: LlmRequest) -> LlmResponse:
+        return self._reply([types.Part(function_call=types.FunctionCall(name=name, args=args))], llm_request)
+
+    def _text(self, payload: Any, llm_request: LlmRequest) -> LlmResponse:
+        text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+        return self._reply([types.Part(text=text)], llm_request)
+
+    def _orchestrator(self, llm_request: LlmRequest) -> LlmResponse:
+        question = _first_user_text(llm_request)
+        responses = {r.name: _parse(r.response) for r in _function_responses(llm_request)}
+        if "data_agent" not in responses:
+            return self._call("data_agent", {"request": question}, llm_request)
+
+        data = responses["data_agent"]
+        if "run_specialists" not in responses:
+            specialists = ["performance"]
+            if _CREATIVE_RE.search(question):
+                specialists.append("creative")
+            if _RESEARCH_RE.search(question):
+                specialists.append("research")
+            request = json.dumps({"user_request": question, "data_payload": data}, ensure_ascii=False, default=str)
+            return self._call("run_specialists", {"request": request, "specialists": specialists}, llm_request)
+
+        if "plot_and_save_artifacts" not in responses and isinstance(data, dict) and data.get("status") == "SUCCESS":
+            payload = data.get("data") or {}
+            columns = list(payload.get("columns") or [])
+            metric = next((c for c in ("cost", "leads", "cpl", "ctr", "clicks") if c in columns), None)
+            if metric:
+                spec = {"chart_type": "line" if "date" in columns else "bar", "y": [metric]}
+                if "date" in columns:
+                    spec["x"] = "date"
+                elif columns:
+                    spec["x"] = columns[0]
+                for dim in ("platform", "ad_name"):
+                    if dim in columns and "date" in columns:
+                        spec["group_by"] = dim
+                        break
+                return self._call("plot_and_save_artifacts", {"data_payload": data, "plots": [spec]}, llm_request)
+
+        return self._text("סיכום: הנתונים נותחו, ההמלצות והגרפים מצורפים.", llm_request)
+
+    def _data(self, llm_request: LlmRequest) -> LlmResponse:
+        responses = [r for r in _function_responses(llm_request) if r.name == "execute_sql"]
+        if not responses:
+            query = (
+                "SELECT platform, SUM(cost) AS cost, SUM(leads) AS leads, SAFE_DIVIDE(SUM(cost), SUM(leads)) AS cpl\n"
+                "FROM `tami4-471706.MARTS.mart_platforms_performance`\n"
+                "WHERE date >= DATE_SUB(CURRENT_DATE(), INTERVAL 14 DAY)\n"
+                "GROUP BY platform ORDER BY cost DESC"
+            )
+            return self._call("execute_sql", {"project_id": "tami4-471706", "query": query}, llm_request)
+        result = _parse(responses[-1].response)
+        if not isinstance(result, dict) or result.get("status") != "SUCCESS":
+            return self._text({"status": "ERROR", "data": {"columns": [], "rows": []}, "error": {"message": "Query failed"}}, llm_request)
+        return self._text({
+            "status": "SUCCESS",
+            "sql": "-- scripted",
+            "assumptions": ["Scripted benchmark query."],
+            "data": result.get("data") or {"columns": [], "rows": result.get("rows") or []},
+            "notes": [],
+            "error": None,
+        }, llm_request)
+
+    def _performance(self, llm_request: LlmRequest) -> LlmResponse:
+        return self._text(_SPECIALIST_OUTPUTS["performance"], llm_request)
+
+    def _creative(self, llm_request: LlmRequest) -> LlmResponse:
+        return self._text(_SPECIALIST_OUTPUTS["creative"], llm_request)
+
+    def _research(self, llm_request: LlmRequest) -> LlmResponse:
+        return self._text(_SPECIALIST_OUTPUTS["research"], llm_request)
+
+
+# --- Wiring ------------------------------------------------------------------
+
+_ROLES = {
+    "orchestrator_agent": "orchestrator",
+    "data_agent": "data",
+    "performance_analyst": "performance",
+    "creative_agent": "creative",
+    "research_agent": "research",
+}
+
+
+def _walk_agents(root: Any) -> List[Any]:
+    """The root agent plus every agent reachable through sub_agents, AgentTools and run_specialists."""
+    seen, stack, found = set(), [root], []
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        found.append(agent)
+        stack.extend(getattr(agent, "sub_agents", None) or [])
+        for tool in getattr(agent, "tools", None) or []:
+            if getattr(tool, "agent", None) is not None:
+                stack.append(tool.agent)
+            func = getattr(tool, "func", None)
+            for cell in getattr(func, "__closure__", None) or ():
+                value = cell.cell_contents
+                if isinstance(value, dict):
+                    stack.extend(getattr(v, "agent", v) for v in value.values() if hasattr(getattr(v, "agent", v), "model"))
+    return found
+
+
+def install_fakes(root_agent: Any, model_latency_ms: float = 0.0, bq_latency_ms: float = 0.0, days: int = 180) -> FakeBigQueryClient:
+    """Points every agent at ScriptedLlm and every BigQuery entry point at the fake client."""
+    from tami4_agent.sub_agents.data import executor
+    from tami4_agent.sub_agents.data.client import client_pool
+
+    client = FakeBigQueryClient(build_marts(days=days), latency_ms=bq_latency_ms)
+    client_pool.configure(factory=lambda: client, credentials_fn=None)
+
+    for agent in _walk_agents(root_agent):
+        role = _ROLES.get(agent.name)
+        if role is None:
+            continue
+        agent.model = ScriptedLlm(model="gemini-2.0-flash", role=role, latency_ms=model_latency_ms)
+        if role == "data":
+            # The real execute_sql tool, without the metadata tools of the BigQuery toolset
+            agent.tools = [FunctionTool(executor.execute_sql)]
+    return client
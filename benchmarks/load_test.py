@@ -0,0 +1,188 @@
+"""
+HTTP load test of the multi-worker serving mode on the offline stand-in stack.
+
+Starts uvicorn with 1, 2, 4 ... worker processes around a /run endpoint that runs
+root_agent with the benchmark fakes (benchmarks/fakes.py), sessions in a shared
+SQLite file, artifacts in a shared LocalArtifactService and the admission middleware
+(tools/admission.py) in front. Reports throughput, latency and 429s per worker count;
+with CPU-bound requests (--cold renders every chart) throughput should grow with the
+number of workers up to the number of cores.
+
+    python -m tami4_agent.benchmarks.load_test --workers 1,2,4 --requests 80 --concurrency 16 --cold
+    python -m tami4_agent.benchmarks.load_test --workers 2 --global-limit 4 --queue-timeout 1
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from tami4_agent.benchmarks.e2e import CORPUS, _pct
+
+APP_NAME = "tami4_load"
+
+
+def create_app() -> Any:
+    """uvicorn app factory run in every worker; configured through LOAD_TEST_* env vars."""
+    from fastapi import FastAPI, Request
+    from google.adk.runners import Runner
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService
+    from google.genai import types
+
+    from tami4_agent.agent import root_agent
+    from tami4_agent.benchmarks.fakes import install_fakes
+    from tami4_agent.sub_agents.data.cache import query_cache
+    from tami4_agent.sub_agents.data.client import BQ_GLOBAL_MAX_JOBS
+    from tami4_agent.tools import visualization
+    from tami4_agent.tools.admission import AdmissionMiddleware, build_controller
+    from tami4_agent.tools.artifact_store import LocalArtifactService
+
+    root = os.environ["LOAD_TEST_DIR"]
+    cold = os.getenv("LOAD_TEST_COLD") == "1"
+    install_fakes(
+        root_agent,
+        model_latency_ms=float(os.getenv("LOAD_TEST_MODEL_LATENCY_MS", "0")),
+        bq_latency_ms=float(os.getenv("LOAD_TEST_BQ_LATENCY_MS", "0")),
+    )
+    runner = Runner(
+        app_name=APP_NAME,
+        agent=root_agent,
+        session_service=SqliteSessionService(os.path.join(root, "sessions.db")),
+        artifact_service=LocalArtifactService(root_dir=os.path.join(root, "artifacts")),
+    )
+
+    app = FastAPI()
+
+    @app.post("/run")
+    async def run(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        if cold:
+            query_cache.clear()
+            visualization._png_cache.clear()
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id="load")
+        message = types.Content(role="user", parts=[types.Part(text=body["question"])])
+        events = 0
+        async for _ in runner.run_async(user_id="load", session_id=session.id, new_message=message):
+            events += 1
+        return {"pid": os.getpid(), "events": events}
+
+    app.add_middleware(AdmissionMiddleware, controller=build_controller(BQ_GLOBAL_MAX_JOBS))
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+            try:
+                await client.get(f"{url}/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.25)
+    raise TimeoutError("server did not start")
+
+
+async def _load(url: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async with httpx.AsyncClient(timeout=300) as client:
+        # Warm every worker up (one pass over the corpus) outside the measurement
+        await asyncio.gather(*(client.post(f"{url}/run", json={"question": q}) for q in CORPUS))
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    r = await client.post(f"{url}/run", json={"question": CORPUS[i % len(CORPUS)]})
+                    status, pid = r.status_code, r.json().get("pid") if r.status_code == 200 else None
+                except httpx.HTTPError as e:
+                    status, pid = type(e).__name__, None
+                results.append({"status": status, "pid": pid, "ms": (time.perf_counter() - started) * 1000})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - started
+
+    ok = [r["ms"] for r in results if r["status"] == 200]
+    return {
+        "ok": len(ok),
+        "rejected": sum(1 for r in results if r["status"] == 429),
+        "errors": sum(1 for r in results if r["status"] not in (200, 429)),
+        "pids": len({r["pid"] for r in results if r["pid"]}),
+        "rps": len(ok) / wall if wall else 0.0,
+        "p50_ms": _pct(ok, 0.5),
+        "p95_ms": _pct(ok, 0.95),
+    }
+
+
+def _serve_and_load(workers: int, args: argparse.Namespace, root: str) -> Dict[str, Any]:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        LOAD_TEST_DIR=root,
+        LOAD_TEST_COLD="1" if args.cold else "0",
+        LOAD_TEST_MODEL_LATENCY_MS=str(args.model_latency_ms),
+        LOAD_TEST_BQ_LATENCY_MS=str(args.bq_latency_ms),
+        WEB_CONCURRENCY=str(workers),
+        ADMISSION_DB_PATH=os.path.join(root, f"admission-{workers}.sqlite"),
+        ADMISSION_QUEUE_TIMEOUT_SECONDS=str(args.queue_timeout),
+        TRACE_EXPORT_PATH="",
+    )
+    if args.global_limit:
+        env["ADMISSION_GLOBAL_MAX_INFLIGHT"] = str(args.global_limit)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "tami4_agent.benchmarks.load_test:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_ready(url, proc))
+        return asyncio.run(_load(url, args.requests, args.concurrency))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare")
+    parser.add_argument("--requests", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated latency per model call")
+    parser.add_argument("--bq-latency-ms", type=float, default=0.0, help="Simulated latency per BigQuery query")
+    parser.add_argument("--global-limit", type=int, default=0, help="ADMISSION_GLOBAL_MAX_INFLIGHT (default: derived from the budgets)")
+    parser.add_argument("--queue-timeout", type=float, default=30.0, help="ADMISSION_QUEUE_TIMEOUT_SECONDS")
+    parser.add_argument("--cold", action="store_true", help="Clear the query and chart caches before every request")
+    args = parser.parse_args()
+
+    print(f"cores={os.cpu_count()} requests={args.requests} concurrency={args.concurrency}")
+    print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>9} {'p95 ms':>9} {'ok':>5} {'429':>5} {'err':>5} {'pids':>5}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with tempfile.TemporaryDirectory() as root:
+            r = _serve_and_load(workers, args, root)
+        baseline = baseline or r["rps"]
+        print(
+            f"{workers:>7} {r['rps']:>8.2f} {r['rps'] / baseline if baseline else 0:>7.2f}x {r['p50_ms']:>9.1f} "
+            f"{r['p95_ms']:>9.1f} {r['ok']:>5} {r['rejected']:>5} {r['errors']:>5} {r['pids']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Size of the data_agent payload: dict-rows (current) vs columnar/v1.
+
+Token counts are estimated at ~4 characters per token of JSON text.
+
+    python -m tami4_agent.benchmarks.payload_size
+"""
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from tami4_agent.tools.payload import columnar_to_rows, encode_columnar
+
+
+def _performance_rows(days: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(7)
+    rows = []
+    for i in range(days):
+        for platform in ("facebook", "google", "tiktok"):
+            cost, clicks, impressions, leads = rnd.uniform(300, 1500), rnd.randint(50, 400), rnd.randint(5000, 40000), rnd.randint(2, 40)
+            rows.append({
+                "date": (date(2025, 1, 1) + timedelta(days=i)).isoformat(),
+                "platform": platform,
+                "cost": cost,
+                "impressions": impressions,
+                "clicks": clicks,
+                "leads": leads,
+                "ctr": clicks / impressions,
+                "cpl": cost / leads,
+            })
+    return rows
+
+
+def _creative_rows(creatives: int, days: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(11)
+    rows = []
+    for c in range(creatives):
+        for i in range(days):
+            cost, clicks, impressions, leads = rnd.uniform(20, 300), rnd.randint(5, 80), rnd.randint(800, 9000), rnd.randint(0, 8)
+            rows.append({
+                "date": (date(2025, 1, 1) + timedelta(days=i)).isoformat(),
+                "ad_name": f"tami4_summer_campaign_creative_{c:03d}",
+                "ad_url": f"https://www.facebook.com/ads/library/?id=1200000000{c:03d}",
+                "cost": cost,
+                "impressions": impressions,
+                "clicks": clicks,
+                "leads": leads,
+                "ctr": clicks / impressions,
+                "cpl": cost / leads if leads else None,
+            })
+    return rows
+
+
+def _measure(name: str, rows: List[Dict[str, Any]]) -> None:
+    columns = list(rows[0])
+    current = json.dumps({"columns": columns, "rows": rows}, ensure_ascii=False, separators=(",", ":"))
+    t = time.perf_counter()
+    encoded = encode_columnar(rows, columns)
+    encode_ms = (time.perf_counter() - t) * 1000
+    compact = json.dumps(encoded, ensure_ascii=False, separators=(",", ":"))
+    t = time.perf_counter()
+    columnar_to_rows(encoded)
+    decode_ms = (time.perf_counter() - t) * 1000
+    print(
+        f"{name:<28} {len(rows):>6} {len(current):>11,} {len(compact):>11,} "
+        f"{len(current) // 4:>10,} {len(compact) // 4:>10,} {1 - len(compact) / len(current):>7.0%} "
+        f"{encode_ms:>8.1f} {decode_ms:>8.1f}"
+    )
+
+
+def main() -> None:
+    print(f"{'dataset':<28} {'rows':>6} {'rows_bytes':>11} {'col_bytes':>11} {'rows_tok':>10} {'col_tok':>10} {'saved':>7} {'enc_ms':>8} {'dec_ms':>8}")
+    _measure("performance 30d x 3 platf.", _performance_rows(30))
+    _measure("performance 90d x 3 platf.", _performance_rows(90))
+    _measure("creatives 10 x 30d", _creative_rows(10, 30))
+    _measure("creatives 200 x 90d", _creative_rows(200, 90))
+
+
+if __name__ == "__main__":
+    main()
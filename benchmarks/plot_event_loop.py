@@ -0,0 +1,94 @@
+"""
+Event-loop latency while several sessions plot concurrently.
+
+A ticker coroutine sleeps 5 ms in a loop and records how late it wakes up; with
+rendering on the loop every chart blocks it for the full render time.
+
+    python -m tami4_agent.benchmarks.plot_event_loop --sessions 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from tami4_agent.tools import visualization
+
+
+class _FakeToolContext:
+    """Stands in for ADK's ToolContext; only save_artifact is used by the plot tool."""
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+
+    async def save_artifact(self, filename: str, artifact: Any) -> int:
+        self.versions[filename] = self.versions.get(filename, -1) + 1
+        return self.versions[filename]
+
+
+def _payload(days: int = 90) -> Dict[str, Any]:
+    start = date(2025, 1, 1)
+    platforms = ["facebook", "google", "tiktok"]
+    rows = [
+        {
+            "date": (start + timedelta(days=i)).isoformat(),
+            "platform": platforms[i % len(platforms)],
+            "cost": 1000 + 13 * i,
+            "leads": 40 + (i % 7),
+        }
+        for i in range(days)
+    ]
+    return {"status": "SUCCESS", "data": {"columns": list(rows[0]), "rows": rows}}
+
+
+async def _ticker(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def _run(mode: str, sessions: int) -> Dict[str, float]:
+    visualization.PLOT_EXECUTOR = mode
+    visualization._executor = None
+    payload = _payload()
+    handoff = {"preferred_time_column": "date", "preferred_metrics": ["cost", "leads"]}
+
+    # Warm up imports and font caches outside the measurement
+    await visualization.plot_and_save_artifacts(payload, _FakeToolContext(), plotting_handoff=handoff)
+
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        visualization.plot_and_save_artifacts(payload, _FakeToolContext(), plotting_handoff=handoff)
+        for _ in range(sessions)
+    ))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "wall_s": wall,
+        "lag_p50_ms": statistics.median(lags) if lags else 0.0,
+        "lag_p95_ms": lags[min(len(lags) - 1, int(len(lags) * 0.95))] if lags else 0.0,
+        "lag_max_ms": lags[-1] if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'wall_s':>8} {'lag_p50_ms':>11} {'lag_p95_ms':>11} {'lag_max_ms':>11}")
+    for mode in args.modes:
+        r = asyncio.run(_run(mode, args.sessions))
+        print(f"{mode:<8} {r['wall_s']:>8.2f} {r['lag_p50_ms']:>11.1f} {r['lag_p95_ms']:>11.1f} {r['lag_max_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
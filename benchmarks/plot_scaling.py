@@ -0,0 +1,76 @@
+"""
+Render time of plot_and_save_artifacts as the payload grows (200 to 200k rows).
+
+Each size is a daily series per campaign and platform, plotted with the orchestrator's
+specs (a grouped daily line and a bar by campaign) and with the legacy handoff (trend
+plus bar comparison). Rendering is inline and the chart cache is cleared, so every
+call pays the full reduction + render cost.
+
+    python -m tami4_agent.benchmarks.plot_scaling --rows 200,2000,20000,200000
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Any, Dict
+
+from tami4_agent.benchmarks.plot_event_loop import _FakeToolContext
+from tami4_agent.tools import visualization
+
+PLATFORMS = ["facebook", "google", "tiktok", "taboola"]
+SPECS = [
+    {"chart_type": "line", "x": "date", "y": ["cost"], "group_by": "platform", "title": "Daily Cost by Platform"},
+    {"chart_type": "bar", "x": "campaign_name", "y": ["leads"], "group_by": None, "title": "Leads by Campaign"},
+]
+HANDOFF = {"preferred_time_column": "date", "preferred_metrics": ["cost", "leads"]}
+
+
+def _payload(rows: int) -> Dict[str, Any]:
+    """Columnar-free dict rows: `rows` rows over days x platforms x campaigns (campaigns grow with size)."""
+    campaigns = max(4, rows // 2000)
+    days = max(1, rows // (len(PLATFORMS) * campaigns))
+    start = date(2025, 1, 1)
+    columns = ["date", "platform", "campaign_name", "cost", "leads"]
+    data = []
+    for i in range(rows):
+        day, rest = divmod(i, len(PLATFORMS) * campaigns)
+        platform, campaign = divmod(rest, campaigns)
+        data.append([
+            (start + timedelta(days=day % max(days, 1))).isoformat(), PLATFORMS[platform], f"campaign_{campaign:04d}",
+            100.0 + (i * 7919) % 997 / 10, (i * 104729) % 53,
+        ])
+    return {"status": "SUCCESS", "data": {"columns": columns, "rows": data}}
+
+
+async def _time(payload: Dict[str, Any], **kwargs: Any) -> float:
+    visualization._png_cache.clear()
+    visualization._artifact_refs.clear()
+    started = time.perf_counter()
+    result = await visualization.plot_and_save_artifacts(payload, _FakeToolContext(), **kwargs)
+    elapsed = time.perf_counter() - started
+    if result["status"] != "SUCCESS" or result.get("warnings"):
+        raise RuntimeError(result)
+    return elapsed
+
+
+async def _run(sizes: list, repeats: int) -> None:
+    visualization.PLOT_EXECUTOR = "inline"
+    await _time(_payload(200), plots=SPECS)  # imports and font caches
+    print(f"{'rows':>8} {'specs_s':>9} {'handoff_s':>10}")
+    for rows in sizes:
+        payload = _payload(rows)
+        specs = min([await _time(payload, plots=SPECS) for _ in range(repeats)])
+        handoff = min([await _time(payload, plotting_handoff=HANDOFF) for _ in range(repeats)])
+        print(f"{rows:>8} {specs:>9.2f} {handoff:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="200,2000,20000,200000", help="Comma-separated payload sizes")
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(_run([int(r) for r in args.rows.split(",")], args.repeats))
+
+
+if __name__ == "__main__":
+    main()
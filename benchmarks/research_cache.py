@@ -0,0 +1,115 @@
+"""
+Repeated competitor/market questions through the research cache (sub_agents/research/cache.py),
+with a fake search model (ScriptedLlm, role "research") and a clock the benchmark moves.
+
+Each phase asks the same questions in different wordings and reports latency and how
+many search-model calls were made: a cold miss, fresh hits, stale hits served at once
+while the refresh runs in the background, and a miss after the stale window.
+
+    python -m tami4_agent.benchmarks.research_cache --search-latency-ms 1500
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, List
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from tami4_agent.benchmarks.fakes import ScriptedLlm
+from tami4_agent.sub_agents.research.cache import ResearchCache, research_key, topic_ttl
+from tami4_agent.tools.response_cache import MemoryBackend
+
+QUESTIONS = [
+    ["מי המתחרים של תמי4?", "מי המתחרים של תמי 4", "Tami4 competitors"],
+    ["מגמות שוק בר מים", "מגמות בשוק בר המים?", "water bar market trends"],
+]
+
+
+class _CountingLlm(ScriptedLlm):
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        self.calls += 1
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _context(model: Any, invocation_id: str) -> Any:
+    """The parts of a CallbackContext the cache reads."""
+    return SimpleNamespace(
+        state={},
+        invocation_id=invocation_id,
+        agent_name="research_agent",
+        _invocation_context=SimpleNamespace(agent=SimpleNamespace(canonical_model=model)),
+    )
+
+
+def _request(question: str) -> LlmRequest:
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=question)])])
+
+
+async def _ask(cache: ResearchCache, model: _CountingLlm, question: str, n: int) -> float:
+    started = time.perf_counter()
+    ctx, request = _context(model, f"inv-{n}"), _request(question)
+    response = await cache.before_model(ctx, request)
+    if response is None:
+        async for response in model.generate_content_async(request):
+            cache.after_model(ctx, response)
+    return time.perf_counter() - started
+
+
+async def _phase(name: str, cache: ResearchCache, model: _CountingLlm, questions: List[str], counter: List[int]) -> None:
+    calls = model.calls
+    latencies = []
+    for question in questions:
+        counter[0] += 1
+        latencies.append(await _ask(cache, model, question, counter[0]))
+    served_calls = model.calls - calls
+    await cache.drain()
+    print(
+        f"{name:<22} requests={len(questions):2}  avg={sum(latencies) / len(latencies) * 1000:7.1f}ms  "
+        f"max={max(latencies) * 1000:7.1f}ms  search_calls={served_calls:2}  background_refreshes={model.calls - calls - served_calls:2}"
+    )
+
+
+async def _run(search_latency_ms: float) -> None:
+    clock = _Clock()
+    cache = ResearchCache(MemoryBackend(max_entries=64, ttl_seconds=None), clock=clock)
+    model = _CountingLlm(model="gemini-2.0-flash", role="research", latency_ms=search_latency_ms)
+    counter = [0]
+    topics = set()
+    for group in QUESTIONS:
+        keys = {research_key(q) for q in group}
+        topics |= {topic for topic, _ in keys}
+        print(f"{group[0]!r}: {len(group)} wordings -> {len(keys)} key(s), topics={sorted({t for t, _ in keys})}")
+
+    every = [q for group in QUESTIONS for q in group]
+    await _phase("cold", cache, model, [group[0] for group in QUESTIONS], counter)
+    await _phase("fresh", cache, model, every, counter)
+    # Past every TTL, within every stale window
+    clock.now += max(topic_ttl(t) for t in topics) * 1.5
+    await _phase("stale (revalidate)", cache, model, every, counter)
+    await _phase("fresh after refresh", cache, model, every, counter)
+    clock.now += max(topic_ttl(t) for t in topics) * (cache.stale_factor + 1)
+    await _phase("expired", cache, model, every, counter)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--search-latency-ms", type=float, default=1500.0, help="Latency of one grounded search call")
+    args = parser.parse_args()
+    asyncio.run(_run(args.search_latency_ms))
+
+
+if __name__ == "__main__":
+    main()
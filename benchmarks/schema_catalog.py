@@ -0,0 +1,82 @@
+"""
+Schema catalog (sub_agents/data/catalog.py) on the synthetic MARTS of benchmarks/fakes.py.
+
+Takes a snapshot, prints the digest the data agent gets, and times the discovery calls
+a failed query typically triggers, served from the snapshot vs. from the (fake) client
+with a simulated metadata API latency.
+
+    python -m tami4_agent.benchmarks.schema_catalog --api-latency-ms 250
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from tami4_agent.benchmarks.fakes import FakeBigQueryClient, build_marts
+from tami4_agent.sub_agents.data.catalog import SchemaCatalog, serve_discovery
+from tami4_agent.sub_agents.data.catalog import schema_catalog as default_catalog
+from tami4_agent.sub_agents.data.executor import execute_query
+from tami4_agent.sub_agents.data.client import client_pool
+
+PROJECT, DATASET = "tami4-471706", "MARTS"
+# The discovery round a failed query usually triggers
+CALLS = [
+    ("list_dataset_ids", {"project_id": PROJECT}),
+    ("get_dataset_info", {"project_id": PROJECT, "dataset_id": DATASET}),
+    ("list_table_ids", {"project_id": PROJECT, "dataset_id": DATASET}),
+    ("get_table_info", {"project_id": PROJECT, "dataset_id": DATASET, "table_id": "mart_platforms_performance"}),
+    ("get_table_info", {"project_id": PROJECT, "dataset_id": DATASET, "table_id": "mart_facebook_creatives"}),
+]
+
+
+def _from_client(client: FakeBigQueryClient, name: str, args: dict, latency_s: float) -> object:
+    time.sleep(latency_s)
+    dataset = f"{PROJECT}.{DATASET}"
+    if name == "list_dataset_ids":
+        return [d.dataset_id for d in client.list_datasets(PROJECT)]
+    if name == "get_dataset_info":
+        return client.get_dataset(dataset).to_api_repr()
+    if name == "list_table_ids":
+        return [t.table_id for t in client.list_tables(dataset)]
+    return client.get_table(f"{dataset}.{args['table_id']}").to_api_repr()
+
+
+async def _run(api_latency_ms: float, days: int) -> None:
+    client = FakeBigQueryClient(build_marts(days=days))
+    client_pool.configure(factory=lambda: client, credentials_fn=None)
+    catalog = SchemaCatalog(
+        path=None,
+        client_fn=lambda: client,
+        query_fn=lambda sql: execute_query(sql, project_id=PROJECT, max_rows=None, use_cache=False),
+    )
+
+    started = time.perf_counter()
+    catalog.refresh()
+    print(f"snapshot: {len(catalog.snapshot['tables'])} tables in {(time.perf_counter() - started) * 1000:.0f}ms, {client.queries} stats queries")
+    digest = catalog.digest()
+    print(f"digest: {len(digest)} chars (~{len(digest) // 4} tokens)\n{digest}\n")
+
+    started = time.perf_counter()
+    for name, args in CALLS:
+        _from_client(client, name, args, api_latency_ms / 1000)
+    remote = time.perf_counter() - started
+
+    default_catalog._set(catalog.snapshot)
+    hits = 0
+    started = time.perf_counter()
+    for name, args in CALLS:
+        hits += await serve_discovery(SimpleNamespace(name=name), args, None) is not None
+    local = time.perf_counter() - started
+    print(f"discovery x{len(CALLS)}: client {remote * 1000:7.1f}ms  catalog {local * 1000:7.3f}ms  ({hits}/{len(CALLS)} served locally)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--api-latency-ms", type=float, default=250.0, help="Latency of one BigQuery metadata call")
+    parser.add_argument("--days", type=int, default=180)
+    args = parser.parse_args()
+    asyncio.run(_run(args.api_latency_ms, args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Cold-start report: import time per module and first-use latency per lazy dependency.
+
+Every measurement runs in a fresh interpreter so nothing is already cached.
+
+    python -m tami4_agent.benchmarks.startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+MODULES = [
+    "google.adk.agents",
+    "tami4_agent.tools.visualization",
+    "tami4_agent.sub_agents.data.agent",
+    "tami4_agent.sub_agents.performance.agent",
+    "tami4_agent.sub_agents.creative.agent",
+    "tami4_agent.sub_agents.research.agent",
+    "tami4_agent.agent",
+    "tami4_agent.main",
+]
+
+# name -> code run after `import tami4_agent.agent`; timed on first and second call
+FIRST_USE = {
+    "plotting": "from tami4_agent.tools import visualization as m; fn = m.warm_up",
+    "bigquery_toolset": "from tami4_agent.sub_agents.data.agent import agent as a; fn = a.tools[0].warm_up",
+    "bigquery_client": "from tami4_agent.sub_agents.data.tools import get_bigquery_client as fn",
+}
+
+_IMPORT_PROBE = """
+import json, time
+t = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - t}}))
+"""
+
+_FIRST_USE_PROBE = """
+import json, time
+import tami4_agent.agent
+{setup}
+out = {{}}
+for label in ("first", "second"):
+    t = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        out["error"] = f"{{type(e).__name__}}: {{e}}"[:120]
+    out[label] = time.perf_counter() - t
+print(json.dumps(out))
+"""
+
+
+def _probe(code: str) -> Dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p), PREWARM="false")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1][:120]}
+    return json.loads(lines[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'module import (fresh interpreter)':<45} {'best_ms':>9}")
+    for module in MODULES:
+        runs = [_probe(_IMPORT_PROBE.format(module=module)) for _ in range(args.repeat)]
+        ok = [r["seconds"] for r in runs if "seconds" in r]
+        shown = f"{min(ok) * 1000:>9.0f}" if ok else f"  error: {runs[-1].get('error')}"
+        print(f"{module:<45} {shown}")
+
+    print()
+    print(f"{'first use after import':<45} {'first_ms':>9} {'second_ms':>10}")
+    for name, setup in FIRST_USE.items():
+        r = _probe(_FIRST_USE_PROBE.format(setup=setup))
+        line = f"{name:<45} {r.get('first', 0) * 1000:>9.0f} {r.get('second', 0) * 1000:>10.0f}"
+        if "error" in r:
+            line += f"  ({r['error']})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
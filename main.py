@@ -1,15 +1,111 @@
+import inspect
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
 import uvicorn
+from fastapi import Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 from google.adk.cli.fast_api import get_fast_api_app
 from tami4_agent.agent import root_agent
+from tami4_agent.sub_agents.data.client import BQ_GLOBAL_MAX_JOBS
+from tami4_agent.tools.admission import ADMISSION_ENABLED, WEB_CONCURRENCY, AdmissionMiddleware, build_controller
+from tami4_agent.tools.artifact_store import LocalArtifactService, artifact_service_uri
+from tami4_agent.tools.progressive import build_runner, stream_run
+from tami4_agent.tools.tracing import metrics
+from tami4_agent.warmup import start_background_prewarm
+
+# Sessions (SQLite) and artifacts (SQLite metadata + files, size-bounded) persist
+# locally and survive restarts; set either URI to e.g. "memory://" to override.
+SESSION_SERVICE_URI = os.getenv("SESSION_SERVICE_URI", "sqlite:///.data/sessions.db")
+ARTIFACT_SERVICE_URI = os.getenv("ARTIFACT_SERVICE_URI")
+# App name the ADK app serves this package under; /run_progressive uses the same sessions
+APP_NAME = os.getenv("APP_NAME", "tami4_agent")
+# WEB_CONCURRENCY > 1 serves with that many worker processes; they share sessions and
+# artifacts through the stores above and run-request leases through tools/admission.py
+
+def _service_kwargs() -> dict:
+    """Session/artifact backends, passed the way this ADK version's get_fast_api_app accepts them."""
+    params = inspect.signature(get_fast_api_app).parameters
+    kwargs = {}
+    if "artifact_service_uri" in params:
+        kwargs["artifact_service_uri"] = ARTIFACT_SERVICE_URI or artifact_service_uri()
+    elif "artifact_service" in params:
+        kwargs["artifact_service"] = LocalArtifactService()
+    if "session_service_uri" in params and SESSION_SERVICE_URI:
+        if SESSION_SERVICE_URI.startswith("sqlite:///"):
+            os.makedirs(os.path.dirname(os.path.abspath(SESSION_SERVICE_URI[len("sqlite:///"):])), exist_ok=True)
+        kwargs["session_service_uri"] = SESSION_SERVICE_URI
+    return kwargs
 
 # Initialize FastAPI app
 app = get_fast_api_app(
     agent=root_agent,
-    web=True  # Enables the ADK Web UI
+    web=True,  # Enables the ADK Web UI
+    **_service_kwargs(),
 )
 
+# Prewarm lazily-initialized dependencies in the background once the app starts,
+# so the port is bound immediately and the first request does not pay for them.
+_app_lifespan = app.router.lifespan_context
+
+@asynccontextmanager
+async def _lifespan_with_prewarm(app_):
+    async with _app_lifespan(app_) as state:
+        start_background_prewarm()
+        yield state
+
+app.router.lifespan_context = _lifespan_with_prewarm
+
+# Request latency histograms; agent/model/tool spans are recorded by tools/tracing.py
+@app.middleware("http")
+async def _record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe(
+        "tami4_http_request_duration_seconds", time.perf_counter() - start,
+        help="HTTP request latency by route.",
+        method=request.method, path=getattr(route, "path", "unmatched"), status=response.status_code,
+    )
+    return response
+
+# Run requests beyond the model-quota / BigQuery-job budgets queue briefly, then get a 429
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=build_controller(BQ_GLOBAL_MAX_JOBS, WEB_CONCURRENCY))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+class ProgressiveRunRequest(BaseModel):
+    message: str
+    user_id: str = "user"
+    session_id: Optional[str] = None
+
+_progressive_runner = None
+
+# Streams each stage's result (key metrics, insights, graphs) as an SSE event as soon as
+# it is ready, then the final answer; see tools/progressive.py for the event types
+@app.post("/run_progressive")
+async def run_progressive(body: ProgressiveRunRequest) -> StreamingResponse:
+    global _progressive_runner
+    if _progressive_runner is None:
+        _progressive_runner = build_runner(root_agent, APP_NAME, SESSION_SERVICE_URI, ARTIFACT_SERVICE_URI)
+    return StreamingResponse(
+        stream_run(_progressive_runner, body.user_id, body.message, body.session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
     print(f"Starting Tami4 Agent on port {port}...")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if WEB_CONCURRENCY > 1:
+        if SESSION_SERVICE_URI.startswith("memory://"):
+            print("Warning: in-memory sessions are not shared between workers")
+        # Workers import the app themselves, so it is passed by import string
+        uvicorn.run("tami4_agent.main:app", host="0.0.0.0", port=port, workers=WEB_CONCURRENCY)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,250 @@
+"""
+Rule-based intent router for the orchestrator.
+
+The orchestrator's planning calls follow fixed rules (ORCHESTRATOR_INSTRUCTION): data
+first, then performance OR creative, research only for market/competitor questions,
+a plot only when charts are asked for. For requests a small Hebrew/English lexicon
+classifies with high confidence, `route_orchestrator` answers those planning calls
+itself with the function call the model would have made; the model is only called to
+write the final answer. Anything unexpected (low confidence, a follow-up, a data error)
+hands control back to the model, which sees the calls made so far.
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .tools.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.75"))
+
+BRAND = "תמי4"
+
+# --- Lexicon ---
+_PERFORMANCE_RE = re.compile(
+    r"ביצוע|קמפיי?ן|פלטפורמ|ערוצ|ערוץ|המרות|משפך|performance|campaign|platform|channel|funnel|conversions?|\bkpis?\b",
+    re.IGNORECASE,
+)
+_CREATIVE_RE = re.compile(
+    r"קריאייטיב|קריאטיב|מודעה|מודעות|באנר|שחיק|עייפות|creatives?|\bads?\b|banners?|fatigue|wear.?out",
+    re.IGNORECASE,
+)
+# Metrics without a performance/creative cue are performance questions
+_METRIC_RE = re.compile(
+    r"לידים|ליד|עלות|הוצא|תקציב|הכנסות|הקלקות|חשיפות|\bcpl\b|\bcpa\b|\bctr\b|\bcpm\b|\broas\b|"
+    r"spend|cost|leads?|budget|clicks|impressions|revenue",
+    re.IGNORECASE,
+)
+_RESEARCH_RE = re.compile(
+    r"מתחר|שוק|בנצ'?מרק|חדשות|מיצוב|תעשי|competitor|market|benchmark|news|positioning|industry|"
+    r"מה זה תמי\s*-?4|what is tami\s*-?4",
+    re.IGNORECASE,
+)
+_PLOT_RE = re.compile(r"גרף|גרפים|תרשים|ויזואל|הדמי|chart|graph|plot|visuali", re.IGNORECASE)
+_BOTH_RE = re.compile(r"\bוגם\b|גם\s|\bboth\b|\band also\b|\bas well as\b", re.IGNORECASE)
+_FRESH_RE = re.compile(r"מחדש|ניתוח חדש|מהתחלה|\bfresh\b|\bre-?run\b|from scratch|again", re.IGNORECASE)
+# Questions about an earlier answer need the conversation; leave them to the model
+_FOLLOW_UP_RE = re.compile(
+    r"^\s*(?:ו?למה|ומה|ואיך|ואם|אותו|אותה|כמו קודם|why|what about|and |same\b|also\b)|"
+    r"\b(?:שאמרת|קודם|הקודם|הנ\"ל|previous|above|you said|that one)\b",
+    re.IGNORECASE,
+)
+# Requests the orchestrator answers differently (schema questions, SQL, other brands' data)
+_OUT_OF_SCOPE_RE = re.compile(r"טבל|סכמה|\bsql\b|schema|tables?\b|מה קיים|what exists", re.IGNORECASE)
+
+
+class Intent(NamedTuple):
+    specialists: List[str]
+    needs_data: bool
+    plot: bool
+    use_cache: bool
+    confidence: float
+    reasons: List[str]
+
+    @property
+    def label(self) -> str:
+        return "+".join(self.specialists) + ("+plot" if self.plot else "")
+
+
+def classify_intent(text: str, has_history: bool = False) -> Intent:
+    """Plans the pipeline for a user request and scores how sure the plan is (0-1)."""
+    performance = bool(_PERFORMANCE_RE.search(text))
+    creative = bool(_CREATIVE_RE.search(text))
+    metric = bool(_METRIC_RE.search(text))
+    research = bool(_RESEARCH_RE.search(text))
+    confidence, reasons = 1.0, []
+
+    if not (performance or creative or metric or research):
+        return Intent([], False, False, True, 0.0, ["no known intent"])
+
+    specialists: List[str] = []
+    if creative and performance and not _BOTH_RE.search(text):
+        # Creative and performance cues without asking for both: the model picks one
+        confidence -= 0.4
+        reasons.append("performance/creative ambiguous")
+    if creative:
+        specialists.append("creative")
+    if performance and (not creative or _BOTH_RE.search(text)):
+        specialists.insert(0, "performance")
+    if not specialists and metric:
+        specialists.append("performance")
+        confidence -= 0.1
+        reasons.append("metrics only")
+    if research:
+        specialists.append("research")
+
+    if _FOLLOW_UP_RE.search(text):
+        confidence -= 0.5
+        reasons.append("follow-up")
+    if _OUT_OF_SCOPE_RE.search(text):
+        confidence -= 0.5
+        reasons.append("schema/sql question")
+    if len(re.findall(r"\w+", text)) < 3:
+        confidence -= 0.3
+        reasons.append("too short")
+    if has_history:
+        confidence -= 0.15
+        reasons.append("has history")
+
+    return Intent(
+        specialists=specialists,
+        needs_data=specialists != ["research"],
+        plot=bool(_PLOT_RE.search(text)),
+        use_cache=not _FRESH_RE.search(text),
+        confidence=round(max(confidence, 0.0), 2),
+        reasons=reasons,
+    )
+
+
+def plan_steps(intent: Intent) -> List[str]:
+    """Tool calls the orchestrator makes for `intent`, in order."""
+    steps = ["data_agent"] if intent.needs_data else []
+    steps.append("run_specialists")
+    if intent.plot and intent.needs_data:
+        steps.append("plot_and_save_artifacts")
+    return steps
+
+
+# --- Plot specs ---
+
+_METRIC_COLUMNS = ("cost", "leads", "cpl", "ctr", "clicks", "impressions")
+_DIMENSIONS = ("platform", "ad_name", "campaign_name")
+
+
+def _label(column: str) -> str:
+    return column.upper() if column in ("cpl", "ctr") else column.replace("_", " ").title()
+
+
+def default_plots(data_payload: Dict[str, Any], intent: Intent) -> List[Dict[str, Any]]:
+    """Plot specs for the data agent's result, chosen the way the orchestrator prompt describes."""
+    data = data_payload.get("data") or {}
+    columns = list(data.get("columns") or [])
+    if "creative" in intent.specialists and {"ad_name", "date", "impressions", "clicks"} <= set(columns):
+        return [{"chart_type": "fatigue", "title": "Creative Fatigue Scores"}]
+    values = [c for c in _METRIC_COLUMNS if c in columns][:2]
+    if not values:
+        return []
+    dimension = next((c for c in _DIMENSIONS if c in columns), None)
+    if "date" in columns:
+        by = f" by {_label(dimension)}" if dimension else ""
+        return [{"chart_type": "line", "x": "date", "y": [v], "group_by": dimension, "title": f"Daily {_label(v)}{by}"} for v in values]
+    if dimension:
+        return [{"chart_type": "bar", "x": dimension, "y": [values[0]], "group_by": None, "title": f"{_label(values[0])} by {_label(dimension)}"}]
+    return []
+
+
+# --- before_model_callback ---
+
+def _parse_response(response: Any) -> Any:
+    """AgentTool responses are {"result": "<final text>"}; the data agent answers in JSON."""
+    if isinstance(response, dict) and set(response) == {"result"}:
+        response = response["result"]
+    if isinstance(response, str):
+        try:
+            return json.loads(response)
+        except ValueError:
+            return response
+    return response
+
+
+def _current_turn(llm_request: Any) -> Optional[Tuple[str, bool, List[types.Content]]]:
+    """(user text, has earlier turns, contents after it) for the turn being answered."""
+    contents = getattr(llm_request, "contents", None) or []
+    for i in range(len(contents) - 1, -1, -1):
+        parts = contents[i].parts or []
+        if contents[i].role == "user" and any(p.text for p in parts) and not any(p.function_response for p in parts):
+            return "".join(p.text or "" for p in parts), i > 0, contents[i + 1:]
+    return None
+
+
+def _function_call(name: str, args: Dict[str, Any]) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))]))
+
+
+def _next_call(intent: Intent, question: str, after: List[types.Content]) -> Optional[LlmResponse]:
+    calls = [p.function_call.name for c in after for p in (c.parts or []) if p.function_call]
+    responses = {p.function_response.name: _parse_response(p.function_response.response) for c in after for p in (c.parts or []) if p.function_response}
+    steps = plan_steps(intent)
+    if any(p.text for c in after if c.role == "model" for p in (c.parts or [])) or calls != steps[:len(calls)]:
+        # The model has taken over this turn
+        return None
+    if len(calls) == len(steps):
+        return None
+
+    step = steps[len(calls)]
+    if step == "data_agent":
+        return _function_call("data_agent", {"request": json.dumps({"brand_context": BRAND, "user_request": question}, ensure_ascii=False)})
+
+    data = responses.get("data_agent")
+    if intent.needs_data and not (isinstance(data, dict) and data.get("status") == "SUCCESS"):
+        # Errors and clarification questions are relayed by the model
+        return None
+    if step == "run_specialists":
+        request = {"brand_context": BRAND, "user_request": question}
+        if intent.needs_data:
+            request["data_payload"] = data
+        args = {"request": json.dumps(request, ensure_ascii=False, default=str), "specialists": intent.specialists}
+        if not intent.use_cache:
+            args["use_cache"] = False
+        return _function_call("run_specialists", args)
+
+    plots = default_plots(data, intent)
+    if not plots:
+        return None
+    return _function_call("plot_and_save_artifacts", {"data_payload": data, "plots": plots})
+
+
+async def route_orchestrator(callback_context: Any, llm_request: Any) -> Optional[LlmResponse]:
+    """
+    before_model_callback: makes the orchestrator's next tool call for high-confidence
+    intents; returns None (the model decides) otherwise and for the final answer.
+    """
+    if not ROUTER_ENABLED:
+        return None
+    turn = _current_turn(llm_request)
+    if turn is None:
+        return None
+    question, has_history, after = turn
+    intent = classify_intent(question, has_history)
+    routed = intent.confidence >= ROUTER_MIN_CONFIDENCE
+    if not after:
+        metrics.inc(
+            "tami4_router_decisions_total", help="Orchestrator requests planned by the intent router vs the model.",
+            intent=intent.label or "none", routed=routed,
+        )
+        logger.info(f"Intent {intent.label or 'none'} confidence={intent.confidence} routed={routed} {intent.reasons}")
+    if not routed:
+        return None
+    try:
+        return _next_call(intent, question, after)
+    except Exception as e:
+        logger.warning(f"Intent router failed, the model plans this request: {e}")
+        return None
@@ -2,6 +2,8 @@ import os
 from google.adk.agents import LlmAgent
 from google.genai import types
 from .prompts import INSTRUCTION
+from .fatigue import precompute_fatigue
+from ...tools.response_cache import response_cache
 
 agent = LlmAgent(
     name="creative_agent",
@@ -13,4 +15,8 @@ agent = LlmAgent(
         temperature=0.2, 
         response_mime_type="application/json"
     ),
+    # Identical analyses of the same data payload are answered from the response cache;
+    # otherwise every creative is fatigue-scored up front so the model only narrates
+    before_model_callback=[response_cache.before_model, precompute_fatigue],
+    after_model_callback=response_cache.after_model,
 )
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from ...tools.datasets import resolve_payload
+from ...tools.lazy import lazy_import
+from ...tools.payload import encode_columnar, find_request_payload, payload_rows, replace_request_text
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+CREATIVE_PRECOMPUTE = os.getenv("CREATIVE_PRECOMPUTE", "true").strip().lower() not in ("0", "false", "no", "off")
+FATIGUE_WINDOW_DAYS = int(os.getenv("FATIGUE_WINDOW_DAYS", "7"))
+# Rolling windows with fewer impressions are too noisy to compare CTRs
+FATIGUE_MIN_WINDOW_IMPRESSIONS = int(os.getenv("FATIGUE_MIN_WINDOW_IMPRESSIONS", "500"))
+# Creatives below this lifetime volume get a proportionally lower score
+FATIGUE_MIN_IMPRESSIONS = int(os.getenv("FATIGUE_MIN_IMPRESSIONS", "5000"))
+FATIGUE_TOP_N = int(os.getenv("FATIGUE_TOP_N", "20"))
+PREVIEW_ROWS = 5
+
+FATIGUE_FORMAT = "creative_fatigue/v1"
+ID_COLUMNS = ("ad_name", "creative_id", "ad_id", "ad_url")
+TIME_COLUMNS = ("date", "day", "ds")
+URL_COLUMNS = ("ad_url", "creative_url", "image_url", "video_url", "media_url")
+
+# Score weights (sum to 1)
+W_DECLINE = 0.45
+W_CPL = 0.25
+W_AGE = 0.15
+W_EXPOSURE = 0.15
+
+
+def _ratio(num: "np.ndarray", den: "np.ndarray", min_den: float = 0) -> "np.ndarray":
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=den > min_den)
+    return out
+
+
+def _rolling_sum(matrix: "np.ndarray", window: int) -> "np.ndarray":
+    """Trailing window sums along the day axis via cumulative sums: shape (n, days - window + 1)."""
+    cs = np.cumsum(matrix, axis=1)
+    cs = np.concatenate([np.zeros((matrix.shape[0], 1)), cs], axis=1)
+    return cs[:, window:] - cs[:, :-window]
+
+
+def _take(matrix: "np.ndarray", idx: "np.ndarray") -> "np.ndarray":
+    return matrix[np.arange(matrix.shape[0]), idx]
+
+
+def fatigue_frame(df: "pd.DataFrame") -> Optional["pd.DataFrame"]:
+    """
+    Scores every creative in a daily creative time series in one batched pass.
+
+    Per creative: rolling-window CTR peak vs current (decay), rolling CPL at the CTR
+    peak vs current, days since the CTR peak, and exposure after the peak (frequency when
+    `reach`/`frequency` is present, else the share of impressions served after the peak).
+    Returns one row per creative sorted by fatigue_score (0-100), or None when the
+    frame has no creative id, date, impressions and clicks.
+    """
+    df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
+    id_col = next((c for c in ID_COLUMNS if c in df.columns), None)
+    time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+    if id_col is None or time_col is None or not {"impressions", "clicks"} <= set(df.columns):
+        return None
+
+    days = pd.to_datetime(df[time_col], errors="coerce").dt.normalize()
+    valid = days.notna().to_numpy() & df[id_col].notna().to_numpy()
+    if not valid.any():
+        return None
+    df, days = df[valid], days[valid]
+
+    # Dense creative x day matrices through bincount on flattened (creative, day) codes
+    ids, creatives = pd.factorize(df[id_col], sort=False)
+    first_day = days.min()
+    day_idx = (days - first_day).dt.days.to_numpy()
+    n, d = len(creatives), int(day_idx.max()) + 1
+    flat = ids * d + day_idx
+
+    def matrix(col: str) -> Optional["np.ndarray"]:
+        if col not in df.columns:
+            return None
+        values = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        return np.bincount(flat, weights=values, minlength=n * d).reshape(n, d)
+
+    impressions, clicks = matrix("impressions"), matrix("clicks")
+    cost, leads, reach = matrix("cost"), matrix("leads"), matrix("reach")
+
+    window = max(1, min(FATIGUE_WINDOW_DAYS, d))
+    impr_w = _rolling_sum(impressions, window)
+    ctr_w = _ratio(_rolling_sum(clicks, window), impr_w, FATIGUE_MIN_WINDOW_IMPRESSIONS - 1)
+    has_ctr = np.isfinite(ctr_w)
+    scored = has_ctr.any(axis=1)
+
+    peak_idx = np.argmax(np.where(has_ctr, ctr_w, -np.inf), axis=1)
+    last_idx = ctr_w.shape[1] - 1 - np.argmax(has_ctr[:, ::-1], axis=1)
+    ctr_peak, ctr_current = _take(ctr_w, peak_idx), _take(ctr_w, last_idx)
+    decline = np.clip(1 - _ratio(ctr_current, ctr_peak), 0, 1)
+
+    if cost is not None and leads is not None:
+        # CPL in the peak-CTR window vs now (a rolling minimum would be biased by noise)
+        cpl_w = _ratio(_rolling_sum(cost, window), _rolling_sum(leads, window))
+        cpl_peak, cpl_current = _take(cpl_w, peak_idx), _take(cpl_w, last_idx)
+        cpl_increase = np.clip(_ratio(cpl_current, cpl_peak) - 1, 0, None)
+    else:
+        cpl_peak = cpl_current = cpl_increase = np.full(n, np.nan)
+
+    days_since_peak = (last_idx - peak_idx).astype("float64")
+    horizon = max(14.0, d / 2)
+
+    if reach is not None and (reach > 0).any():
+        freq_w = _ratio(impr_w, _rolling_sum(reach, window))
+        frequency = _take(freq_w, last_idx)
+        exposure = np.clip(_ratio(frequency, _take(freq_w, peak_idx)) - 1, 0, 1)
+    elif "frequency" in df.columns:
+        freq_w = _ratio(_rolling_sum(matrix("frequency"), window), _rolling_sum((impressions > 0).astype("float64"), window))
+        frequency = _take(freq_w, last_idx)
+        exposure = np.clip(_ratio(frequency, _take(freq_w, peak_idx)) - 1, 0, 1)
+    else:
+        cum = np.cumsum(impressions, axis=1)
+        # Cumulative impressions at the end of the peak window vs at the latest window
+        at_peak = _take(cum, peak_idx + window - 1)
+        at_last = _take(cum, last_idx + window - 1)
+        frequency = np.full(n, np.nan)
+        exposure = np.clip(_ratio(at_last - at_peak, at_last), 0, 1)
+
+    total_impressions = impressions.sum(axis=1)
+    confidence = np.clip(total_impressions / max(FATIGUE_MIN_IMPRESSIONS, 1), 0, 1)
+    freq_adjusted_decline = decline * (0.5 + 0.5 * np.nan_to_num(exposure))
+    score = 100 * confidence * (
+        W_DECLINE * freq_adjusted_decline
+        + W_CPL * np.nan_to_num(np.clip(cpl_increase, 0, 1))
+        + W_AGE * np.clip(days_since_peak / horizon, 0, 1) * (decline > 0)
+        + W_EXPOSURE * np.nan_to_num(exposure) * (decline > 0)
+    )
+    score = np.where(scored, score, np.nan)
+
+    window_end = first_day + pd.to_timedelta(np.arange(ctr_w.shape[1]) + window - 1, unit="D")
+    out = pd.DataFrame({
+        id_col: creatives.astype(str),
+        "fatigue_score": np.round(score, 1),
+        "status": np.where(score >= 60, "fatigued", np.where(score >= 35, "watch", "healthy")),
+        "ctr_peak": ctr_peak,
+        "ctr_current": ctr_current,
+        "ctr_decay_pct": np.round(decline * 100, 1),
+        "cpl_at_peak": cpl_peak,
+        "cpl_current": cpl_current,
+        "cpl_increase_pct": np.round(cpl_increase * 100, 1),
+        "peak_date": window_end[peak_idx].strftime("%Y-%m-%d"),
+        "days_since_peak": days_since_peak.astype(int),
+        "post_peak_exposure": np.round(exposure, 3),
+        "frequency": frequency,
+        "impressions": total_impressions,
+        "cost": cost.sum(axis=1) if cost is not None else np.nan,
+    })
+    out.loc[~scored, "status"] = "insufficient_data"
+    url_col = next((c for c in URL_COLUMNS if c in df.columns and c != id_col), None)
+    if url_col:
+        # Row position of each creative's first occurrence (reverse assignment keeps the earliest)
+        first = np.empty(n, dtype="int64")
+        first[ids[::-1]] = np.arange(len(ids) - 1, -1, -1)
+        out[url_col] = df[url_col].to_numpy()[first]
+    return out.sort_values("fatigue_score", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def compute_fatigue(columns: List[str], rows: List[Dict[str, Any]], top_n: int = FATIGUE_TOP_N) -> Optional[Dict[str, Any]]:
+    """Ranked fatigue scores for the creative agent: counts per status and the top_n most fatigued."""
+    if not rows:
+        return None
+    scores = fatigue_frame(pd.DataFrame(rows, columns=columns or None))
+    if scores is None or scores.empty:
+        return None
+    ranked = scores.head(top_n).round({"ctr_peak": 5, "ctr_current": 5, "cpl_at_peak": 2, "cpl_current": 2, "frequency": 2, "cost": 2})
+    ranked = ranked.astype(object).where(ranked.notna(), None)
+    return {
+        "format": FATIGUE_FORMAT,
+        "window_days": FATIGUE_WINDOW_DAYS,
+        "creatives_scored": int(len(scores)),
+        "status_counts": {k: int(v) for k, v in scores["status"].value_counts().items()},
+        "score_scale": "0-100; fatigued >= 60, watch >= 35",
+        "ranking": ranked.to_dict(orient="records"),
+    }
+
+
+async def precompute_fatigue(callback_context: Any, llm_request: Any) -> None:
+    """
+    before_model_callback: scores every creative in the data payload and adds the
+    ranking to the prompt as a FATIGUE_SCORES block.
+    """
+    if not CREATIVE_PRECOMPUTE:
+        return None
+    found = find_request_payload(llm_request)
+    if found is None:
+        return None
+    ci, pi, request, data_payload = found
+    if data_payload.get("status") == "ERROR":
+        return None
+    try:
+        resolved = await resolve_payload(data_payload, callback_context)
+        columns, rows = payload_rows(resolved)
+        fatigue = await asyncio.to_thread(compute_fatigue, columns, rows)
+    except Exception as e:
+        logger.warning(f"Fatigue precompute failed, the model will work from the raw rows: {e}")
+        return None
+    if fatigue is None:
+        return None
+
+    if len(rows) > PREVIEW_ROWS:
+        # The daily series is summarized by the scores; keep only a preview in the prompt
+        data_payload = dict(data_payload, data={
+            "omitted": "Daily rows summarized in FATIGUE_SCORES; preview only.",
+            "row_count": len(rows),
+            "columns": columns,
+            "preview": encode_columnar(rows[:PREVIEW_ROWS], columns),
+        })
+        request = dict(request, data_payload=data_payload)
+    text = json.dumps(request, ensure_ascii=False, default=str)
+    text += "\n\nFATIGUE_SCORES:\n" + json.dumps(fatigue, ensure_ascii=False, separators=(",", ":"), default=str)
+    replace_request_text(llm_request, ci, pi, text)
+    return None
@@ -25,6 +25,19 @@ LANGUAGE REQUIREMENT
 - ALL output MUST be in Hebrew.
 - Mention תמי4 explicitly in Summary and Recommendations.
 
+DATA PAYLOAD FORMAT
+- data_payload.data is usually "columnar/v1": "columns", "dtypes", and "data" with one array per column (same row order across arrays).
+- Columns listed in "dictionaries" hold integer codes: value = dictionaries[column][code] (null stays null).
+- Refer to entities (platforms, creatives, dates) by their decoded values, never by codes.
+- Large datasets arrive as an "artifact_ref/v1" handle instead: use its "summary" (per-column min/max/sum/mean, top values) and "preview" rows, plus any precomputed metrics provided.
+
+FATIGUE SCORES
+- For daily creative data the request ends with a "FATIGUE_SCORES" JSON block ("creative_fatigue/v1"), computed over ALL creatives:
+  - ranking: the most fatigued creatives first, with fatigue_score (0-100), status (fatigued|watch|healthy),
+    ctr_peak/ctr_current/ctr_decay_pct, cpl_at_peak/cpl_current/cpl_increase_pct, peak_date, days_since_peak, post_peak_exposure.
+  - status_counts: how many creatives fall in each status.
+- When present, build fatigue_he from this ranking VERBATIM (use peak_date as when_detected); do NOT eyeball fatigue from preview rows.
+
 RENDERING REQUIREMENT (IMPORTANT)
 - If data_payload contains creative URLs (ad_url / creative_url / image_url / video_url), ensure they are preserved in the "evidence" fields.
 
@@ -3,7 +3,14 @@ from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
 from google.genai import types
 from .prompts import INSTRUCTION
-from .tools import get_bigquery_toolset
+from .tools import LazyBigQueryToolset
+from .cache import before_execute_sql, after_execute_sql
+from .catalog import inject_schema_digest, note_sql_error, serve_discovery
+from .client import gate_execute_sql
+from .rewriter import annotate_query_rewrite, rewrite_execute_sql
+from .templates import template_fast_path
+from ...tools.payload import compact_tool_response
+from ...tools.datasets import offload_large_result
 
 load_dotenv()
 
@@ -13,11 +20,22 @@ agent_kwargs = dict(
     name="data_agent",
     description="Queries BigQuery (read-only) and returns structured JSON results for the orchestrator.",
     instruction=INSTRUCTION,
-    tools=[get_bigquery_toolset()],
+    tools=[LazyBigQueryToolset()],
     generate_content_config=types.GenerateContentConfig(
         temperature=0.0,
         top_p=1.0,
     ),
+    # Known query shapes are answered from SQL templates without an LLM call
+    before_agent_callback=template_fast_path,
+    # The MARTS schema digest goes into the instruction; discovery calls are answered
+    # from the same local snapshot until an execute_sql call fails
+    before_model_callback=inject_schema_digest,
+    # Serve repeated execute_sql calls from the query result cache before anything else,
+    # otherwise rewrite them for partition pruning and dry-run them against the bytes
+    # budget, then hand the model an artifact handle (large results) or a compact
+    # columnar result
+    before_tool_callback=[serve_discovery, before_execute_sql, rewrite_execute_sql, gate_execute_sql],
+    after_tool_callback=[note_sql_error, annotate_query_rewrite, after_execute_sql, offload_large_result, compact_tool_response],
 )
 
 agent = LlmAgent(**agent_kwargs)
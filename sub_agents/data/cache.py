@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ...tools.cache import LRUCache
+from .client import get_bigquery_client
+from .tools import PROJECT_ID, _as_int, _env
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+QUERY_CACHE_ENABLED = (_env("QUERY_CACHE_ENABLED", "true") or "").lower() not in ("0", "false", "no")
+QUERY_CACHE_MAX_ENTRIES = _as_int("QUERY_CACHE_MAX_ENTRIES", 256)
+QUERY_CACHE_TTL_SECONDS = _as_int("QUERY_CACHE_TTL_SECONDS", 6 * 3600)
+QUERY_CACHE_METADATA_TTL_SECONDS = _as_int("QUERY_CACHE_METADATA_TTL_SECONDS", 60)
+# Bounds on the estimated (JSON) size of cached results: in total, and per result; larger
+# results (e.g. a fatigue scan of every creative's daily series) are not cached
+QUERY_CACHE_MAX_BYTES = _as_int("QUERY_CACHE_MAX_BYTES", 128 * 1024 * 1024)
+QUERY_CACHE_MAX_RESULT_BYTES = _as_int("QUERY_CACHE_MAX_RESULT_BYTES", 16 * 1024 * 1024)
+# Rows serialized to estimate a result's size
+_SIZE_SAMPLE_ROWS = 64
+
+# Quoted segments are kept verbatim; everything else is case/whitespace-normalized.
+_QUOTED_RE = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+_LINE_COMMENT_RE = re.compile(r"(--|#)[^\n]*")
+_BLOCK_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+# Functions whose value changes within a day make a query uncacheable.
+_VOLATILE_RE = re.compile(
+    r"\b(current_timestamp|current_datetime|current_time|rand|generate_uuid|session_user)\s*\(",
+    re.IGNORECASE,
+)
+_CURRENT_DATE_RE = re.compile(r"\bcurrent_date\s*\(\s*(?:'[^']*')?\s*\)", re.IGNORECASE)
+_RELATIVE_DATE_RE = re.compile(
+    r"\bdate_(sub|add)\s*\(\s*current_date\s*\(\s*(?:'[^']*')?\s*\)\s*,\s*interval\s+(\d+)\s+(day|week|month|year)\s*\)",
+    re.IGNORECASE,
+)
+_TABLE_RE = re.compile(
+    r"\b(?:from|join)\s+`?([\w-]+(?:`?\.`?[\w-]+){1,2})`?",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a query for cache keys: comments stripped, whitespace collapsed,
+    keywords/identifiers lowercased, quoted literals and backtick identifiers untouched.
+    """
+    parts = _QUOTED_RE.split(sql or "")
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            out.append(part)
+            continue
+        part = _BLOCK_COMMENT_RE.sub(" ", part)
+        part = _LINE_COMMENT_RE.sub(" ", part)
+        part = re.sub(r"\s+", " ", part)
+        out.append(re.sub(r" ?([(),=<>]) ?", r"\1", part).lower())
+    return "".join(out).strip().rstrip(";").strip()
+
+
+def _shift(anchor: date, op: str, amount: int, unit: str) -> date:
+    sign = -1 if op.lower() == "sub" else 1
+    unit = unit.lower()
+    if unit == "day":
+        return anchor + timedelta(days=sign * amount)
+    if unit == "week":
+        return anchor + timedelta(weeks=sign * amount)
+    months = sign * amount * (12 if unit == "year" else 1)
+    month_index = anchor.year * 12 + anchor.month - 1 + months
+    year, month = divmod(month_index, 12)
+    # Clamp to month end the same way BigQuery does
+    for day in range(anchor.day, 27, -1):
+        try:
+            return date(year, month + 1, day)
+        except ValueError:
+            continue
+    return date(year, month + 1, min(anchor.day, 28))
+
+
+def resolve_date_window(sql: str, today: Optional[date] = None) -> Tuple[str, ...]:
+    """
+    Resolves CURRENT_DATE()-relative expressions to concrete dates.
+
+    Returns an empty tuple for queries that only use literal dates, so their key is
+    stable across days; relative windows produce a key that rolls over at midnight UTC.
+    """
+    if not _CURRENT_DATE_RE.search(sql or ""):
+        return ()
+    today = today or datetime.now(timezone.utc).date()
+    resolved = [
+        _shift(today, op, int(amount), unit).isoformat()
+        for op, amount, unit in _RELATIVE_DATE_RE.findall(sql)
+    ]
+    return tuple(sorted(set(resolved))) + (f"today={today.isoformat()}",)
+
+
+def referenced_tables(sql: str, project_id: Optional[str] = None) -> List[str]:
+    """Fully-qualified `project.dataset.table` ids referenced in FROM/JOIN clauses."""
+    tables = set()
+    for ref in _TABLE_RE.findall(sql or ""):
+        parts = ref.replace("`", "").split(".")
+        if len(parts) == 2 and (project_id or PROJECT_ID):
+            parts = [project_id or PROJECT_ID] + parts
+        if len(parts) == 3:
+            tables.add(".".join(parts))
+    return sorted(tables)
+
+
+def is_cacheable(sql: str) -> bool:
+    if not sql or _VOLATILE_RE.search(sql):
+        return False
+    return "information_schema" not in sql.lower()
+
+
+def result_size(result: Dict[str, Any]) -> int:
+    """Estimated JSON size of an execute_sql result, extrapolated from a sample of its rows."""
+    rows = result.get("rows") or []
+    if not isinstance(rows, list):
+        rows = []
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sampled = len(json.dumps(sample, ensure_ascii=False, default=str).encode("utf-8")) if sample else 0
+    return sampled * len(rows) // max(len(sample), 1) + 256
+
+
+def _bigquery_table_version(table_id: str) -> Optional[str]:
+    modified = get_bigquery_client().get_table(table_id).modified
+    return modified.isoformat() if modified else None
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of execute_sql results.
+
+    Each entry remembers the last-modified time of every source table at store time;
+    a lookup whose tables have since changed is treated as a miss and evicted. A query
+    that was rewritten before it ran is also found under the model's original SQL,
+    which maps to the SQL that actually ran.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = 6 * 3600,
+        metadata_ttl_seconds: Optional[float] = 60,
+        table_version_fn: Callable[[str], Optional[str]] = _bigquery_table_version,
+        max_bytes: Optional[int] = None,
+        max_result_bytes: Optional[int] = None,
+    ):
+        self._entries = LRUCache(
+            max_entries=max_entries, ttl_seconds=ttl_seconds, max_bytes=max_bytes, sizeof=lambda entry: entry["bytes"]
+        )
+        self.max_result_bytes = max_result_bytes
+        # key of the original SQL -> the SQL that ran in its place
+        self._aliases = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._table_versions = LRUCache(max_entries=1024, ttl_seconds=metadata_ttl_seconds)
+        self._table_version_fn = table_version_fn
+
+    def key_for(self, sql: str, project_id: Optional[str] = None, today: Optional[date] = None) -> Optional[str]:
+        if not is_cacheable(sql):
+            return None
+        window = "|".join(resolve_date_window(sql, today))
+        raw = f"{project_id or ''}\n{normalize_sql(sql)}\n{window}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _versions(self, tables: List[str]) -> Dict[str, Optional[str]]:
+        versions = {}
+        for table_id in tables:
+            if table_id in self._table_versions:
+                versions[table_id] = self._table_versions.get(table_id)
+                continue
+            try:
+                version = self._table_version_fn(table_id)
+            except Exception as e:
+                logger.warning(f"Could not read last-modified time for {table_id}: {e}")
+                version = None
+            self._table_versions.set(table_id, version)
+            versions[table_id] = version
+        return versions
+
+    def get(self, sql: str, project_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        key = self.key_for(sql, project_id)
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            alias = self._aliases.get(key)
+            return self.get(alias, project_id) if alias is not None and alias != sql else None
+        if self._versions(list(entry["table_versions"])) != entry["table_versions"]:
+            self._entries.pop(key)
+            return None
+        return entry["result"]
+
+    def put(self, sql: str, result: Dict[str, Any], project_id: Optional[str] = None, original: Optional[str] = None) -> None:
+        """Stores the result of `sql`; `original` is the query it was rewritten from, if any."""
+        key = self.key_for(sql, project_id)
+        if key is None:
+            return
+        size = result_size(result)
+        if self.max_result_bytes is not None and size > self.max_result_bytes:
+            logger.info(f"Not caching a query result of ~{size} bytes (limit {self.max_result_bytes})")
+            return
+        tables = referenced_tables(sql, project_id)
+        self._entries.set(key, {"result": result, "table_versions": self._versions(tables), "bytes": size})
+        if original and original != sql:
+            original_key = self.key_for(original, project_id)
+            if original_key is not None and original_key != key:
+                self._aliases.set(original_key, sql)
+
+    def invalidate_table(self, table_id: str) -> None:
+        """Forces the next lookup of `table_id` to re-read its last-modified time."""
+        self._table_versions.pop(table_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._aliases.clear()
+        self._table_versions.clear()
+
+
+query_cache = QueryCache(
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+    metadata_ttl_seconds=QUERY_CACHE_METADATA_TTL_SECONDS,
+    max_bytes=QUERY_CACHE_MAX_BYTES,
+    max_result_bytes=QUERY_CACHE_MAX_RESULT_BYTES,
+)
+
+
+def _is_cacheable_call(tool: Any, args: Dict[str, Any]) -> bool:
+    return QUERY_CACHE_ENABLED and getattr(tool, "name", None) == "execute_sql" and not args.get("dry_run")
+
+
+# The model's SQL by function call, for storing the result under it as well when a
+# later before_tool callback rewrites args["query"]
+_original_queries = LRUCache(max_entries=256, ttl_seconds=600)
+
+
+def _call_id(tool_context: Any) -> Optional[str]:
+    return getattr(tool_context, "function_call_id", None)
+
+
+async def before_execute_sql(tool: Any, args: Dict[str, Any], tool_context: Any) -> Optional[Dict[str, Any]]:
+    """
+    before_tool_callback: serves execute_sql from the cache, skipping the BigQuery job.
+    Runs before the rewrite and the cost gate, so a hit pays no dry runs either. The
+    lookup may read table metadata from BigQuery, so it runs off the event loop.
+    """
+    if not _is_cacheable_call(tool, args):
+        return None
+    sql = args.get("query", "")
+    cached = await asyncio.to_thread(query_cache.get, sql, args.get("project_id"))
+    if cached is None:
+        if _call_id(tool_context):
+            _original_queries.set(_call_id(tool_context), sql)
+        return None
+    return dict(cached, cache_hit=True)
+
+
+async def after_execute_sql(
+    tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any
+) -> Optional[Dict[str, Any]]:
+    """
+    after_tool_callback: stores successful execute_sql results under the SQL that ran and
+    the model's SQL (off the event loop, like the lookup).
+    """
+    if not _is_cacheable_call(tool, args):
+        return None
+    original = _original_queries.pop(_call_id(tool_context)) if _call_id(tool_context) else None
+    if isinstance(tool_response, dict) and tool_response.get("status") == "SUCCESS" and not tool_response.get("cache_hit"):
+        await asyncio.to_thread(
+            query_cache.put, args.get("query", ""), tool_response, args.get("project_id"), original=original
+        )
+    return None
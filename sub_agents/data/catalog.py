@@ -0,0 +1,506 @@
+"""
+Local snapshot of the MARTS schema for the data agent.
+
+The catalog is taken at startup and every SCHEMA_CATALOG_REFRESH_SECONDS: the datasets
+of the project, the tables of MARTS with their schema, partitioning, clustering and
+row counts, and per-column stats over the recent partitions (min/max of ordered
+columns, distinct count, null count, and the values of low-cardinality strings). It is
+kept in a JSON file so a restarted process has it before the first refresh finishes.
+With several workers only one process takes snapshots (tools/leader.py); the others
+reload its file.
+
+The data agent uses it in two ways:
+- `serve_discovery` (before_tool) answers list_dataset_ids / get_dataset_info /
+  list_table_ids / get_table_info for MARTS from the snapshot, without a BigQuery call;
+- `inject_schema_digest` (before_model) appends a compact digest of the tables and
+  columns to the instruction, so the first SQL uses the right names.
+
+The snapshot can be out of date. Once execute_sql fails in an invocation
+(`note_sql_error`, after_tool), that invocation's discovery calls go to BigQuery and a
+background refresh of the catalog starts.
+
+`client_fn` and `query_fn` are injectable, so a fake client (benchmarks/fakes.py) can
+stand in for BigQuery.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ...tools.cache import LRUCache
+from ...tools.leader import is_leader
+from ...tools.tracing import metrics
+from .client import get_bigquery_client
+from .executor import execute_query
+from .templates import MARTS
+from .tools import _as_int, _env
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+SCHEMA_CATALOG_ENABLED = (_env("SCHEMA_CATALOG_ENABLED", "true") or "").lower() not in ("0", "false", "no")
+SCHEMA_CATALOG_PATH = _env("SCHEMA_CATALOG_PATH", ".cache/schema_catalog.json")
+SCHEMA_CATALOG_REFRESH_SECONDS = _as_int("SCHEMA_CATALOG_REFRESH_SECONDS", 6 * 3600)
+SCHEMA_CATALOG_MAX_TABLES = _as_int("SCHEMA_CATALOG_MAX_TABLES", 50)
+# Column stats cover the partitions of the last N days (0 disables the stats queries)
+SCHEMA_CATALOG_STATS_DAYS = _as_int("SCHEMA_CATALOG_STATS_DAYS", 90)
+# String columns with at most this many distinct values have them listed in the digest
+SCHEMA_CATALOG_TOP_VALUES = _as_int("SCHEMA_CATALOG_TOP_VALUES", 8)
+SCHEMA_DIGEST_MAX_CHARS = _as_int("SCHEMA_DIGEST_MAX_CHARS", 4000)
+# A failed query refreshes a snapshot older than this
+SCHEMA_CATALOG_MIN_REFRESH_SECONDS = _as_int("SCHEMA_CATALOG_MIN_REFRESH_SECONDS", 300)
+# How often the refresh thread checks for refresh requests, and other workers for a new file
+SCHEMA_CATALOG_POLL_SECONDS = _as_int("SCHEMA_CATALOG_POLL_SECONDS", 60)
+
+DISCOVERY_TOOLS = ("list_dataset_ids", "get_dataset_info", "list_table_ids", "get_table_info")
+# Tables the prompt routes to come first in the digest
+PRIORITY_TABLES = ["mart_platforms_performance", "mart_facebook_creatives", "mart_tamhil", "mart_client_terms"]
+
+_ORDERED_TYPES = {"INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC", "DATE", "DATETIME", "TIMESTAMP"}
+_STRING_TYPES = {"STRING"}
+
+
+def _partitioning(table: Any) -> Optional[Dict[str, Any]]:
+    time_partitioning = getattr(table, "time_partitioning", None)
+    if time_partitioning is not None:
+        return {"type": getattr(time_partitioning, "type_", None) or "DAY", "field": getattr(time_partitioning, "field", None) or "_PARTITIONTIME"}
+    range_partitioning = getattr(table, "range_partitioning", None)
+    if range_partitioning is not None:
+        return {"type": "RANGE", "field": getattr(range_partitioning, "field", None)}
+    return None
+
+
+def _table_entry(table: Any) -> Dict[str, Any]:
+    modified = getattr(table, "modified", None)
+    return {
+        "table_type": getattr(table, "table_type", None) or "TABLE",
+        "columns": [
+            {
+                "name": field.name,
+                "type": (getattr(field, "field_type", None) or "STRING").upper(),
+                "mode": getattr(field, "mode", None) or "NULLABLE",
+                "description": getattr(field, "description", None),
+            }
+            for field in table.schema
+        ],
+        "partitioning": _partitioning(table),
+        "clustering": list(getattr(table, "clustering_fields", None) or []),
+        "num_rows": getattr(table, "num_rows", None),
+        "num_bytes": getattr(table, "num_bytes", None),
+        "modified": modified.isoformat() if modified else None,
+        # What get_table_info returns
+        "info": table.to_api_repr(),
+    }
+
+
+def _stat_columns(entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        c for c in entry["columns"]
+        if c["mode"] != "REPEATED" and (c["type"] in _ORDERED_TYPES or c["type"] in _STRING_TYPES)
+    ]
+
+
+def _window(entry: Dict[str, Any], days: int) -> str:
+    partitioning = entry.get("partitioning") or {}
+    field = partitioning.get("field")
+    types_by_name = {c["name"]: c["type"] for c in entry["columns"]}
+    if field and types_by_name.get(field) == "DATE":
+        return f" WHERE `{field}` >= DATE_SUB(CURRENT_DATE(), INTERVAL {days} DAY)"
+    return ""
+
+
+def stats_sql(table_id: str, entry: Dict[str, Any], days: int) -> Optional[str]:
+    """One aggregate query for the stats of every scalar column over the recent partitions."""
+    columns = _stat_columns(entry)
+    if not columns:
+        return None
+    exprs = ["COUNT(*) AS row_count"]
+    for c in columns:
+        # Quoted, so columns named like reserved words (`select`, `order`, ...) work
+        name = c["name"]
+        if c["type"] in _ORDERED_TYPES:
+            exprs += [f"MIN(`{name}`) AS `{name}__min`", f"MAX(`{name}`) AS `{name}__max`"]
+        exprs.append(f"APPROX_COUNT_DISTINCT(`{name}`) AS `{name}__distinct`")
+        exprs.append(f"COUNT(*) - COUNT(`{name}`) AS `{name}__nulls`")
+    return f"SELECT {', '.join(exprs)} FROM `{table_id}`{_window(entry, days)}"
+
+
+def values_sql(table_id: str, entry: Dict[str, Any], columns: List[str], days: int) -> str:
+    where = _window(entry, days)
+    return " UNION ALL ".join(
+        f"SELECT '{name}' AS column_name, `{name}` AS value FROM `{table_id}`{where} GROUP BY `{name}`" for name in columns
+    )
+
+
+def _column_stats(table_id: str, entry: Dict[str, Any], query_fn: Callable[[str], Dict[str, Any]], days: int) -> Dict[str, Any]:
+    sql = stats_sql(table_id, entry, days)
+    if sql is None:
+        return {}
+    result = query_fn(sql)
+    if result.get("status") != "SUCCESS" or not result.get("rows"):
+        raise RuntimeError(result.get("error_details") or "empty stats result")
+    row = result["rows"][0]
+    stats: Dict[str, Any] = {"window_days": days if _window(entry, days) else None, "row_count": row.get("row_count"), "columns": {}}
+    for c in _stat_columns(entry):
+        name = c["name"]
+        stats["columns"][name] = {
+            k: row.get(f"{name}__{k}") for k in ("min", "max", "distinct", "nulls") if f"{name}__{k}" in row
+        }
+
+    low_cardinality = [
+        c["name"] for c in _stat_columns(entry)
+        if c["type"] in _STRING_TYPES and 0 < (stats["columns"][c["name"]].get("distinct") or 0) <= SCHEMA_CATALOG_TOP_VALUES
+    ]
+    if low_cardinality:
+        result = query_fn(values_sql(table_id, entry, low_cardinality, days))
+        if result.get("status") == "SUCCESS":
+            for r in result.get("rows") or []:
+                if r.get("value") is not None:
+                    stats["columns"][r["column_name"]].setdefault("values", []).append(str(r["value"]))
+            for name in low_cardinality:
+                stats["columns"][name].get("values", []).sort()
+    return stats
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+class SchemaCatalog:
+    """
+    Snapshot of one dataset's metadata. `refresh()` replaces the snapshot as a whole,
+    so readers never see a half-built one.
+    """
+
+    def __init__(
+        self,
+        dataset: str = MARTS,
+        path: Optional[str] = SCHEMA_CATALOG_PATH,
+        client_fn: Callable[[], Any] = get_bigquery_client,
+        query_fn: Optional[Callable[[str], Dict[str, Any]]] = None,
+        stats_days: int = SCHEMA_CATALOG_STATS_DAYS,
+        max_tables: int = SCHEMA_CATALOG_MAX_TABLES,
+    ):
+        self.project, self.dataset = dataset.split(".")
+        self.path = path
+        self.client_fn = client_fn
+        self.query_fn = query_fn or (lambda sql: execute_query(sql, project_id=self.project, max_rows=None, use_cache=False))
+        self.stats_days = stats_days
+        self.max_tables = max_tables
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._digest: Optional[str] = None
+        self._loaded_mtime: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        return self._snapshot
+
+    def age_seconds(self) -> Optional[float]:
+        return None if self._snapshot is None else time.time() - self._snapshot["created"]
+
+    def _set(self, snapshot: Dict[str, Any]) -> None:
+        self._snapshot = snapshot
+        self._digest = None
+
+    def refresh(self) -> Dict[str, Any]:
+        """Takes a new snapshot (one refresh at a time) and persists it."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            client = self.client_fn()
+            dataset_ref = f"{self.project}.{self.dataset}"
+            snapshot: Dict[str, Any] = {
+                "created": time.time(),
+                "project": self.project,
+                "dataset": self.dataset,
+                "datasets": [d.dataset_id for d in client.list_datasets(self.project)],
+                "dataset_info": client.get_dataset(dataset_ref).to_api_repr(),
+                "tables": {},
+            }
+            names = [t.table_id for t in client.list_tables(dataset_ref)]
+            snapshot["table_ids"] = names
+            names = sorted(names, key=lambda n: (PRIORITY_TABLES.index(n) if n in PRIORITY_TABLES else len(PRIORITY_TABLES), n))
+            for name in names[:self.max_tables]:
+                table_id = f"{dataset_ref}.{name}"
+                try:
+                    entry = _table_entry(client.get_table(table_id))
+                except Exception as e:
+                    logger.warning(f"Schema catalog skipped {table_id}: {e}")
+                    continue
+                # Stats of a view would run its query
+                if self.stats_days > 0 and entry["table_type"] == "TABLE":
+                    try:
+                        entry["stats"] = _column_stats(table_id, entry, self.query_fn, self.stats_days)
+                    except Exception as e:
+                        logger.info(f"No column stats for {table_id}: {e}")
+                snapshot["tables"][name] = entry
+            self._set(snapshot)
+            self._save(snapshot)
+            elapsed = time.perf_counter() - started
+            metrics.observe("tami4_schema_catalog_refresh_seconds", elapsed, help="Time to snapshot the MARTS schema catalog.")
+            logger.info(f"Schema catalog refreshed: {len(snapshot['tables'])} tables in {elapsed:.1f}s")
+            return snapshot
+
+    def refresh_in_background(self, min_age_seconds: float = SCHEMA_CATALOG_MIN_REFRESH_SECONDS) -> bool:
+        """
+        Starts a refresh in a daemon thread unless one is running or the snapshot is younger
+        than min_age_seconds. A process that does not own the refreshes (tools/leader.py)
+        asks the one that does instead.
+        """
+        age = self.age_seconds()
+        if self._refresh_lock.locked() or (age is not None and age < min_age_seconds):
+            return False
+        if not is_leader():
+            return self.request_refresh()
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Schema catalog refresh failed (serving the previous snapshot): {e}")
+
+        threading.Thread(target=_run, name="schema-catalog-refresh-now", daemon=True).start()
+        return True
+
+    def _save(self, snapshot: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist the schema catalog to {self.path}: {e}")
+
+    def request_refresh(self) -> bool:
+        """Leaves a marker next to the file for the refreshing process's next poll."""
+        if not self.path:
+            return False
+        try:
+            with open(f"{self.path}.refresh", "a", encoding="utf-8"):
+                pass
+        except OSError as e:
+            logger.warning(f"Could not request a schema catalog refresh: {e}")
+            return False
+        return True
+
+    def take_refresh_request(self) -> bool:
+        """True (once) if another process asked for a refresh."""
+        if not self.path:
+            return False
+        try:
+            os.remove(f"{self.path}.refresh")
+        except OSError:
+            return False
+        return True
+
+    def load(self) -> bool:
+        """Loads the persisted snapshot of the same dataset, if any and not already loaded."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._loaded_mtime:
+                return self._snapshot is not None
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable schema catalog {self.path}: {e}")
+            return False
+        if (snapshot.get("project"), snapshot.get("dataset")) != (self.project, self.dataset):
+            return False
+        self._set(snapshot)
+        self._loaded_mtime = mtime
+        return True
+
+    # --- Lookups ---
+
+    def table(self, name: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot["tables"].get(name)
+
+    def columns(self, name: str) -> Optional[List[str]]:
+        entry = self.table(name)
+        return None if entry is None else [c["name"] for c in entry["columns"]]
+
+    def partition_field(self, name: str) -> Optional[str]:
+        entry = self.table(name)
+        return None if entry is None else (entry.get("partitioning") or {}).get("field")
+
+    def _is_ours(self, args: Dict[str, Any], with_dataset: bool = True) -> bool:
+        project = str(args.get("project_id") or self.project)
+        if project.lower() != self.project.lower():
+            return False
+        return not with_dataset or str(args.get("dataset_id") or "").lower() == self.dataset.lower()
+
+    def discovery(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The discovery tool's response from the snapshot, or None when it does not cover the call."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if tool_name == "list_dataset_ids" and self._is_ours(args, with_dataset=False):
+            return {"result": snapshot["datasets"]}
+        if not self._is_ours(args):
+            return None
+        if tool_name == "get_dataset_info":
+            return snapshot["dataset_info"]
+        if tool_name == "list_table_ids":
+            return {"result": snapshot["table_ids"]}
+        if tool_name == "get_table_info":
+            entry = snapshot["tables"].get(str(args.get("table_id") or ""))
+            return None if entry is None else entry["info"]
+        return None
+
+    # --- Digest ---
+
+    def _table_line(self, name: str, entry: Dict[str, Any], with_stats: bool) -> str:
+        stats = entry.get("stats") or {}
+        column_stats = (stats.get("columns") or {}) if with_stats else {}
+        header = [f"`{self.project}.{self.dataset}.{name}`"]
+        partitioning = entry.get("partitioning")
+        if partitioning:
+            header.append(f"partitioned by {partitioning['field']} ({partitioning['type']})")
+        if entry.get("clustering"):
+            header.append(f"clustered by {', '.join(entry['clustering'])}")
+        if entry.get("num_rows") is not None:
+            header.append(f"{entry['num_rows']:,} rows")
+        field = (partitioning or {}).get("field")
+        if with_stats and field in column_stats and column_stats[field].get("min") is not None:
+            header.append(f"{field} {column_stats[field]['min']}..{column_stats[field]['max']} in the last {stats.get('window_days')} days")
+
+        parts = []
+        for c in entry["columns"]:
+            text = f"{c['name']} {c['type']}{'[]' if c['mode'] == 'REPEATED' else ''}"
+            # The partition column's range is in the header
+            s = (column_stats.get(c["name"]) or {}) if c["name"] != field else {}
+            if s.get("values"):
+                text += " {" + "|".join(s["values"]) + "}"
+            elif s.get("min") is not None:
+                text += f" [{_fmt(s['min'])}..{_fmt(s['max'])}]"
+            elif s.get("distinct"):
+                text += f" ~{s['distinct']} values"
+            if s.get("nulls") and stats.get("row_count"):
+                text += f" {round(100 * s['nulls'] / stats['row_count'])}% null"
+            parts.append(text)
+        return f"- {', '.join(header)}\n  {', '.join(parts)}"
+
+    def digest(self, max_chars: int = SCHEMA_DIGEST_MAX_CHARS) -> Optional[str]:
+        """Compact text of the tables and columns for the data agent's instruction."""
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot["tables"]:
+            return None
+        if self._digest is not None:
+            return self._digest
+        taken = datetime.fromtimestamp(snapshot["created"], timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        head = (
+            f"SCHEMA DIGEST ({snapshot['project']}.{snapshot['dataset']}, snapshot {taken}). "
+            "Use these table and column names; discovery tools are only needed for what is not listed here."
+        )
+        for with_stats in (True, False):
+            text = "\n".join([head] + [self._table_line(n, e, with_stats) for n, e in snapshot["tables"].items()])
+            if len(text) <= max_chars:
+                break
+        else:
+            text = text[:max_chars - 1].rsplit("\n", 1)[0] + "\n…"
+        self._digest = text
+        return text
+
+
+schema_catalog = SchemaCatalog()
+
+
+# Invocations in which execute_sql failed: their discovery calls bypass the snapshot
+_failed_invocations = LRUCache(max_entries=1024, ttl_seconds=3600)
+
+
+def _invocation_id(tool_context: Any) -> Optional[str]:
+    return getattr(tool_context, "invocation_id", None)
+
+
+async def serve_discovery(tool: Any, args: Dict[str, Any], tool_context: Any) -> Optional[Dict[str, Any]]:
+    """
+    before_tool_callback: answers MARTS discovery calls from the catalog snapshot, except
+    after a failed execute_sql in the same invocation, when the snapshot may be what is wrong.
+    """
+    if not SCHEMA_CATALOG_ENABLED or tool.name not in DISCOVERY_TOOLS:
+        return None
+    invocation_id = _invocation_id(tool_context)
+    if invocation_id is not None and invocation_id in _failed_invocations:
+        metrics.inc("tami4_schema_catalog_total", help="Discovery tool calls by catalog result.", tool=tool.name, result="bypass")
+        return None
+    response = schema_catalog.discovery(tool.name, args)
+    metrics.inc("tami4_schema_catalog_total", help="Discovery tool calls by catalog result.", tool=tool.name, result="hit" if response is not None else "miss")
+    return response
+
+
+def note_sql_error(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """
+    after_tool_callback: after a failed execute_sql, sends the rest of the invocation's
+    discovery calls to BigQuery and refreshes the catalog in the background.
+    """
+    if not SCHEMA_CATALOG_ENABLED or getattr(tool, "name", None) != "execute_sql":
+        return None
+    if not isinstance(tool_response, dict) or tool_response.get("status") != "ERROR":
+        return None
+    invocation_id = _invocation_id(tool_context)
+    if invocation_id is not None:
+        _failed_invocations.set(invocation_id, True)
+    if schema_catalog.refresh_in_background():
+        logger.info("execute_sql failed; refreshing the schema catalog")
+    return None
+
+
+async def inject_schema_digest(callback_context: Any, llm_request: Any) -> None:
+    """before_model_callback: appends the schema digest to the data agent's instruction."""
+    if not SCHEMA_CATALOG_ENABLED:
+        return None
+    digest = schema_catalog.digest()
+    if digest:
+        llm_request.append_instructions([digest])
+    return None
+
+
+_refresh_started = False
+_refresh_lock = threading.Lock()
+
+
+def start_refresh_thread() -> None:
+    """
+    Loads the persisted catalog, then keeps it current in a daemon thread. The process
+    that owns the refreshes (tools/leader.py) snapshots BigQuery every
+    SCHEMA_CATALOG_REFRESH_SECONDS, or sooner when another worker requests it; the
+    other workers only reload the file it writes.
+    """
+    global _refresh_started
+    if not SCHEMA_CATALOG_ENABLED:
+        return
+    with _refresh_lock:
+        if _refresh_started:
+            return
+        _refresh_started = True
+
+    def _loop():
+        schema_catalog.load()
+        next_refresh = 0.0
+        if schema_catalog.age_seconds() is not None:
+            next_refresh = time.time() + SCHEMA_CATALOG_REFRESH_SECONDS - schema_catalog.age_seconds()
+        while True:
+            if is_leader():
+                if schema_catalog.take_refresh_request() or time.time() >= next_refresh:
+                    next_refresh = time.time() + SCHEMA_CATALOG_REFRESH_SECONDS
+                    try:
+                        schema_catalog.refresh()
+                    except Exception as e:
+                        logger.warning(f"Schema catalog refresh failed (serving the previous snapshot): {e}")
+            else:
+                schema_catalog.load()
+            time.sleep(SCHEMA_CATALOG_POLL_SECONDS)
+
+    threading.Thread(target=_loop, name="schema-catalog-refresh", daemon=True).start()
@@ -0,0 +1,246 @@
+"""
+Managed BigQuery access: a pool of reused clients sharing one credentials object that
+is refreshed before it expires, a bound on concurrent jobs, and a dry-run cost gate
+that every query goes through before it runs.
+
+Tests and benchmarks swap the real client for a fake with
+`client_pool.configure(factory=lambda: fake_client, credentials_fn=None)`.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ...tools.cache import LRUCache
+from ...tools.tracing import metrics, span
+from .tools import BQ_LOCATION, MAX_BYTES_BILLED, PROJECT_ID, _as_int, _env, _load_google_credentials
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+BQ_CLIENT_POOL_SIZE = _as_int("BQ_CLIENT_POOL_SIZE", 4)
+# Concurrent jobs across all serving workers (WEB_CONCURRENCY); each process gets an equal share
+BQ_GLOBAL_MAX_JOBS = _as_int("BQ_GLOBAL_MAX_JOBS", 8)
+BQ_MAX_CONCURRENT_JOBS = _as_int("BQ_MAX_CONCURRENT_JOBS", -(-BQ_GLOBAL_MAX_JOBS // max(1, _as_int("WEB_CONCURRENCY", 1))))
+BQ_JOB_SLOT_TIMEOUT_SECONDS = _as_int("BQ_JOB_SLOT_TIMEOUT_SECONDS", 60)
+# Refresh the access token this long before it expires, off the request path
+BQ_TOKEN_REFRESH_MARGIN_SECONDS = _as_int("BQ_TOKEN_REFRESH_MARGIN_SECONDS", 300)
+COST_GATE_ENABLED = (_env("COST_GATE_ENABLED", "true") or "").lower() not in ("0", "false", "no")
+# Queries whose dry-run estimate exceeds this are rejected
+QUERY_BYTES_BUDGET = _as_int("QUERY_BYTES_BUDGET", MAX_BYTES_BILLED or 10 * 1024 ** 3)
+DRY_RUN_CACHE_TTL_SECONDS = _as_int("DRY_RUN_CACHE_TTL_SECONDS", 600)
+
+
+class JobSlotTimeout(RuntimeError):
+    pass
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+class QueryCostExceeded(RuntimeError):
+    def __init__(self, estimated_bytes: int, budget_bytes: int):
+        super().__init__(
+            f"Query would scan {_format_bytes(estimated_bytes)}, over the {_format_bytes(budget_bytes)} "
+            "budget. Add a date filter or select fewer columns."
+        )
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+
+
+def _utcnow() -> datetime:
+    """Naive UTC now, comparable with google-auth's naive UTC `expiry`."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BigQueryClientPool:
+    """
+    Round-robin pool of google.cloud.bigquery.Client objects built lazily on first use.
+
+    All clients share one credentials object; when its token is within
+    `refresh_margin_seconds` of expiry a background thread refreshes it, so queries
+    do not pay for the token round trip. An already expired token is refreshed inline.
+    """
+
+    def __init__(
+        self,
+        size: int = BQ_CLIENT_POOL_SIZE,
+        factory: Optional[Callable[[], Any]] = None,
+        credentials_fn: Optional[Callable[[], Any]] = _load_google_credentials,
+        refresh_margin_seconds: float = BQ_TOKEN_REFRESH_MARGIN_SECONDS,
+    ):
+        self.size = max(1, int(size))
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._factory = factory
+        self._credentials_fn = credentials_fn
+        self._clients: List[Any] = []
+        self._cycle: Optional[Iterator[Any]] = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def configure(self, factory: Optional[Callable[[], Any]] = None, credentials_fn: Optional[Callable[[], Any]] = _load_google_credentials) -> None:
+        """Replaces the client factory (e.g. with a fake) and drops the existing clients."""
+        with self._lock:
+            self._factory = factory
+            self._credentials_fn = credentials_fn
+            self._clients = []
+            self._cycle = None
+
+    def _build(self) -> Any:
+        if self._factory is not None:
+            return self._factory()
+        from google.cloud import bigquery
+
+        return bigquery.Client(project=PROJECT_ID, credentials=self._credentials_fn(), location=BQ_LOCATION)
+
+    def get(self) -> Any:
+        self._ensure_fresh_token()
+        with self._lock:
+            if len(self._clients) < self.size:
+                self._clients.append(self._build())
+                return self._clients[-1]
+            if self._cycle is None:
+                self._cycle = itertools.cycle(self._clients)
+            return next(self._cycle)
+
+    def _ensure_fresh_token(self) -> None:
+        if self._credentials_fn is None:
+            return
+        creds = self._credentials_fn()
+        expiry = getattr(creds, "expiry", None)
+        if getattr(creds, "token", None) is None or expiry is None:
+            # Not fetched yet: the first request fetches it
+            return
+        # google-auth keeps expiry as naive UTC
+        remaining = (expiry - _utcnow()).total_seconds()
+        if remaining <= 0:
+            self.refresh_token(creds)
+        elif remaining < self.refresh_margin_seconds and not self._refreshing.locked():
+            threading.Thread(target=self.refresh_token, args=(creds,), name="bq-token-refresh", daemon=True).start()
+
+    def refresh_token(self, creds: Any = None) -> None:
+        """Refreshes the shared access token; concurrent callers wait for a single refresh."""
+        creds = creds or self._credentials_fn()
+        with self._refreshing:
+            expiry = getattr(creds, "expiry", None)
+            if expiry is not None and getattr(creds, "token", None) and expiry - _utcnow() > timedelta(seconds=self.refresh_margin_seconds):
+                return
+            from google.auth.transport.requests import Request
+
+            try:
+                with span("bigquery.token_refresh", "auth"):
+                    creds.refresh(Request())
+            except Exception as e:
+                logger.warning(f"BigQuery token refresh failed, the client will retry on its next request: {e}")
+
+
+client_pool = BigQueryClientPool()
+
+_job_slots = threading.BoundedSemaphore(max(1, BQ_MAX_CONCURRENT_JOBS))
+
+
+def get_bigquery_client() -> Any:
+    """Returns a pooled BigQuery client with a valid token."""
+    return client_pool.get()
+
+
+@contextmanager
+def job_slot(timeout: Optional[float] = BQ_JOB_SLOT_TIMEOUT_SECONDS) -> Iterator[None]:
+    """Holds one of BQ_MAX_CONCURRENT_JOBS slots for the duration of a BigQuery job."""
+    started = time.perf_counter()
+    if not _job_slots.acquire(timeout=timeout):
+        raise JobSlotTimeout(f"No BigQuery job slot free after {timeout}s ({BQ_MAX_CONCURRENT_JOBS} jobs running)")
+    metrics.observe("tami4_bigquery_job_slot_wait_seconds", time.perf_counter() - started, help="Time spent waiting for a BigQuery job slot.")
+    try:
+        yield
+    finally:
+        _job_slots.release()
+
+
+def dry_run(sql: str, project_id: Optional[str] = None) -> Dict[str, Any]:
+    """Estimates a query without running it: bytes it would scan and its statement type."""
+    from google.cloud import bigquery
+
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    with job_slot():
+        job = get_bigquery_client().query(sql, job_config=job_config, project=project_id or PROJECT_ID)
+    return {
+        "bytes_processed": int(getattr(job, "total_bytes_processed", None) or 0),
+        "statement_type": getattr(job, "statement_type", None),
+    }
+
+
+class CostGate:
+    """
+    Dry-runs every query and rejects it with QueryCostExceeded when the estimate is over
+    `budget_bytes`. Partition-pruning rewrites happen before the gate (rewriter.py), so
+    the query checked here is the one that runs. Estimates are cached briefly, so
+    repeated queries do not pay for another dry run.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: Optional[int] = QUERY_BYTES_BUDGET,
+        estimator: Callable[[str, Optional[str]], Dict[str, Any]] = dry_run,
+        cache_ttl_seconds: Optional[float] = DRY_RUN_CACHE_TTL_SECONDS,
+    ):
+        self.budget_bytes = budget_bytes
+        self._estimator = estimator
+        self._estimates = LRUCache(max_entries=512, ttl_seconds=cache_ttl_seconds)
+
+    def estimate(self, sql: str, project_id: Optional[str] = None) -> Dict[str, Any]:
+        key = (project_id or PROJECT_ID, sql)
+        cached = self._estimates.get(key)
+        if cached is None:
+            with span("bigquery.dry_run", "bigquery", project_id=project_id) as s:
+                cached = self._estimator(sql, project_id)
+                s.set(bytes_processed=cached["bytes_processed"])
+            self._estimates.set(key, cached)
+        return cached
+
+    def check(self, sql: str, project_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns {"sql", "estimated_bytes"}. Raises QueryCostExceeded, or whatever the dry
+        run raised for an invalid query.
+        """
+        estimated = self.estimate(sql, project_id)["bytes_processed"]
+        if self.budget_bytes is not None and estimated > self.budget_bytes:
+            metrics.inc("tami4_bigquery_queries_rejected_total", help="Queries rejected by the dry-run cost gate.")
+            raise QueryCostExceeded(estimated, self.budget_bytes)
+        return {"sql": sql, "estimated_bytes": estimated}
+
+
+cost_gate = CostGate()
+
+
+def gate_query(sql: str, project_id: Optional[str] = None) -> Dict[str, Any]:
+    """Runs the cost gate, or passes the query through unchanged when it is disabled."""
+    if not COST_GATE_ENABLED:
+        return {"sql": sql, "estimated_bytes": None}
+    return cost_gate.check(sql, project_id)
+
+
+async def gate_execute_sql(tool: Any, args: Dict[str, Any], tool_context: Any) -> Optional[Dict[str, Any]]:
+    """
+    before_tool_callback: dry-runs the model's execute_sql query and rejects it when it
+    is over budget.
+    """
+    if not COST_GATE_ENABLED or getattr(tool, "name", None) != "execute_sql" or args.get("dry_run"):
+        return None
+    try:
+        await asyncio.to_thread(cost_gate.check, args.get("query", ""), args.get("project_id"))
+    except QueryCostExceeded as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    except Exception as e:
+        # Invalid SQL fails the same way in the real run; let the tool report it
+        logger.info(f"Dry run failed, leaving the query to execute_sql: {e}")
+    return None
@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import decimal
+import logging
+from typing import Any, Dict, List, Optional
+
+from ...tools.tracing import metrics, span
+from .cache import query_cache
+from .client import QueryCostExceeded, cost_gate, gate_query, get_bigquery_client, job_slot
+from .tools import MAX_BYTES_BILLED, MAX_QUERY_RESULT_ROWS, PROJECT_ID
+
+logger = logging.getLogger(__name__)
+
+
+def _json_safe(value: Any) -> Any:
+    """Converts BigQuery row values into JSON-serializable primitives."""
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def run_query(sql: str, project_id: Optional[str] = None, max_rows: Optional[int] = MAX_QUERY_RESULT_ROWS) -> Dict[str, Any]:
+    """
+    Runs `sql` as is on a pooled client while holding a job slot; no cache, no cost gate.
+    Returns {"status": "SUCCESS", "rows", ...} or {"status": "ERROR", "error_details"}.
+    """
+    project_id = project_id or PROJECT_ID
+    with span("bigquery.query", "bigquery", project_id=project_id, max_rows=max_rows) as s:
+        try:
+            from google.cloud import bigquery
+
+            job_config = bigquery.QueryJobConfig()
+            if MAX_BYTES_BILLED is not None:
+                job_config.maximum_bytes_billed = MAX_BYTES_BILLED
+            with job_slot():
+                row_iterator = get_bigquery_client().query_and_wait(
+                    sql, job_config=job_config, project=project_id, max_results=max_rows
+                )
+                rows: List[Dict[str, Any]] = [
+                    {key: _json_safe(val) for key, val in row.items()} for row in row_iterator
+                ]
+        except Exception as e:
+            logger.warning(f"Query execution failed: {e}")
+            s.set(error=str(e)).end("ERROR")
+            return {"status": "ERROR", "error_details": str(e)}
+
+        bytes_processed = getattr(row_iterator, "total_bytes_processed", None)
+        bytes_billed = getattr(row_iterator, "total_bytes_billed", None)
+        s.set(rows=len(rows), bytes_processed=bytes_processed, bytes_billed=bytes_billed,
+              job_id=getattr(row_iterator, "job_id", None))
+        if bytes_processed:
+            metrics.inc("tami4_bigquery_bytes_processed_total", bytes_processed, help="Bytes processed by BigQuery queries.")
+        if bytes_billed:
+            metrics.inc("tami4_bigquery_bytes_billed_total", bytes_billed, help="Bytes billed by BigQuery queries.")
+
+    result: Dict[str, Any] = {"status": "SUCCESS", "rows": rows}
+    if max_rows is not None and len(rows) == max_rows:
+        result["result_is_likely_truncated"] = True
+    return result
+
+
+def execute_query(
+    sql: str,
+    project_id: Optional[str] = None,
+    max_rows: Optional[int] = MAX_QUERY_RESULT_ROWS,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Runs a read-only query outside of the LLM tool loop (deterministic fast paths).
+
+    Returns the same shape as the data agent's execute_sql tool and shares its result
+    cache, so templated and LLM-written queries hit the same entries.
+    `max_rows=None` fetches everything (bulk loads such as rollup refreshes).
+    Every query passes the dry-run cost gate and holds a job slot while it runs.
+    """
+    project_id = project_id or PROJECT_ID
+    if use_cache:
+        cached = query_cache.get(sql, project_id)
+        if cached is not None:
+            return dict(cached, cache_hit=True)
+
+    try:
+        gated = gate_query(sql, project_id)
+    except QueryCostExceeded as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    except Exception as e:
+        logger.warning(f"Query execution failed: {e}")
+        return {"status": "ERROR", "error_details": str(e)}
+
+    result = run_query(gated["sql"], project_id, max_rows)
+    if use_cache and result["status"] == "SUCCESS":
+        query_cache.put(sql, result, project_id)
+    return result
+
+
+async def execute_sql(project_id: str, query: str, dry_run: bool = False) -> Dict[str, Any]:
+    """Run a read-only BigQuery SQL query in the project and return the result.
+
+    Args:
+        project_id: The GCP project id in which the query should be executed.
+        query: The BigQuery GoogleSQL query to be executed. Only SELECT statements are allowed.
+        dry_run: If True, the query is validated and its cost estimated instead of run.
+
+    Returns:
+        {"status": "SUCCESS", "rows": [...]} with "result_is_likely_truncated": True when
+        more rows may match, {"status": "SUCCESS", "dry_run_info": {...}} for a dry run,
+        or {"status": "ERROR", "error_details": "..."}.
+    """
+    try:
+        # Cached from the cost gate's dry run in the usual case
+        estimate = await asyncio.to_thread(cost_gate.estimate, query, project_id)
+    except Exception as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    if estimate.get("statement_type") not in (None, "SELECT"):
+        return {"status": "ERROR", "error_details": f"Only SELECT queries are allowed, not {estimate['statement_type']}."}
+    if dry_run:
+        return {
+            "status": "SUCCESS",
+            "dry_run_info": {"totalBytesProcessed": estimate["bytes_processed"], "statementType": estimate.get("statement_type")},
+        }
+    return await asyncio.to_thread(run_query, query, project_id, MAX_QUERY_RESULT_ROWS)
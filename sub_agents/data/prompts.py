@@ -30,6 +30,7 @@ ROUTING HINTS (SPEED + CONSISTENCY)
   4) `tami4-471706.MARTS.mart_client_terms` — planning only
 
 DISCOVERY POLICY
+- When a SCHEMA DIGEST is appended to these instructions, take table and column names, types and values from it.
 - Only use discovery tools if:
   1) SQL fails due to missing table/column, OR
   2) user explicitly asks what exists.
@@ -53,10 +54,15 @@ A) DEFAULT: return a CREATIVE LEADERBOARD (aggregated)
 - Keep the result small:
   - default TOP 30 by spend (or by leads if spend missing)
 
-B) OPTIONAL: only if user asks “over time” / fatigue / trend:
+B) OPTIONAL: only if user asks “over time” / trend:
 - return a DAILY time series for TOP 10 creatives from the leaderboard
 - group by `date` + creative identifier
 
+C) FATIGUE (שחיקה / fatigue): return a DAILY time series for ALL creatives (no TOP limit)
+- group by `date` + creative identifier; include impressions, clicks, cost, leads (and reach/frequency if present)
+- default window: last 90 days
+- the result is large by design: it is scored downstream and passed on as an artifact
+
 AGGREGATION GUIDELINES (IMPORTANT)
 - Do NOT group by long text fields (it explodes the row count).
 - Use ANY_VALUE(SUBSTR(field,1,200)) for text attributes so you can still return them safely.
@@ -74,8 +80,12 @@ Return ONLY JSON:
   "sql": "<final SQL>",
   "assumptions": ["..."],
   "data": {
+    "format": "columnar/v1",
+    "row_count": 0,
     "columns": ["..."],
-    "rows": [{"...": "..."}]
+    "dtypes": {"...": "int|float|string|date|bool|null"},
+    "data": {"<column>": ["<values>"]},
+    "dictionaries": {"<column>": ["<distinct strings>"]}
   },
   "notes": ["..."],
   "error": {
@@ -84,9 +94,22 @@ Return ONLY JSON:
   }
 }
 
+DATA PAYLOAD FORMAT
+- execute_sql results arrive already encoded as "columnar/v1" under the tool response's "data" key.
+- Copy that object AS-IS into the output "data" field. Do NOT expand it into rows, re-round or re-order values.
+- Columns listed in "dictionaries" hold integer codes into that list (null stays null).
+- Large results arrive instead as an "artifact_ref/v1" handle (artifact name, row_count, columns, summary, preview).
+  Copy the handle AS-IS into the output "data" field; the rows are stored in the session and loaded by downstream tools.
+- If the execute_sql response has "query_rewrite", its "sql" is what actually ran: report it as "sql"
+  and add each of its "changes" to assumptions (e.g. an injected default date window).
+  For an intentional all-time query, add the comment `-- full_scan` to the SQL.
+
 ERROR BEHAVIOR
 - If no creative identifier column exists for a creative request:
   - status="ERROR"
   - error.message="Missing creative identifier column"
   - error.details="Expected one of: ad_url / creative_id / ad_name"
+- If execute_sql rejects a query as over the scan budget:
+  - retry ONCE with a narrower date filter and only the columns you need
+  - if it is rejected again: status="ERROR", error.message=<the rejection message>
 """
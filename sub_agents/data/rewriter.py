@@ -0,0 +1,388 @@
+"""
+Partition-pruning rewrite of the data agent's queries on MARTS tables.
+
+The mart tables are partitioned by `date`, and a query without a usable predicate on
+that column scans the whole table. Before execute_sql runs, rewrite_query():
+- unwraps identity casts on the partition column (DATE(date) >= ... -> date >= ...),
+- adds the implied date range next to non-sargable filters such as
+  EXTRACT(YEAR FROM date) = 2025 or FORMAT_DATE('%Y-%m', date) = '2025-05',
+- injects the prompt's default window when the query filters on no date at all,
+- replaces SELECT * over a mart table inside a subquery or CTE with the columns the
+  query actually references.
+
+A query carrying a `-- full_scan` comment is left alone.
+"""
+import asyncio
+import logging
+import re
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ...tools.cache import LRUCache
+from ...tools.tracing import metrics, span
+from .catalog import schema_catalog
+from .client import cost_gate, get_bigquery_client
+from .templates import DEFAULT_WINDOW_DAYS, MARTS
+from .tools import _env
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+QUERY_REWRITE_ENABLED = (_env("QUERY_REWRITE_ENABLED", "true") or "").lower() not in ("0", "false", "no")
+PARTITION_COLUMN = _env("MARTS_PARTITION_COLUMN", "date")
+PARTITIONED_TABLES = {
+    t.strip().lower()
+    for t in (_env("MARTS_PARTITIONED_TABLES", "mart_platforms_performance,mart_facebook_creatives") or "").split(",")
+    if t.strip()
+}
+
+_PROJECT, _DATASET = MARTS.split(".")
+_RESERVED = (
+    r"(?:on|using|join|left|right|inner|full|outer|cross|natural|where|group|order|limit|having|"
+    r"qualify|window|union|except|intersect|tablesample|for)"
+)
+_MART_REF_RE = re.compile(
+    rf"`?(?:`?{re.escape(_PROJECT)}`?\.)?`?{re.escape(_DATASET)}`?\.`?(\w+)`?"
+    rf"(?:\s+(?:as\s+)?(?!{_RESERVED}\b)(\w+))?",
+    re.IGNORECASE,
+)
+# String literals and comments are blanked out before any structural matching
+_MASK_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|--[^\n]*|#[^\n]*|/\*.*?\*/", re.DOTALL)
+_FULL_SCAN_RE = re.compile(r"(?:--|#|/\*)\s*full_scan\b", re.IGNORECASE)
+_SELECT_RE = re.compile(r"\bselect\b", re.IGNORECASE)
+_SET_OP_RE = re.compile(r"\b(?:union|intersect|except)\s+(?:all|distinct)\b", re.IGNORECASE)
+_CLAUSE_RE = re.compile(r"\b(from|where|group\s+by|having|qualify|window|order\s+by|limit)\b", re.IGNORECASE)
+_OUTER_JOIN_RE = re.compile(r"\b(left|right|full)\s+(?:outer\s+)?join\s*$", re.IGNORECASE)
+_STAR_RE = re.compile(r"\bselect\s+(?:distinct\s+)?(?:\w+\.)?\*|\w\.\*|,\s*\*\s*(?:,|from\b)", re.IGNORECASE)
+
+_COL = rf"(?:\b\w+\.)?`?{re.escape(PARTITION_COLUMN)}`?\b"
+_CMP = r"(?:>=|<=|<>|!=|>|<|=)"
+# A reference to the partition column (not the DATE(...) function or a DATE '...' literal)
+_COL_REF_RE = re.compile(rf"(?<![\w.]){_COL}(?!\s*[('])", re.IGNORECASE)
+# Join conditions such as p.date = c.date do not prune anything
+_COLUMN_PAIR_RE = re.compile(rf"{_COL}\s*{_CMP}\s*{_COL}(?!\s*[('])", re.IGNORECASE)
+_ON_RE = re.compile(r"\bon\b", re.IGNORECASE)
+_JOIN_RE = re.compile(r"\bjoin\b", re.IGNORECASE)
+_RANGE_SCAN_RE = re.compile(rf"\b(?:min|max)\s*\(\s*{_COL}\s*\)", re.IGNORECASE)
+_IDENTITY_RES = [
+    re.compile(rf"\bdate\s*\(\s*({_COL})\s*\)(?=\s*(?:{_CMP}|\bbetween\b|\bin\s*\())", re.IGNORECASE),
+    re.compile(rf"\bcast\s*\(\s*({_COL})\s+as\s+date\s*\)(?=\s*(?:{_CMP}|\bbetween\b|\bin\s*\())", re.IGNORECASE),
+    re.compile(rf"\bdate_trunc\s*\(\s*({_COL})\s*,\s*day\s*\)(?=\s*(?:{_CMP}|\bbetween\b|\bin\s*\())", re.IGNORECASE),
+]
+# Non-sargable filters with a derivable date range: (pattern, group holding the column, group holding the value)
+_DERIVABLE_RES = [
+    (re.compile(rf"\bextract\s*\(\s*year\s+from\s+({_COL})\s*\)\s*=\s*(\d{{4}})\b", re.IGNORECASE), 1, 2),
+    (re.compile(rf"\bformat_date\s*\(\s*'[^']*'\s*,\s*({_COL})\s*\)\s*=\s*'([^']*)'", re.IGNORECASE), 1, 2),
+    (re.compile(rf"\bcast\s*\(\s*({_COL})\s+as\s+string\s*\)\s+like\s+'([^']*)'", re.IGNORECASE), 1, 2),
+]
+_PREFIX_RE = re.compile(r"^(\d{4})(?:-?(\d{2})(?:-?(\d{2}))?)?%?$")
+
+_schemas = LRUCache(max_entries=64, ttl_seconds=3600)
+
+
+def _mask(sql: str) -> str:
+    def blank(m: "re.Match") -> str:
+        s = m.group(0)
+        if s[0] in "'\"":
+            return s[0] + " " * (len(s) - 2) + s[-1]
+        return " " * len(s)
+
+    return _MASK_RE.sub(blank, sql)
+
+
+def _depths(masked: str) -> List[int]:
+    """Parenthesis depth at every position; a paren is at the depth outside of it."""
+    depth, out = 0, []
+    for ch in masked:
+        if ch == ")":
+            depth -= 1
+        out.append(depth)
+        if ch == "(":
+            depth += 1
+    return out
+
+
+def _splice(sql: str, edits: List[Tuple[int, Optional[int], str]]) -> str:
+    """Applies (start, end, text) replacements right to left; end=None inserts at start."""
+    for start, end, text in sorted(edits, key=lambda e: e[0], reverse=True):
+        sql = sql[:start] + text + sql[start if end is None else end:]
+    return sql
+
+
+class _Block(NamedTuple):
+    depth: int
+    select_end: int
+    from_start: Optional[int]
+    from_end: int
+    where: Optional[Tuple[int, int]]  # condition span
+    refs: List[Tuple[str, str, int, int]]  # (table, qualifier, start, end)
+
+
+def _blocks(masked: str, depths: List[int]) -> List[_Block]:
+    blocks = []
+    for m in _SELECT_RE.finditer(masked):
+        d = depths[m.start()]
+        end = next((i for i in range(m.end(), len(masked)) if depths[i] < d), len(masked))
+        set_op = next((s for s in _SET_OP_RE.finditer(masked, m.end(), end) if depths[s.start()] == d), None)
+        end = set_op.start() if set_op else end
+        clauses = [c for c in _CLAUSE_RE.finditer(masked, m.end(), end) if depths[c.start()] == d]
+        from_clause = next((c for c in clauses if c.group(1).lower() == "from"), None)
+        if from_clause is None:
+            blocks.append(_Block(d, m.end(), None, end, None, []))
+            continue
+        after = [c for c in clauses if c.start() > from_clause.start()]
+        from_end = after[0].start() if after else end
+        where = None
+        if after and after[0].group(1).lower() == "where":
+            where_end = after[1].start() if len(after) > 1 else end
+            where = (after[0].end(), where_end)
+        refs = []
+        for r in _MART_REF_RE.finditer(masked, from_clause.end(), from_end):
+            if depths[r.start()] != d:
+                continue
+            table = r.group(1)
+            refs.append((table, r.group(2) or table, r.start(), r.end()))
+        blocks.append(_Block(d, m.end(), from_clause.start(), from_end, where, refs))
+    return blocks
+
+
+def _prefix_range(value: str) -> Optional[Tuple[date, date]]:
+    """'2025' / '2025-05' / '2025-05-03' (optionally ending in %) -> first and last day."""
+    m = _PREFIX_RE.match(value.strip())
+    if m is None:
+        return None
+    try:
+        year = int(m.group(1))
+        if m.group(3):
+            day = date(year, int(m.group(2)), int(m.group(3)))
+            return day, day
+        if m.group(2):
+            month = int(m.group(2))
+            first = date(year, month, 1)
+            following = date(year + month // 12, month % 12 + 1, 1)
+            return first, following - timedelta(days=1)
+        return date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        return None
+
+
+def _unwrap_identity_casts(sql: str, changes: List[str]) -> str:
+    for pattern in _IDENTITY_RES:
+        masked = _mask(sql)
+        edits = [(m.start(), m.end(), sql[m.start(1):m.end(1)]) for m in pattern.finditer(masked)]
+        if edits:
+            changes.append(f"unwrapped {len(edits)} cast(s) on {PARTITION_COLUMN} so partitions can be pruned")
+            sql = _splice(sql, edits)
+    return sql
+
+
+def _derive_ranges(sql: str, changes: List[str]) -> str:
+    for pattern, col_group, value_group in _DERIVABLE_RES:
+        masked = _mask(sql)
+        edits = []
+        for m in pattern.finditer(masked):
+            bounds = _prefix_range(sql[m.start(value_group):m.end(value_group)])
+            if bounds is None:
+                continue
+            col = sql[m.start(col_group):m.end(col_group)]
+            original = sql[m.start():m.end()]
+            edits.append((
+                m.start(), m.end(),
+                f"({original} AND {col} BETWEEN DATE '{bounds[0].isoformat()}' AND DATE '{bounds[1].isoformat()}')",
+            ))
+        if edits:
+            changes.append(f"added the implied {PARTITION_COLUMN} range to {len(edits)} non-sargable filter(s)")
+            sql = _splice(sql, edits)
+    return sql
+
+
+def _predicate_spans(masked: str, depths: List[int], blocks: List[_Block]) -> List[Tuple[int, int]]:
+    """WHERE conditions and JOIN ... ON conditions of every block."""
+    spans = [block.where for block in blocks if block.where is not None]
+    for block in blocks:
+        if block.from_start is None:
+            continue
+        for on in _ON_RE.finditer(masked, block.from_start, block.from_end):
+            if depths[on.start()] != block.depth:
+                continue
+            end = next(
+                (j.start() for j in _JOIN_RE.finditer(masked, on.end(), block.from_end) if depths[j.start()] == block.depth),
+                block.from_end,
+            )
+            spans.append((on.end(), end))
+    return spans
+
+
+def _filters_on_partition(masked: str, spans: List[Tuple[int, int]]) -> bool:
+    """
+    Whether any predicate uses the partition column, in any form (a range, DATE_DIFF,
+    EXTRACT(...) IN, DATE_TRUNC, ...). Column pairs such as p.date = c.date do not count.
+    """
+    filters = _COLUMN_PAIR_RE.sub(lambda m: " " * len(m.group(0)), masked)
+    return any(_COL_REF_RE.search(filters, start, end) for start, end in spans)
+
+
+def _inject_default_window(sql: str, changes: List[str]) -> str:
+    """Adds the default window only to queries with no predicate on the partition column at all."""
+    masked = _mask(sql)
+    if _RANGE_SCAN_RE.search(masked):
+        return sql
+    depths = _depths(masked)
+    blocks = _blocks(masked, depths)
+    if _filters_on_partition(masked, _predicate_spans(masked, depths, blocks)):
+        return sql
+    edits = []
+    for block in blocks:
+        if block.from_start is None:
+            continue
+        from_text = masked[block.from_start:block.from_end]
+        if re.search(r"\b(right|full)\s+(?:outer\s+)?join\b", from_text, re.IGNORECASE):
+            continue
+        qualifiers = [
+            q for table, q, start, _ in block.refs
+            if _is_partitioned(table) and not _OUTER_JOIN_RE.search(masked[block.from_start:start])
+        ]
+        if not qualifiers:
+            continue
+        # yesterday-(N-1)..yesterday, the window templates.resolve_window and the rollups use
+        predicate = " AND ".join(
+            f"{q}.{PARTITION_COLUMN} BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL {DEFAULT_WINDOW_DAYS} DAY)"
+            f" AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)"
+            for q in qualifiers
+        )
+        # Insertions only, so a subquery nested in this WHERE can be rewritten too
+        if block.where is not None:
+            start, end = block.where
+            condition = sql[start:end]
+            edits.append((start + len(condition) - len(condition.lstrip()), None, f"{predicate} AND ("))
+            edits.append((start + len(condition.rstrip()), None, ")"))
+        else:
+            at = len(sql[:block.from_end].rstrip())
+            edits.append((at, None, f" WHERE {predicate}"))
+        changes.append(f"injected the default {DEFAULT_WINDOW_DAYS}-day window on {', '.join(qualifiers)}")
+    return _splice(sql, edits)
+
+
+def _is_partitioned(table: str) -> bool:
+    """By the schema catalog when it has the table, otherwise by MARTS_PARTITIONED_TABLES."""
+    if schema_catalog.table(table) is not None:
+        return schema_catalog.partition_field(table) == PARTITION_COLUMN
+    return table.lower() in PARTITIONED_TABLES
+
+
+def _table_columns(table: str) -> Optional[List[str]]:
+    columns = schema_catalog.columns(table)
+    if columns is not None:
+        return columns
+    table_id = f"{MARTS}.{table}"
+    columns = _schemas.get(table_id)
+    if columns is None:
+        try:
+            columns = [field.name for field in get_bigquery_client().get_table(table_id).schema]
+        except Exception as e:
+            logger.info(f"No schema for {table_id}, skipping projection pushdown: {e}")
+            return None
+        _schemas.set(table_id, columns)
+    return columns
+
+
+def _push_down_projection(sql: str, changes: List[str], columns_fn: Callable[[str], Optional[List[str]]]) -> str:
+    masked = _mask(sql)
+    stars = list(_STAR_RE.finditer(masked))
+    if len(stars) != 1:
+        # Other wildcards could need every column
+        return sql
+    depths = _depths(masked)
+    for block in _blocks(masked, depths):
+        if block.depth == 0 or block.from_start is None or len(block.refs) != 1:
+            continue
+        if masked[block.select_end:block.from_start].strip() != "*":
+            continue
+        table, _, ref_start, ref_end = block.refs[0]
+        if masked[block.from_start + 4:ref_start].strip() or masked[ref_end:block.from_end].strip():
+            continue
+        columns = columns_fn(table)
+        if not columns:
+            return sql
+        rest = masked[:block.select_end] + masked[block.from_start:]
+        used = [c for c in columns if re.search(rf"\b{re.escape(c)}\b", rest, re.IGNORECASE)]
+        if not used or len(used) == len(columns):
+            return sql
+        star = masked.index("*", block.select_end)
+        changes.append(f"projected {len(used)} of {len(columns)} columns of {table}")
+        return _splice(sql, [(star, star + 1, ", ".join(used))])
+    return sql
+
+
+def rewrite_query(sql: str, columns_fn: Callable[[str], Optional[List[str]]] = _table_columns) -> Dict[str, Any]:
+    """
+    Returns {"sql", "changes"}; "changes" lists what was rewritten (empty when the
+    query is returned as is).
+    """
+    changes: List[str] = []
+    if not sql or _FULL_SCAN_RE.search(sql) or not _MART_REF_RE.search(_mask(sql)):
+        return {"sql": sql, "changes": changes}
+    rewritten = sql.strip().rstrip(";").rstrip()
+    rewritten = _unwrap_identity_casts(rewritten, changes)
+    rewritten = _derive_ranges(rewritten, changes)
+    rewritten = _inject_default_window(rewritten, changes)
+    rewritten = _push_down_projection(rewritten, changes, columns_fn)
+    return {"sql": rewritten if changes else sql, "changes": changes}
+
+
+def _rewrite_and_measure(sql: str, project_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Rewrites `sql` and dry-runs both versions; None when nothing changed or the rewrite does not validate."""
+    rewrite = rewrite_query(sql)
+    if not rewrite["changes"]:
+        return None
+    with span("sql.rewrite", "bigquery", changes=len(rewrite["changes"])) as s:
+        try:
+            before = cost_gate.estimate(sql, project_id)["bytes_processed"]
+        except Exception:
+            # The original is invalid; let execute_sql report its error as written
+            s.end("SKIPPED")
+            return None
+        try:
+            after = cost_gate.estimate(rewrite["sql"], project_id)["bytes_processed"]
+        except Exception as e:
+            logger.warning(f"Rewritten query failed its dry run, running the original: {e}")
+            s.set(error=str(e)).end("ERROR")
+            return None
+        s.set(bytes_before=before, bytes_after=after)
+    if after > before:
+        return None
+    metrics.inc("tami4_bigquery_bytes_avoided_total", before - after, help="Estimated bytes not scanned thanks to query rewrites.")
+    return dict(rewrite, bytes_before=before, bytes_after=after)
+
+
+# Applied rewrites by function call, for annotate_query_rewrite
+_applied = LRUCache(max_entries=256, ttl_seconds=600)
+
+
+def _call_key(args: Dict[str, Any], tool_context: Any) -> Any:
+    return getattr(tool_context, "function_call_id", None) or args.get("query")
+
+
+async def rewrite_execute_sql(tool: Any, args: Dict[str, Any], tool_context: Any) -> Optional[Dict[str, Any]]:
+    """before_tool_callback: replaces args["query"] with its partition-pruned rewrite."""
+    if not QUERY_REWRITE_ENABLED or getattr(tool, "name", None) != "execute_sql" or args.get("dry_run"):
+        return None
+    try:
+        rewrite = await asyncio.to_thread(_rewrite_and_measure, args.get("query", ""), args.get("project_id"))
+    except Exception as e:
+        logger.warning(f"Query rewrite failed, running the original: {e}")
+        return None
+    if rewrite is not None:
+        args["query"] = rewrite["sql"]
+        _applied.set(_call_key(args, tool_context), rewrite)
+    return None
+
+
+def annotate_query_rewrite(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """after_tool_callback: tells the model which SQL actually ran (adds "query_rewrite" in place)."""
+    if getattr(tool, "name", None) != "execute_sql" or not isinstance(tool_response, dict):
+        return None
+    rewrite = _applied.pop(_call_key(args, tool_context))
+    if rewrite is not None:
+        tool_response["query_rewrite"] = rewrite
+    return None
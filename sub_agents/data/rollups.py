@@ -0,0 +1,322 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ...tools.leader import is_leader
+from .executor import execute_query
+from .tools import _as_int, _env
+
+logger = logging.getLogger(__name__)
+
+# Environment Config (the store is disabled unless a path is configured)
+ROLLUP_STORE_PATH = _env("ROLLUP_STORE_PATH")
+ROLLUP_BACKFILL_DAYS = _as_int("ROLLUP_BACKFILL_DAYS", 180)
+# Trailing days re-loaded on every refresh: ad platforms restate recent spend and conversions
+ROLLUP_RESTATE_DAYS = _as_int("ROLLUP_RESTATE_DAYS", 3)
+ROLLUP_REFRESH_SECONDS = _as_int("ROLLUP_REFRESH_SECONDS", 3600)
+
+MARTS = "tami4-471706.MARTS"
+
+# Daily pre-aggregations of the marts. Dimensions are grouped by, measures summed,
+# attributes carried with ANY_VALUE (text truncated like the data agent prompt asks).
+ROLLUP_SPECS: Dict[str, Dict[str, Any]] = {
+    "mart_platforms_performance": {
+        "date_column": "date",
+        "dimensions": ["platform"],
+        "measures": ["cost", "impressions", "clicks", "leads", "purchases"],
+        "attributes": [],
+    },
+    "mart_facebook_creatives": {
+        "date_column": "date",
+        "dimensions": ["ad_name"],
+        "measures": ["cost", "impressions", "clicks", "leads"],
+        "attributes": ["ad_url", "description"],
+    },
+}
+
+# SAFE_DIVIDE KPIs derived from summed measures
+KPIS = {
+    "ctr": ("clicks", "impressions"),
+    "cpl": ("cost", "leads"),
+    "cpa": ("cost", "purchases"),
+}
+
+
+def _duckdb() -> Any:
+    try:
+        import duckdb
+
+        return duckdb
+    except ImportError:
+        return None
+
+
+def _connect(path: str, read_only: bool = False):
+    """DuckDB when installed (columnar), otherwise the stdlib SQLite backend."""
+    duckdb = _duckdb()
+    if duckdb is not None:
+        return duckdb.connect(path, read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False, isolation_level=None)
+    # Autocommit mode so explicit BEGIN/COMMIT behave the same as in DuckDB
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _safe_divide(num: Any, den: Any) -> Optional[float]:
+    if num is None or not den:
+        return None
+    return num / den
+
+
+class RollupStore:
+    """
+    Local store of daily rollups for the MARTS tables, refreshed incrementally.
+
+    `fetch_fn(sql)` returns execute_query-shaped results; tests can pass a function
+    backed by a local SQLite/DuckDB fixture instead of BigQuery. A `read_only` store
+    answers queries from a file another process refreshes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        specs: Optional[Dict[str, Dict[str, Any]]] = None,
+        fetch_fn: Optional[Callable[[str], Dict[str, Any]]] = None,
+        dataset: str = MARTS,
+        read_only: bool = False,
+    ):
+        self.specs = specs or ROLLUP_SPECS
+        self.dataset = dataset
+        self.read_only = read_only
+        self._fetch = fetch_fn or (lambda sql: execute_query(sql, max_rows=None, use_cache=False))
+        self._lock = threading.RLock()
+        self._conn = _connect(path, read_only)
+        if read_only:
+            return
+        for table, spec in self.specs.items():
+            cols = ", ".join(
+                [f'"{spec["date_column"]}" TEXT']
+                + [f'"{c}" TEXT' for c in spec["dimensions"] + spec["attributes"]]
+                + [f'"{c}" DOUBLE' for c in spec["measures"]]
+            )
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "rollup_{table}" ({cols})')
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(sql, list(params))
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def date_range(self, table: str) -> Optional[tuple]:
+        col = self.specs[table]["date_column"]
+        rows = self._query(f'SELECT MIN("{col}") AS lo, MAX("{col}") AS hi FROM "rollup_{table}"')
+        if not rows or rows[0]["lo"] is None:
+            return None
+        return date.fromisoformat(str(rows[0]["lo"])[:10]), date.fromisoformat(str(rows[0]["hi"])[:10])
+
+    def _source_sql(self, table: str, start: date) -> str:
+        spec = self.specs[table]
+        d = spec["date_column"]
+        select = [d] + spec["dimensions"]
+        select += [f"ANY_VALUE(SUBSTR(CAST({a} AS STRING), 1, 200)) AS {a}" for a in spec["attributes"]]
+        select += [f"SUM({m}) AS {m}" for m in spec["measures"]]
+        group_by = ", ".join([d] + spec["dimensions"])
+        return (
+            f"SELECT {', '.join(select)}\n"
+            f"FROM `{self.dataset}.{table}`\n"
+            f"WHERE {d} >= DATE '{start.isoformat()}' AND {d} < CURRENT_DATE()\n"
+            f"GROUP BY {group_by}"
+        )
+
+    def refresh(self, table: str, today: Optional[date] = None) -> int:
+        """
+        Appends complete days newer than the stored maximum (re-loading the last
+        ROLLUP_RESTATE_DAYS for late-arriving data). Returns the number of rows added.
+        """
+        if self.read_only:
+            raise RuntimeError("A read-only rollup store cannot be refreshed")
+        spec = self.specs[table]
+        # UTC, like CURRENT_DATE() in BigQuery and the templates' windows
+        today = today or datetime.now(timezone.utc).date()
+        stored = self.date_range(table)
+        if stored is None:
+            start = today - timedelta(days=ROLLUP_BACKFILL_DAYS)
+        else:
+            start = stored[1] + timedelta(days=1) - timedelta(days=ROLLUP_RESTATE_DAYS)
+        if start >= today:
+            return 0
+
+        result = self._fetch(self._source_sql(table, start))
+        if result.get("status") != "SUCCESS":
+            logger.warning(f"Rollup refresh of {table} failed: {result.get('error_details')}")
+            return 0
+
+        cols = [spec["date_column"]] + spec["dimensions"] + spec["attributes"] + spec["measures"]
+        rows = [tuple(r.get(c) for c in cols) for r in result.get("rows") or []]
+        placeholders = ", ".join("?" for _ in cols)
+        with self._lock:
+            self._conn.execute("BEGIN TRANSACTION")
+            try:
+                self._conn.execute(
+                    f'DELETE FROM "rollup_{table}" WHERE "{spec["date_column"]}" >= ?', [start.isoformat()]
+                )
+                if rows:
+                    self._conn.executemany(
+                        f'INSERT INTO "rollup_{table}" ({", ".join(chr(34) + c + chr(34) for c in cols)}) VALUES ({placeholders})',
+                        rows,
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Rollup {table}: appended {len(rows)} rows from {start}")
+        return len(rows)
+
+    def refresh_all(self, today: Optional[date] = None) -> Dict[str, int]:
+        return {table: self.refresh(table, today) for table in self.specs}
+
+    def covers(self, table: str, start: date, end: date, columns: Sequence[str]) -> bool:
+        """True if the stored dates span [start, end] and every requested column is held."""
+        spec = self.specs.get(table)
+        stored = self.date_range(table) if spec else None
+        if stored is None or start < stored[0] or end > stored[1]:
+            return False
+        held = {spec["date_column"], *spec["dimensions"], *spec["attributes"], *spec["measures"], *KPIS}
+        return set(columns) <= held
+
+    def aggregate(
+        self,
+        table: str,
+        start: date,
+        end: date,
+        group_by: Sequence[str],
+        measures: Sequence[str],
+        attributes: Sequence[str] = (),
+        kpis: Sequence[str] = (),
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        where_in: Optional[Dict[str, Sequence[Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Window aggregate over the rollup, with SAFE_DIVIDE-style KPIs added per row."""
+        d = self.specs[table]["date_column"]
+        select = [f'"{g}"' for g in group_by]
+        select += [f'MAX("{a}") AS "{a}"' for a in attributes]
+        select += [f'SUM("{m}") AS "{m}"' for m in measures]
+        where = [f'"{d}" >= ?', f'"{d}" <= ?']
+        params: List[Any] = [start.isoformat(), end.isoformat()]
+        for col, values in (where_in or {}).items():
+            where.append(f'"{col}" IN ({", ".join("?" for _ in values)})')
+            params.extend(values)
+        sql = f'SELECT {", ".join(select)} FROM "rollup_{table}" WHERE {" AND ".join(where)}'
+        if group_by:
+            sql += f' GROUP BY {", ".join(chr(34) + g + chr(34) for g in group_by)}'
+        sql += f' ORDER BY {order_by or ", ".join(chr(34) + g + chr(34) for g in group_by) or "1"}'
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        rows = self._query(sql, params)
+        for row in rows:
+            for kpi in kpis:
+                num, den = KPIS[kpi]
+                row[kpi] = _safe_divide(row.get(num), row.get(den))
+        return rows
+
+    def answer_template(self, name: str, params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Rows for a known SQL template if the store covers it, else None."""
+        start, end = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+        perf, creatives = "mart_platforms_performance", "mart_facebook_creatives"
+        perf_measures = ["cost", "impressions", "clicks", "leads", "purchases"]
+        creative_measures = ["cost", "impressions", "clicks", "leads"]
+
+        if name == "platforms_performance_daily" and self.covers(perf, start, end, perf_measures):
+            return self.aggregate(perf, start, end, ["date"], perf_measures, kpis=["ctr", "cpl", "cpa"])
+        if name == "platforms_performance_by_platform" and self.covers(perf, start, end, ["platform", *perf_measures]):
+            return self.aggregate(perf, start, end, ["date", "platform"], perf_measures, kpis=["ctr", "cpl", "cpa"])
+        if name == "creative_leaderboard" and self.covers(creatives, start, end, ["ad_url", "description", *creative_measures]):
+            return self.aggregate(
+                creatives, start, end, ["ad_name"], creative_measures, attributes=["ad_url", "description"],
+                kpis=["ctr", "cpl"], order_by='"cost" DESC', limit=params.get("limit"),
+            )
+        if name == "creative_daily_all" and self.covers(creatives, start, end, ["ad_url", *creative_measures]):
+            return self.aggregate(creatives, start, end, ["date", "ad_name"], creative_measures, attributes=["ad_url"])
+        if name == "creative_daily_top" and self.covers(creatives, start, end, creative_measures):
+            top = self.aggregate(creatives, start, end, ["ad_name"], ["cost"], order_by='"cost" DESC', limit=params.get("top_n"))
+            names = [r["ad_name"] for r in top]
+            if not names:
+                return []
+            return self.aggregate(
+                creatives, start, end, ["date", "ad_name"], creative_measures,
+                kpis=["ctr", "cpl"], where_in={"ad_name": names},
+            )
+        return None
+
+
+_store: Optional[RollupStore] = None
+_store_lock = threading.Lock()
+_refresh_started = False
+
+
+def _open_store() -> Optional[RollupStore]:
+    """
+    The refreshing process (tools/leader.py) opens the file read-write, the other
+    workers read-only. DuckDB allows no reader process next to a writer, so with
+    DuckDB the other workers answer from BigQuery; the SQLite backend serves them all.
+    """
+    leader = is_leader()
+    if not leader and _duckdb() is not None:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(ROLLUP_STORE_PATH)), exist_ok=True)
+    return RollupStore(ROLLUP_STORE_PATH, read_only=not leader)
+
+
+def get_rollup_store() -> Optional[RollupStore]:
+    """
+    Process-wide store, or None when ROLLUP_STORE_PATH is not configured or this
+    process cannot open it (yet). A read-only store is reopened read-write when this
+    process takes over the refresh.
+    """
+    global _store
+    if ROLLUP_STORE_PATH is None:
+        return None
+    if _store is None or (_store.read_only and is_leader()):
+        with _store_lock:
+            if _store is None or (_store.read_only and is_leader()):
+                try:
+                    _store = _open_store()
+                except Exception as e:
+                    logger.warning(f"Could not open the rollup store {ROLLUP_STORE_PATH}: {e}")
+                    _store = None
+    return _store
+
+
+def start_refresh_thread() -> None:
+    """
+    Refreshes the rollups now and then every ROLLUP_REFRESH_SECONDS in a daemon thread.
+    Only the process holding the refresh lock refreshes; the others keep checking
+    whether they should take over.
+    """
+    global _refresh_started
+    if ROLLUP_STORE_PATH is None:
+        return
+    with _store_lock:
+        if _refresh_started:
+            return
+        _refresh_started = True
+
+    def _loop():
+        while True:
+            try:
+                store = get_rollup_store()
+                if store is not None and not store.read_only:
+                    store.refresh_all()
+            except Exception as e:
+                logger.warning(f"Rollup refresh failed: {e}")
+            time.sleep(ROLLUP_REFRESH_SECONDS)
+
+    threading.Thread(target=_loop, name="rollup-refresh", daemon=True).start()
@@ -0,0 +1,334 @@
+import asyncio
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from .executor import execute_query
+from .rollups import get_rollup_store
+from .tools import MAX_QUERY_RESULT_ROWS, _as_int, _env
+from ...tools.datasets import DATASET_ARTIFACT_MIN_ROWS, store_dataset
+from ...tools.payload import compact_data, payload_rows
+
+logger = logging.getLogger(__name__)
+
+SQL_TEMPLATES_ENABLED = (_env("SQL_TEMPLATES_ENABLED", "true") or "").lower() not in ("0", "false", "no")
+
+MARTS = "tami4-471706.MARTS"
+DEFAULT_WINDOW_DAYS = 30
+FATIGUE_WINDOW_DAYS = 90
+# Fatigue scoring needs every creative's full daily series; it is passed on as an artifact
+FATIGUE_MAX_ROWS = _as_int("FATIGUE_MAX_ROWS", 300000)
+
+# Parameterized versions of the query shapes described in the data agent prompt.
+# Only typed parameters (dates, ints) are substituted, never user text.
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "platforms_performance_daily": {
+        "description": "Daily overall performance with CTR/CPL/CPA.",
+        "sql": f"""
+SELECT
+  date,
+  SUM(cost) AS cost,
+  SUM(impressions) AS impressions,
+  SUM(clicks) AS clicks,
+  SUM(leads) AS leads,
+  SUM(purchases) AS purchases,
+  SAFE_DIVIDE(SUM(clicks), SUM(impressions)) AS ctr,
+  SAFE_DIVIDE(SUM(cost), SUM(leads)) AS cpl,
+  SAFE_DIVIDE(SUM(cost), SUM(purchases)) AS cpa
+FROM `{MARTS}.mart_platforms_performance`
+WHERE date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+GROUP BY date
+ORDER BY date
+""",
+    },
+    "platforms_performance_by_platform": {
+        "description": "Daily performance split by platform.",
+        "sql": f"""
+SELECT
+  date,
+  platform,
+  SUM(cost) AS cost,
+  SUM(impressions) AS impressions,
+  SUM(clicks) AS clicks,
+  SUM(leads) AS leads,
+  SUM(purchases) AS purchases,
+  SAFE_DIVIDE(SUM(clicks), SUM(impressions)) AS ctr,
+  SAFE_DIVIDE(SUM(cost), SUM(leads)) AS cpl,
+  SAFE_DIVIDE(SUM(cost), SUM(purchases)) AS cpa
+FROM `{MARTS}.mart_platforms_performance`
+WHERE date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+GROUP BY date, platform
+ORDER BY date, platform
+""",
+    },
+    "creative_leaderboard": {
+        "description": "TOP N creatives by spend with truncated text attributes.",
+        "sql": f"""
+SELECT
+  ad_name,
+  ANY_VALUE(ad_url) AS ad_url,
+  ANY_VALUE(SUBSTR(description, 1, 200)) AS description,
+  SUM(cost) AS cost,
+  SUM(impressions) AS impressions,
+  SUM(clicks) AS clicks,
+  SUM(leads) AS leads,
+  SAFE_DIVIDE(SUM(clicks), SUM(impressions)) AS ctr,
+  SAFE_DIVIDE(SUM(cost), SUM(leads)) AS cpl
+FROM `{MARTS}.mart_facebook_creatives`
+WHERE date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+GROUP BY ad_name
+ORDER BY cost DESC
+LIMIT {{limit}}
+""",
+    },
+    "creative_daily_top": {
+        "description": "Daily time series for the TOP N creatives by spend.",
+        "sql": f"""
+WITH top_creatives AS (
+  SELECT ad_name
+  FROM `{MARTS}.mart_facebook_creatives`
+  WHERE date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+  GROUP BY ad_name
+  ORDER BY SUM(cost) DESC
+  LIMIT {{top_n}}
+)
+SELECT
+  c.date,
+  c.ad_name,
+  SUM(c.cost) AS cost,
+  SUM(c.impressions) AS impressions,
+  SUM(c.clicks) AS clicks,
+  SUM(c.leads) AS leads,
+  SAFE_DIVIDE(SUM(c.clicks), SUM(c.impressions)) AS ctr,
+  SAFE_DIVIDE(SUM(c.cost), SUM(c.leads)) AS cpl
+FROM `{MARTS}.mart_facebook_creatives` AS c
+JOIN top_creatives AS t USING (ad_name)
+WHERE c.date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+GROUP BY c.date, c.ad_name
+ORDER BY c.date, c.ad_name
+""",
+    },
+    "creative_daily_all": {
+        "description": "Daily time series for ALL creatives (fatigue scoring).",
+        "max_rows": FATIGUE_MAX_ROWS,
+        "sql": f"""
+SELECT
+  date,
+  ad_name,
+  ANY_VALUE(ad_url) AS ad_url,
+  SUM(cost) AS cost,
+  SUM(impressions) AS impressions,
+  SUM(clicks) AS clicks,
+  SUM(leads) AS leads
+FROM `{MARTS}.mart_facebook_creatives`
+WHERE date BETWEEN DATE '{{start_date}}' AND DATE '{{end_date}}'
+GROUP BY date, ad_name
+ORDER BY ad_name, date
+""",
+    },
+}
+
+# --- Request routing ---
+_CREATIVE_RE = re.compile(r"קריאייטיב|קריאטיב|מודע|באנר|creative|\bads?\b|fatigue|שחיק", re.IGNORECASE)
+_FATIGUE_RE = re.compile(r"שחיק|עייפות|fatigue|wear.?out", re.IGNORECASE)
+_OVER_TIME_RE = re.compile(r"לאורך זמן|מגמ|יומי|טרנד|שחיק|over time|trend|daily|fatigue", re.IGNORECASE)
+_PERFORMANCE_RE = re.compile(
+    r"ביצוע|לידים|עלות|הוצא|המרות|performance|spend|cost|leads|cpl|cpa|ctr|kpi",
+    re.IGNORECASE,
+)
+_PLATFORM_RE = re.compile(r"פלטפורמ|ערוצ|platform|channel", re.IGNORECASE)
+# Shapes the templates do not cover: send these to the LLM. This includes per-campaign
+# breakdowns and calendar windows (months, quarters, years, yesterday) that
+# resolve_window() would otherwise silently replace with the default window.
+_UNSUPPORTED_RE = re.compile(
+    r"מכשיר|קהל|גיל|מגדר|אזור|שעה|תמהיל|מונחי|טבל|מה קיים|קמפיי?נ|"
+    r"חודש|רבעון|השנה|שנה שעברה|שנת|אתמול|היום|"
+    r"\b(?:device|audience|age|gender|region|hour|adset|tamhil|client_terms|schema|tables?|sql|campaigns?"
+    r"|months?|monthly|quarters?|years?|ytd|mtd|yesterday|today)\b|what exists",
+    re.IGNORECASE,
+)
+_LAST_N_RE = re.compile(
+    r"(?:last|past|אחרונים|האחרונים|ב-?)\s*(\d{1,3})\s*(?:days|ימים|הימים|יום)|(\d{1,3})\s*(?:days|ימים|הימים|יום)",
+    re.IGNORECASE,
+)
+_DATE_RANGE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})\D{1,10}(\d{4}-\d{2}-\d{2})")
+_TOP_N_RE = re.compile(r"(?:top|טופ|ה?מובילים)\s*(\d{1,3})|(\d{1,3})\s*(?:המובילים|top)", re.IGNORECASE)
+
+
+def extract_request_text(raw: str) -> str:
+    """Pulls the user's question out of an AgentTool request (plain text or serialized JSON)."""
+    try:
+        payload = json.loads(raw)
+    except (TypeError, ValueError):
+        return raw or ""
+    if isinstance(payload, dict):
+        for key in ("user_request", "request", "question", "query"):
+            if isinstance(payload.get(key), str):
+                return payload[key]
+    return raw
+
+
+def resolve_window(
+    text: str, today: Optional[date] = None, default_days: int = DEFAULT_WINDOW_DAYS
+) -> Optional[Tuple[date, date, str]]:
+    """
+    Returns (start_date, end_date, assumption) for the date window mentioned in `text`,
+    or None when the window it mentions is invalid (an impossible date, "last 0 days").
+    """
+    today = today or datetime.now(timezone.utc).date()
+    end = today - timedelta(days=1)
+    m = _DATE_RANGE_RE.search(text)
+    if m:
+        try:
+            start, stop = sorted(date.fromisoformat(d) for d in m.groups())
+        except ValueError:
+            return None
+        return start, stop, f"Date range taken from the request: {start} to {stop}."
+    m = _LAST_N_RE.search(text)
+    if m:
+        days = int(m.group(1) or m.group(2))
+        if days < 1:
+            return None
+        return end - timedelta(days=days - 1), end, f"Date range: last {days} days ({end - timedelta(days=days - 1)} to {end})."
+    lowered = text.lower()
+    if "שבוע" in text or "week" in lowered:
+        return end - timedelta(days=6), end, f"Date range: last 7 days ({end - timedelta(days=6)} to {end})."
+    start = end - timedelta(days=default_days - 1)
+    return start, end, f"No date range specified; defaulted to last {default_days} days ({start} to {end})."
+
+
+_WEEK_RE = re.compile(r"ה?שבוע|\bweek\b", re.IGNORECASE)
+
+
+def strip_window(text: str) -> str:
+    """`text` without the date-window phrases resolve_window() reads."""
+    for pattern in (_DATE_RANGE_RE, _LAST_N_RE, _WEEK_RE):
+        text = pattern.sub(" ", text)
+    return text
+
+
+def route_request(text: str, today: Optional[date] = None) -> Optional[Tuple[str, Dict[str, Any], List[str]]]:
+    """
+    Maps a natural-language data request onto a template.
+
+    Returns (template_name, params, assumptions), or None when the request needs
+    a shape the templates do not cover and the LLM should write the SQL.
+    """
+    if not text or _UNSUPPORTED_RE.search(text):
+        return None
+    window = resolve_window(text, today)
+    if window is None:
+        return None
+    start, end, window_note = window
+    params: Dict[str, Any] = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+    assumptions = [window_note, "MARTS tables are assumed to represent תמי4-only data."]
+
+    m = _TOP_N_RE.search(text)
+    top_n = int(m.group(1) or m.group(2)) if m else None
+
+    if _CREATIVE_RE.search(text):
+        if _FATIGUE_RE.search(text) and top_n is None:
+            start, end, window_note = resolve_window(text, today, default_days=FATIGUE_WINDOW_DAYS) or window
+            params = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+            return "creative_daily_all", params, [window_note, assumptions[1], "Daily series for ALL creatives (fatigue scoring)."]
+        if _OVER_TIME_RE.search(text):
+            params["top_n"] = min(top_n or 10, 30)
+            return "creative_daily_top", params, assumptions + [f"Daily series for the TOP {params['top_n']} creatives by spend."]
+        params["limit"] = min(top_n or 30, 100)
+        return "creative_leaderboard", params, assumptions + [f"Leaderboard of the TOP {params['limit']} creatives by spend."]
+
+    if _PERFORMANCE_RE.search(text):
+        if _PLATFORM_RE.search(text):
+            return "platforms_performance_by_platform", params, assumptions
+        return "platforms_performance_daily", params, assumptions
+
+    return None
+
+
+def render_template(name: str, params: Dict[str, Any]) -> str:
+    return TEMPLATES[name]["sql"].format(**params).strip()
+
+
+def _run_from_rollups(name: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        store = get_rollup_store()
+        if store is None:
+            return None
+        rows = store.answer_template(name, params)
+    except Exception as e:
+        logger.warning(f"Rollup store lookup failed for {name}: {e}")
+        return None
+    if rows is None:
+        return None
+    return {"status": "SUCCESS", "rows": rows, "source": "rollup_store"}
+
+
+def run_template(name: str, params: Dict[str, Any], assumptions: List[str]) -> Dict[str, Any]:
+    """
+    Executes a template and formats the result as the data agent's output contract.
+    Served from the local rollup store when it covers the window, else from BigQuery.
+    """
+    sql = render_template(name, params)
+    result = _run_from_rollups(name, params) or execute_query(sql, max_rows=TEMPLATES[name].get("max_rows", MAX_QUERY_RESULT_ROWS))
+    if result.get("status") != "SUCCESS":
+        return {
+            "status": "ERROR",
+            "sql": sql,
+            "assumptions": assumptions,
+            "data": {"columns": [], "rows": []},
+            "notes": [f"template={name}"],
+            "error": {"message": "Query failed", "details": result.get("error_details", "")},
+        }
+    rows = result.get("rows") or []
+    notes = [f"template={name}"]
+    if result.get("source") == "rollup_store":
+        notes.append("Served from the local daily rollup store (equivalent to the SQL shown).")
+    if result.get("result_is_likely_truncated"):
+        notes.append("Result was truncated to the row limit.")
+    return {
+        "status": "SUCCESS",
+        "sql": sql,
+        "assumptions": assumptions,
+        "data": compact_data(list(rows[0].keys()) if rows else [], rows),
+        "notes": notes,
+        "error": None,
+    }
+
+
+async def template_fast_path(callback_context: Any) -> Optional[types.Content]:
+    """
+    before_agent_callback: answers known request shapes without a model round-trip.
+
+    Falls through to the LLM (returns None) when no template matches or the
+    templated query fails, so the agent can still discover and repair.
+    """
+    if not SQL_TEMPLATES_ENABLED:
+        return None
+    user_content = getattr(callback_context, "user_content", None)
+    if not user_content or not user_content.parts:
+        return None
+    raw = "".join(p.text or "" for p in user_content.parts)
+    route = route_request(extract_request_text(raw))
+    if route is None:
+        return None
+
+    name, params, assumptions = route
+    response = await asyncio.to_thread(run_template, name, params, assumptions)
+    if response["status"] != "SUCCESS":
+        logger.info(f"Template {name} failed, falling back to the LLM: {response['error']}")
+        return None
+
+    columns, rows = payload_rows(response)
+    if len(rows) >= DATASET_ARTIFACT_MIN_ROWS:
+        try:
+            response["data"] = await store_dataset(callback_context, columns, rows)
+        except Exception as e:
+            logger.warning(f"Could not store template result as an artifact, returning it inline: {e}")
+    return types.Content(
+        role="model",
+        parts=[types.Part(text=json.dumps(response, ensure_ascii=False, default=str))],
+    )
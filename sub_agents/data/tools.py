@@ -1,8 +1,16 @@
 import os
+import asyncio
 import inspect
-from typing import Optional
-from google.adk.tools.bigquery import BigQueryCredentialsConfig, BigQueryToolset
-from google.adk.tools.bigquery.config import BigQueryToolConfig, WriteMode
+import threading
+from typing import TYPE_CHECKING, List, Optional
+from google.adk.tools.base_toolset import BaseToolset
+
+if TYPE_CHECKING:
+    from google.adk.tools.bigquery import BigQueryCredentialsConfig, BigQueryToolset
+    from google.adk.tools.bigquery.config import BigQueryToolConfig
+
+# NOTE: google.adk.tools.bigquery (and google.cloud.bigquery under it) is imported inside
+# the builders below so that importing the agent does not pay for it on cold start.
 
 def _env(name: str, default: Optional[str] = None) -> Optional[str]:
     v = os.getenv(name)
@@ -26,14 +34,18 @@ BQ_LOCATION = _env("BQ_LOCATION", _env("GOOGLE_CLOUD_LOCATION"))
 DEFAULT_DATASET = _env("DEFAULT_DATASET")
 MAX_BYTES_BILLED = _as_int("MAX_BYTES_BILLED")
 GOOGLE_APPLICATION_CREDENTIALS = _env("GOOGLE_APPLICATION_CREDENTIALS")
+# Large results are passed by artifact reference (tools/datasets.py), so this can be raised
+MAX_QUERY_RESULT_ROWS = _as_int("MAX_QUERY_RESULT_ROWS", 200)
 
-def _safe_build_tool_config() -> BigQueryToolConfig:
+def _safe_build_tool_config() -> "BigQueryToolConfig":
     """Safely builds BigQueryToolConfig handling version differences."""
+    from google.adk.tools.bigquery.config import BigQueryToolConfig, WriteMode
+
     # BigQueryToolConfig is experimental and changes between versions.
     try:
         cfg = BigQueryToolConfig(
             write_mode=WriteMode.BLOCKED,
-            max_query_result_rows=200,
+            max_query_result_rows=MAX_QUERY_RESULT_ROWS,
             application_name="tami4-data-agent",
         )
     except Exception:
@@ -45,7 +57,7 @@ def _safe_build_tool_config() -> BigQueryToolConfig:
             except Exception: pass
         if hasattr(cfg, "max_query_result_rows"):
             try:
-                cfg.max_query_result_rows = 200
+                cfg.max_query_result_rows = MAX_QUERY_RESULT_ROWS
             except Exception: pass
         if hasattr(cfg, "application_name"):
             try:
@@ -73,8 +85,19 @@ def _safe_build_tool_config() -> BigQueryToolConfig:
 
     return cfg
 
+_CREDENTIALS = None
+_CREDENTIALS_LOCK = threading.Lock()
+
 def _load_google_credentials():
-    """Returns a google.auth credentials object."""
+    """Returns a google.auth credentials object, resolved once per process."""
+    global _CREDENTIALS
+    if _CREDENTIALS is None:
+        with _CREDENTIALS_LOCK:
+            if _CREDENTIALS is None:
+                _CREDENTIALS = _resolve_google_credentials()
+    return _CREDENTIALS
+
+def _resolve_google_credentials():
     import google.auth 
     from google.auth import exceptions as google_auth_exceptions
 
@@ -98,15 +121,25 @@ def _load_google_credentials():
             "No Google credentials found. Set GOOGLE_APPLICATION_CREDENTIALS or configure ADC."
         ) from e
 
-def _build_credentials_config() -> BigQueryCredentialsConfig:
+def _build_credentials_config() -> "BigQueryCredentialsConfig":
+    from google.adk.tools.bigquery import BigQueryCredentialsConfig
+
     creds = _load_google_credentials()
     sig = inspect.signature(BigQueryCredentialsConfig)
     if "credentials" in sig.parameters:
         return BigQueryCredentialsConfig(credentials=creds)
     return BigQueryCredentialsConfig(credentials=creds)
 
-def get_bigquery_toolset() -> BigQueryToolset:
+def get_bigquery_client():
+    """Returns a pooled google.cloud.bigquery.Client (see client.py)."""
+    from .client import client_pool
+
+    return client_pool.get()
+
+def get_bigquery_toolset() -> "BigQueryToolset":
     """Builds and returns the configured BigQueryToolset."""
+    from google.adk.tools.bigquery import BigQueryToolset
+
     tool_config = _safe_build_tool_config()
     credentials_config = _build_credentials_config()
 
@@ -118,6 +151,42 @@ def get_bigquery_toolset() -> BigQueryToolset:
             "get_dataset_info",
             "list_table_ids",
             "get_table_info",
-            "execute_sql",
         ],
     )
+
+def _execute_sql_tool():
+    from google.adk.tools.function_tool import FunctionTool
+    from .executor import execute_sql
+
+    return FunctionTool(execute_sql)
+
+class LazyBigQueryToolset(BaseToolset):
+    """
+    Defers credential loading and BigQueryToolset construction until the agent first
+    lists its tools, keeping Google auth off the import/cold-start path.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._toolset = None
+        self._lock = threading.Lock()
+
+    def _get_toolset(self):
+        if self._toolset is None:
+            with self._lock:
+                if self._toolset is None:
+                    self._toolset = get_bigquery_toolset()
+        return self._toolset
+
+    def warm_up(self) -> None:
+        self._get_toolset()
+
+    async def get_tools(self, readonly_context=None) -> List:
+        # Credential resolution can hit the metadata server; keep it off the event loop
+        toolset = self._toolset or await asyncio.to_thread(self._get_toolset)
+        # execute_sql is ours: it runs on the pooled clients and holds a job slot
+        return await toolset.get_tools(readonly_context) + [_execute_sql_tool()]
+
+    async def close(self) -> None:
+        if self._toolset is not None:
+            await self._toolset.close()
@@ -2,6 +2,8 @@ import os
 from google.adk.agents import LlmAgent
 from google.genai import types
 from .prompts import INSTRUCTION
+from .analytics import precompute_metrics
+from ...tools.response_cache import response_cache
 
 agent = LlmAgent(
     name="performance_analyst",
@@ -13,4 +15,8 @@ agent = LlmAgent(
         temperature=0.2, 
         response_mime_type="application/json"
     ),
+    # Identical analyses of the same data payload are answered from the response cache;
+    # otherwise KPIs, deltas and segments are precomputed so the model only narrates
+    before_model_callback=[response_cache.before_model, precompute_metrics],
+    after_model_callback=response_cache.after_model,
 )
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...tools.datasets import resolve_payload
+from ...tools.lazy import lazy_import
+from ...tools.payload import encode_columnar, find_request_payload, payload_rows, replace_request_text
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+PERFORMANCE_PRECOMPUTE = os.getenv("PERFORMANCE_PRECOMPUTE", "true").strip().lower() not in ("0", "false", "no", "off")
+# Replace the raw rows in the specialist prompt with a short preview once metrics are precomputed
+PERFORMANCE_STRIP_ROWS = os.getenv("PERFORMANCE_STRIP_ROWS", "true").strip().lower() not in ("0", "false", "no", "off")
+PREVIEW_ROWS = 5
+TOP_SEGMENTS = 3
+VOLATILITY_WINDOW = 7
+
+METRICS_FORMAT = "performance_metrics/v1"
+TIME_COLUMNS = ("date", "day", "ds")
+SEGMENT_DIMENSIONS = ("platform", "device", "audience", "age", "gender", "region", "campaign_name", "adset_name")
+MEASURES = ("cost", "impressions", "clicks", "leads", "purchases")
+# KPI -> (numerator, denominator, lower_is_better)
+KPIS = {
+    "ctr": ("clicks", "impressions", False),
+    "cpl": ("cost", "leads", True),
+    "cpa": ("cost", "purchases", True),
+}
+
+
+def _ratio(num: "np.ndarray", den: "np.ndarray") -> "np.ndarray":
+    """Vectorized SAFE_DIVIDE: NaN where the denominator is zero or missing."""
+    num = np.asarray(num, dtype="float64")
+    den = np.asarray(den, dtype="float64")
+    out = np.full(np.broadcast(num, den).shape, np.nan)
+    np.divide(num, den, out=out, where=(den != 0) & ~np.isnan(den))
+    return out
+
+
+def _pct_change(current: float, previous: float) -> Optional[float]:
+    if previous is None or current is None or not np.isfinite(previous) or not np.isfinite(current) or previous == 0:
+        return None
+    return round(float((current - previous) / abs(previous) * 100), 1)
+
+
+def _num(value: Any, digits: int = 4) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def _prepare(df: "pd.DataFrame") -> Tuple["pd.DataFrame", Optional[str], List[str], List[str]]:
+    """Normalizes column names/types; returns (df, time column, measures, dimensions)."""
+    df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
+    time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+    if time_col:
+        df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
+        df = df.dropna(subset=[time_col])
+    measures = [m for m in MEASURES if m in df.columns]
+    for col in measures + [k for k in KPIS if k in df.columns]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    dims = [d for d in SEGMENT_DIMENSIONS if d in df.columns and df[d].nunique(dropna=True) > 1]
+    return df, time_col, measures, dims
+
+
+def _kpi_frame(sums: "pd.DataFrame") -> "pd.DataFrame":
+    """Adds KPI columns to a frame of summed measures."""
+    for kpi, (num, den, _) in KPIS.items():
+        if num in sums.columns and den in sums.columns:
+            sums[kpi] = _ratio(sums[num].to_numpy(), sums[den].to_numpy())
+    return sums
+
+
+def _available_kpis(df: "pd.DataFrame", measures: List[str]) -> List[str]:
+    return [k for k, (num, den, _) in KPIS.items() if num in measures and den in measures]
+
+
+def _periods(df: "pd.DataFrame", time_col: str) -> Dict[str, Tuple[Any, Any]]:
+    """Last 7 days vs the 7 before (WoW) and second half vs first half of the window (PoP)."""
+    end = df[time_col].max()
+    start = df[time_col].min()
+    days = (end - start).days + 1
+    periods = {}
+    if days >= 14:
+        periods["wow"] = (end - pd.Timedelta(days=6), end - pd.Timedelta(days=13))
+    if days >= 2:
+        half = days // 2
+        periods["pop"] = (end - pd.Timedelta(days=half - 1), end - pd.Timedelta(days=2 * half - 1))
+    return periods
+
+
+def _split(df: "pd.DataFrame", time_col: str, current_start: Any, previous_start: Any) -> Tuple["pd.DataFrame", "pd.DataFrame"]:
+    t = df[time_col]
+    return df[t >= current_start], df[(t >= previous_start) & (t < current_start)]
+
+
+def _totals(df: "pd.DataFrame", measures: List[str]) -> "pd.Series":
+    return _kpi_frame(df[measures].sum(min_count=1).to_frame().T).iloc[0]
+
+
+def _key_metrics(df: "pd.DataFrame", time_col: Optional[str], measures: List[str], kpis: List[str], periods: Dict) -> List[Dict[str, Any]]:
+    totals = _totals(df, measures)
+    splits = {name: _split(df, time_col, *bounds) for name, bounds in periods.items()} if time_col else {}
+    split_totals = {name: (_totals(cur, measures), _totals(prev, measures)) for name, (cur, prev) in splits.items()}
+
+    metrics = []
+    for name in measures + kpis:
+        entry: Dict[str, Any] = {"name": name, "value": _num(totals.get(name))}
+        for period, (cur, prev) in split_totals.items():
+            entry[f"{period}_change_pct"] = _pct_change(cur.get(name), prev.get(name))
+        metrics.append(entry)
+    return metrics
+
+
+def _daily(df: "pd.DataFrame", time_col: str, measures: List[str]) -> "pd.DataFrame":
+    return _kpi_frame(df.groupby(df[time_col].dt.normalize())[measures].sum(min_count=1).sort_index())
+
+
+def _trends(daily: "pd.DataFrame", metrics: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Least-squares slope (as % of the mean per day) and rolling coefficient of variation."""
+    out = {}
+    x = np.arange(len(daily), dtype="float64")
+    for name in metrics:
+        y = daily[name].to_numpy(dtype="float64")
+        mask = np.isfinite(y)
+        if mask.sum() < 3:
+            continue
+        mean = y[mask].mean()
+        slope = np.polyfit(x[mask], y[mask], 1)[0]
+        rolling = daily[name].rolling(VOLATILITY_WINDOW, min_periods=3)
+        cv = (rolling.std() / rolling.mean()).replace([np.inf, -np.inf], np.nan)
+        slope_pct = slope / abs(mean) * 100 if mean else np.nan
+        out[name] = {
+            "direction": "up" if slope_pct > 0.5 else "down" if slope_pct < -0.5 else "flat",
+            "slope_pct_per_day": _num(slope_pct, 2),
+            "volatility_cv": _num(np.nanstd(y) / abs(mean) if mean else np.nan, 3),
+            "rolling_cv_latest": _num(cv.iloc[-1], 3) if len(cv) else None,
+            "min": _num(np.nanmin(y)),
+            "max": _num(np.nanmax(y)),
+        }
+    return out
+
+
+def _segments(df: "pd.DataFrame", time_col: Optional[str], measures: List[str], kpis: List[str], dims: List[str], periods: Dict) -> List[Dict[str, Any]]:
+    """Per-dimension winners and losers by the primary KPI change between the two periods."""
+    if not dims:
+        return []
+    primary = next((k for k in ("cpl", "cpa", "ctr") if k in kpis), None)
+    bounds = periods.get("wow") or periods.get("pop") if time_col else None
+
+    results = []
+    for dim in dims:
+        grouped = _kpi_frame(df.groupby(dim, dropna=True)[measures].sum(min_count=1))
+        if bounds is not None and primary is not None:
+            cur, prev = _split(df, time_col, *bounds)
+            cur_g = _kpi_frame(cur.groupby(dim)[measures].sum(min_count=1))
+            prev_g = _kpi_frame(prev.groupby(dim)[measures].sum(min_count=1))
+            joined = cur_g[[primary]].join(prev_g[[primary]], lsuffix="_cur", rsuffix="_prev", how="inner")
+            change = (joined[f"{primary}_cur"] - joined[f"{primary}_prev"]) / joined[f"{primary}_prev"].abs() * 100
+            basis = f"{primary} change % ({'wow' if 'wow' in periods else 'pop'})"
+            signed = True
+        else:
+            # No time axis: rank by the KPI (or first measure) level itself
+            metric = primary or measures[0]
+            change = grouped[metric]
+            basis = metric
+            signed = False
+        lower_is_better = primary is not None and KPIS[primary][2]
+        score = (-change if lower_is_better else change).replace([np.inf, -np.inf], np.nan).dropna().sort_values(ascending=False)
+
+        def _entry(name: Any) -> Dict[str, Any]:
+            row = grouped.loc[name]
+            evidence = {m: _num(row.get(m)) for m in ("cost", "leads") if m in row.index}
+            evidence.update({k: _num(row.get(k)) for k in kpis})
+            evidence["basis_value"] = _num(change.get(name), 2)
+            return {"name": str(name), "evidence": evidence}
+
+        top = list(score.index[:TOP_SEGMENTS])
+        bottom = [n for n in reversed(list(score.index[-TOP_SEGMENTS:])) if n not in top]
+        results.append({
+            "dimension": dim,
+            "ranked_by": basis,
+            # With a period comparison only improving / worsening segments qualify
+            "top_positive": [_entry(n) for n in top if not signed or score[n] > 0],
+            "top_negative": [_entry(n) for n in bottom if not signed or score[n] < 0],
+        })
+    return results
+
+
+def compute_performance_metrics(columns: List[str], rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Deterministic KPI stage for performance_analyst.
+
+    Returns totals with CTR/CPL/CPA and WoW / period-over-period changes, per-metric
+    trend and volatility, and the best/worst segments by platform/device/audience,
+    or None when the rows hold no usable measures.
+    """
+    if not rows:
+        return None
+    df, time_col, measures, dims = _prepare(pd.DataFrame(rows, columns=columns or None))
+    if not measures or df.empty:
+        return None
+    kpis = _available_kpis(df, measures)
+    periods = _periods(df, time_col) if time_col else {}
+
+    result: Dict[str, Any] = {
+        "format": METRICS_FORMAT,
+        "row_count": int(len(df)),
+        "key_metrics": _key_metrics(df, time_col, measures, kpis, periods),
+        "segments": _segments(df, time_col, measures, kpis, dims, periods),
+    }
+    if time_col:
+        result["window"] = {
+            "start": df[time_col].min().date().isoformat(),
+            "end": df[time_col].max().date().isoformat(),
+            "days": int(df[time_col].dt.normalize().nunique()),
+        }
+        result["periods"] = {
+            name: {"current_from": cur.date().isoformat(), "previous_from": prev.date().isoformat()}
+            for name, (cur, prev) in periods.items()
+        }
+        result["trends"] = _trends(_daily(df, time_col, measures), measures + kpis)
+    return result
+
+
+# --- Specialist integration ---
+
+async def precompute_metrics(callback_context: Any, llm_request: Any) -> None:
+    """
+    before_model_callback: computes the KPI structure from the data payload and adds it
+    to the prompt, so the model narrates instead of calculating.
+    """
+    if not PERFORMANCE_PRECOMPUTE:
+        return None
+    found = find_request_payload(llm_request)
+    if found is None:
+        return None
+    ci, pi, request, data_payload = found
+    if data_payload.get("status") == "ERROR":
+        return None
+    try:
+        resolved = await resolve_payload(data_payload, callback_context)
+        columns, rows = payload_rows(resolved)
+        metrics = await asyncio.to_thread(compute_performance_metrics, columns, rows)
+    except Exception as e:
+        logger.warning(f"Performance precompute failed, the model will work from the raw rows: {e}")
+        return None
+    if metrics is None:
+        return None
+
+    text = llm_request.contents[ci].parts[pi].text
+    if PERFORMANCE_STRIP_ROWS:
+        data_payload = dict(data_payload, data={
+            "omitted": "Rows summarized in PRECOMPUTED_METRICS; preview only.",
+            "row_count": len(rows),
+            "columns": columns,
+            "preview": encode_columnar(rows[:PREVIEW_ROWS], columns),
+        })
+        text = json.dumps(dict(request, data_payload=data_payload), ensure_ascii=False, default=str)
+    text += "\n\nPRECOMPUTED_METRICS:\n" + json.dumps(metrics, ensure_ascii=False, separators=(",", ":"))
+    replace_request_text(llm_request, ci, pi, text)
+    return None
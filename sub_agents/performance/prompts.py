@@ -25,6 +25,20 @@ LANGUAGE REQUIREMENT
 - ALL output MUST be in Hebrew.
 - Mention תמי4 explicitly in Summary and Recommendations.
 
+DATA PAYLOAD FORMAT
+- data_payload.data is usually "columnar/v1": "columns", "dtypes", and "data" with one array per column (same row order across arrays).
+- Columns listed in "dictionaries" hold integer codes: value = dictionaries[column][code] (null stays null).
+- Refer to entities (platforms, creatives, dates) by their decoded values, never by codes.
+- Large datasets arrive as an "artifact_ref/v1" handle instead: use its "summary" (per-column min/max/sum/mean, top values) and "preview" rows, plus any precomputed metrics provided.
+
+PRECOMPUTED METRICS
+- The request may end with a "PRECOMPUTED_METRICS" JSON block ("performance_metrics/v1"), computed deterministically from the full dataset:
+  - key_metrics: totals with ctr/cpl/cpa and wow_change_pct / pop_change_pct (percent; null if not computable).
+  - trends: per-metric direction, slope_pct_per_day, volatility_cv, rolling_cv_latest.
+  - segments: per dimension, top_positive / top_negative with evidence.
+- When present, use these numbers VERBATIM for key_metrics and segments_he; do NOT recompute from the preview rows.
+- Your job is then to diagnose and narrate what the numbers mean.
+
 ANALYSIS METHOD
 1) Scope validation: time range, KPIs.
 2) Trend analysis: direction, volatility.
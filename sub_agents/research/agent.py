@@ -3,6 +3,7 @@ from google.adk.agents import LlmAgent
 from google.adk.tools.google_search_tool import GoogleSearchTool
 from google.genai import types
 from .prompts import INSTRUCTION
+from .cache import research_cache
 
 agent = LlmAgent(
     name="research_agent",
@@ -15,4 +16,7 @@ agent = LlmAgent(
         top_p=1.0,
         response_mime_type="application/json"
     ),
+    # Repeated competitor/market questions are answered from the research cache
+    before_model_callback=research_cache.before_model,
+    after_model_callback=research_cache.after_model,
 )
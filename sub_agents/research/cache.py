@@ -0,0 +1,209 @@
+"""
+Cache of research_agent answers with per-topic TTLs and stale-while-revalidate.
+
+Grounded search happens inside the model call, so the unit cached is the research
+agent's final response, keyed on the intent of the question: its topic plus the set of
+normalized words (order, brand spelling and filler words do not matter). A fresh entry
+answers at once; a stale one answers at once too and is refreshed in the background by
+re-running the same model request; past `max_stale` it is a miss.
+
+`fetch` is the coroutine that produces a response for an LlmRequest: by default the
+research agent's own model, in tests and benchmarks any fake (e.g. ScriptedLlm).
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from google.adk.models.llm_response import LlmResponse
+
+from ...tools.cache import LRUCache
+from ...tools.coalescing import normalize_words
+from ...tools.response_cache import BYPASS_STATE_KEY, MemoryBackend, SqliteBackend
+from ...tools.tracing import metrics
+from ..data.templates import extract_request_text
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+RESEARCH_CACHE_ENABLED = os.getenv("RESEARCH_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+RESEARCH_CACHE_BACKEND = os.getenv("RESEARCH_CACHE_BACKEND", "memory").strip().lower()
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", ".cache/research.sqlite")
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "256"))
+# Stale entries are still served (and refreshed) until ttl * this factor
+RESEARCH_STALE_FACTOR = float(os.getenv("RESEARCH_STALE_FACTOR", "4"))
+
+# (pattern, default TTL in seconds), first match wins; override with RESEARCH_TTL_<TOPIC>_SECONDS
+TOPICS: Dict[str, Tuple[re.Pattern, int]] = {
+    "news": (re.compile(r"חדשות|עדכונ|השבוע|היום|לאחרונה|news|latest|recent|this week|today", re.IGNORECASE), 3 * 3600),
+    "competitors": (re.compile(r"מתחר|competitor|rival|alternative", re.IGNORECASE), 7 * 24 * 3600),
+    "market": (re.compile(r"שוק|טרנד|מגמ|תעשי|בנצ'?מרק|market|trend|industry|benchmark", re.IGNORECASE), 3 * 24 * 3600),
+    "positioning": (re.compile(r"מיצוב|מותג|מה זה|positioning|brand|what is", re.IGNORECASE), 30 * 24 * 3600),
+}
+DEFAULT_TOPIC = "general"
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def topic_ttl(topic: str) -> int:
+    default = TOPICS[topic][1] if topic in TOPICS else DEFAULT_TTL_SECONDS
+    return int(os.getenv(f"RESEARCH_TTL_{topic.upper()}_SECONDS", str(default)))
+
+
+def classify_topic(text: str) -> str:
+    return next((topic for topic, (pattern, _) in TOPICS.items() if pattern.search(text)), DEFAULT_TOPIC)
+
+
+# Question words that do not change what is searched for
+_QUESTION_WORDS = {"מי", "מהם", "מהן", "מהי", "מהו", "איך", "אילו", "who", "which", "how", "does", "do", "about", "tell"}
+# Hebrew proclitics (the/in/and/to): "בשוק" and "שוק" are the same search
+_PREFIX_RE = re.compile(r"^[הבול]{1,2}(?=\w{3})")
+
+
+def research_key(text: str) -> Tuple[str, str]:
+    """(topic, cache key) for a research question."""
+    question = extract_request_text(text)
+    topic = classify_topic(question)
+    words = {_PREFIX_RE.sub("", w) for w in normalize_words(question) if w not in _QUESTION_WORDS}
+    return topic, json.dumps([topic, sorted(words)], ensure_ascii=False)
+
+
+def _request_text(llm_request: Any) -> str:
+    for content in reversed(getattr(llm_request, "contents", None) or []):
+        if content.role == "user":
+            text = "".join(p.text or "" for p in (content.parts or []))
+            if text:
+                return text
+    return ""
+
+
+def _cacheable(llm_response: Any) -> bool:
+    content = getattr(llm_response, "content", None)
+    if llm_response is None or getattr(llm_response, "partial", False) or llm_response.error_code or content is None:
+        return False
+    return bool(content.parts) and not any(p.function_call for p in content.parts)
+
+
+async def model_fetch(model: Any, llm_request: Any) -> Optional[LlmResponse]:
+    """Runs `llm_request` against `model` outside an invocation; returns the final response."""
+    final = None
+    async for response in model.generate_content_async(llm_request, stream=False):
+        if not getattr(response, "partial", False):
+            final = response
+    return final
+
+
+class ResearchCache:
+    """
+    Use `before_model` / `after_model` as research_agent's model callbacks.
+    `clock` returns wall-clock seconds (entries may outlive the process with SQLite).
+    """
+
+    def __init__(self, backend: Any, clock: Callable[[], float] = time.time, stale_factor: float = RESEARCH_STALE_FACTOR):
+        self.backend = backend
+        self.clock = clock
+        self.stale_factor = max(1.0, stale_factor)
+        # Key of the in-flight request, per (invocation, agent), for after_model
+        self._pending = LRUCache(max_entries=1024, ttl_seconds=3600)
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def lookup(self, key: str, topic: str) -> Tuple[str, Optional[LlmResponse]]:
+        """("fresh" | "stale" | "miss", cached response)."""
+        raw = self.backend.get(key)
+        if raw is None:
+            return "miss", None
+        entry = json.loads(raw)
+        age = self.clock() - entry["created"]
+        ttl = topic_ttl(topic)
+        if age > ttl * self.stale_factor:
+            return "miss", None
+        return ("fresh" if age <= ttl else "stale"), LlmResponse.model_validate(entry["response"])
+
+    def store(self, key: str, llm_response: Any) -> None:
+        entry = {"created": self.clock(), "response": llm_response.model_dump(mode="json", exclude_none=True)}
+        self.backend.set(key, json.dumps(entry, ensure_ascii=False))
+
+    def refresh(self, key: str, llm_request: Any, fetch: Callable[[Any], Awaitable[Optional[LlmResponse]]]) -> Optional[asyncio.Task]:
+        """Re-runs `llm_request` in the background and stores the result; one refresh per key at a time."""
+        if key in self._refreshing:
+            return None
+        self._refreshing.add(key)
+        request = llm_request.model_copy(deep=True)
+
+        async def _run() -> None:
+            try:
+                response = await fetch(request)
+                if _cacheable(response):
+                    self.store(key, response)
+                    metrics.inc("tami4_research_cache_refreshes_total", help="Background refreshes of stale research answers.", status="ok")
+            except Exception as e:
+                metrics.inc("tami4_research_cache_refreshes_total", help="Background refreshes of stale research answers.", status="error")
+                logger.warning(f"Research cache refresh failed, serving the stale answer until it expires: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Waits for the background refreshes in flight (tests, benchmarks, shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _fetch_for(self, callback_context: Any) -> Optional[Callable[[Any], Awaitable[Optional[LlmResponse]]]]:
+        agent = getattr(getattr(callback_context, "_invocation_context", None), "agent", None)
+        model = getattr(agent, "canonical_model", None)
+        return (lambda request: model_fetch(model, request)) if model is not None else None
+
+    async def before_model(self, callback_context: Any, llm_request: Any) -> Optional[LlmResponse]:
+        """before_model_callback: answers from the cache, refreshing a stale entry in the background."""
+        if not RESEARCH_CACHE_ENABLED:
+            return None
+        text = _request_text(llm_request)
+        if not text:
+            return None
+        topic, key = research_key(text)
+        status, cached = ("miss", None) if callback_context.state.get(BYPASS_STATE_KEY) else self.lookup(key, topic)
+        metrics.inc("tami4_research_cache_total", help="Research cache lookups by result.", result=status, topic=topic)
+        if cached is not None:
+            if status == "stale":
+                fetch = self._fetch_for(callback_context)
+                if fetch is not None:
+                    self.refresh(key, llm_request, fetch)
+            return cached
+        self._pending.set((callback_context.invocation_id, callback_context.agent_name), (key, topic))
+        return None
+
+    def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        """after_model_callback: stores the final grounded answer."""
+        if getattr(llm_response, "partial", False):
+            return None
+        pending = self._pending.pop((callback_context.invocation_id, callback_context.agent_name))
+        if pending is None or not _cacheable(llm_response):
+            return None
+        try:
+            self.store(pending[0], llm_response)
+        except Exception as e:
+            logger.warning(f"Could not store research answer in the cache: {e}")
+        return None
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def _build_backend() -> Any:
+    if RESEARCH_CACHE_BACKEND == "sqlite":
+        try:
+            return SqliteBackend(path=RESEARCH_CACHE_PATH, max_entries=RESEARCH_CACHE_MAX_ENTRIES, ttl_seconds=None)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not open research cache at {RESEARCH_CACHE_PATH}, using memory: {e}")
+    return MemoryBackend(max_entries=RESEARCH_CACHE_MAX_ENTRIES, ttl_seconds=None)
+
+
+research_cache = ResearchCache(_build_backend())
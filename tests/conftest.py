@@ -0,0 +1,16 @@
+"""
+The repository root is the `tami4_agent` package (deployments check it out under that
+name). Register it under that name whatever the checkout directory is called, so
+`pytest tests` runs from the repository root.
+"""
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "tami4_agent" not in sys.modules:
+    spec = importlib.machinery.ModuleSpec("tami4_agent", None, is_package=True)
+    spec.submodule_search_locations = [ROOT]
+    sys.modules["tami4_agent"] = importlib.util.module_from_spec(spec)
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from tami4_agent.sub_agents.data import client
+from tami4_agent.sub_agents.data.client import BigQueryClientPool, CostGate, JobSlotTimeout, QueryCostExceeded, job_slot
+
+
+def _estimator(bytes_processed):
+    calls = []
+
+    def estimate(sql, project_id):
+        calls.append(sql)
+        return {"bytes_processed": bytes_processed, "statement_type": "SELECT"}
+
+    return estimate, calls
+
+
+def test_cost_gate_rejects_over_budget_query():
+    estimate, _ = _estimator(2_000)
+    gate = CostGate(budget_bytes=1_000, estimator=estimate)
+    with pytest.raises(QueryCostExceeded) as e:
+        gate.check("SELECT * FROM t")
+    assert e.value.estimated_bytes == 2_000 and e.value.budget_bytes == 1_000
+
+
+def test_cost_gate_passes_and_caches_estimates():
+    estimate, calls = _estimator(500)
+    gate = CostGate(budget_bytes=1_000, estimator=estimate)
+    assert gate.check("SELECT 1") == {"sql": "SELECT 1", "estimated_bytes": 500}
+    gate.check("SELECT 1")
+    assert calls == ["SELECT 1"]
+
+
+def test_job_slot_times_out_when_all_slots_are_taken(monkeypatch):
+    monkeypatch.setattr(client, "_job_slots", threading.BoundedSemaphore(1))
+    with job_slot():
+        with pytest.raises(JobSlotTimeout):
+            with job_slot(timeout=0.01):
+                pass
+    # The slot is free again once the job is done
+    with job_slot(timeout=0.01):
+        pass
+
+
+def test_pool_builds_up_to_size_then_rotates():
+    built = []
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    pool = BigQueryClientPool(size=2, factory=factory, credentials_fn=None)
+    got = [pool.get() for _ in range(5)]
+    assert len(built) == 2
+    assert got == [built[0], built[1], built[0], built[1], built[0]]
+
+
+def test_pool_configure_drops_existing_clients():
+    pool = BigQueryClientPool(size=1, factory=lambda: "old", credentials_fn=None)
+    assert pool.get() == "old"
+    pool.configure(factory=lambda: "new", credentials_fn=None)
+    assert pool.get() == "new"
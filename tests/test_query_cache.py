@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from tami4_agent.benchmarks.fakes import FakeBigQueryClient, build_marts
+from tami4_agent.sub_agents.data.cache import QueryCache
+
+TABLE = "tami4-471706.MARTS.mart_platforms_performance"
+SQL = f"SELECT platform, SUM(cost) AS cost FROM `{TABLE}` WHERE date >= DATE '2025-01-01' GROUP BY platform"
+RESULT = {"status": "SUCCESS", "rows": [{"platform": "facebook", "cost": 1.0}]}
+
+
+def _cache():
+    fake = FakeBigQueryClient(build_marts(days=7))
+    return fake, QueryCache(table_version_fn=lambda table_id: fake.get_table(table_id).modified.isoformat())
+
+
+def test_hit_while_source_table_is_unchanged():
+    _, cache = _cache()
+    cache.put(SQL, RESULT, "tami4-471706")
+    assert cache.get(SQL, "tami4-471706") == RESULT
+    # Same query modulo whitespace
+    assert cache.get(SQL.replace(" GROUP", "\n  GROUP"), "tami4-471706") == RESULT
+
+
+def test_miss_after_source_table_changes():
+    fake, cache = _cache()
+    cache.put(SQL, RESULT, "tami4-471706")
+    fake.loaded_at += timedelta(minutes=5)
+    # What the metadata TTL expiring does
+    cache.invalidate_table(TABLE)
+    assert cache.get(SQL, "tami4-471706") is None
+    # The stale entry is gone, not just skipped
+    fake.loaded_at -= timedelta(minutes=5)
+    cache.invalidate_table(TABLE)
+    assert cache.get(SQL, "tami4-471706") is None
+
+
+def test_volatile_queries_are_not_cached():
+    _, cache = _cache()
+    sql = f"SELECT CURRENT_TIMESTAMP() AS now, COUNT(*) FROM `{TABLE}`"
+    cache.put(sql, RESULT, "tami4-471706")
+    assert cache.get(sql, "tami4-471706") is None
@@ -0,0 +1,56 @@
+from tami4_agent.sub_agents.data.rewriter import DEFAULT_WINDOW_DAYS, rewrite_query
+
+TABLE = "`tami4-471706.MARTS.mart_platforms_performance`"
+WINDOW = (
+    f"BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL {DEFAULT_WINDOW_DAYS} DAY) AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)"
+)
+
+
+def _rewrite(sql: str) -> str:
+    return rewrite_query(sql, columns_fn=lambda table: None)["sql"]
+
+
+def test_injects_window_without_date_filter():
+    sql = f"SELECT platform, SUM(cost) FROM {TABLE} WHERE platform = 'facebook' GROUP BY platform"
+    assert f"WHERE mart_platforms_performance.date {WINDOW} AND (platform = 'facebook')" in _rewrite(sql)
+
+
+def test_injects_window_without_where():
+    sql = f"SELECT SUM(cost) FROM {TABLE}"
+    assert _rewrite(sql) == f"{sql} WHERE mart_platforms_performance.date {WINDOW}"
+
+
+def test_keeps_sargable_range():
+    sql = f"SELECT SUM(cost) FROM {TABLE} WHERE date >= '2025-01-01'"
+    assert _rewrite(sql) == sql
+
+
+def test_keeps_date_diff_filter():
+    sql = f"SELECT SUM(cost) FROM {TABLE} WHERE DATE_DIFF(CURRENT_DATE(), date, DAY) <= 90"
+    assert WINDOW not in _rewrite(sql)
+
+
+def test_keeps_extract_year_in_filter():
+    sql = f"SELECT SUM(cost) FROM {TABLE} WHERE EXTRACT(YEAR FROM date) IN (2024, 2025)"
+    assert WINDOW not in _rewrite(sql)
+
+
+def test_keeps_date_trunc_month_filter():
+    sql = f"SELECT SUM(cost) FROM {TABLE} WHERE DATE_TRUNC(date, MONTH) >= '2024-01-01'"
+    assert WINDOW not in _rewrite(sql)
+
+
+def test_keeps_filter_in_join_condition():
+    sql = f"SELECT SUM(p.cost) FROM {TABLE} p JOIN {TABLE} c ON p.platform = c.platform AND p.date >= '2025-01-01'"
+    assert WINDOW not in _rewrite(sql)
+
+
+def test_derives_range_from_extract_year():
+    sql = f"SELECT SUM(cost) FROM {TABLE} WHERE EXTRACT(YEAR FROM date) = 2025"
+    rewritten = _rewrite(sql)
+    assert "'2025-01-01'" in rewritten and WINDOW not in rewritten
+
+
+def test_join_on_dates_alone_is_not_a_filter():
+    sql = f"SELECT SUM(p.cost) FROM {TABLE} p JOIN {TABLE} c ON p.date = c.date"
+    assert WINDOW in _rewrite(sql)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tami4_agent.benchmarks.fakes import PLATFORMS, FakeBigQueryClient, build_marts
+from tami4_agent.sub_agents.data import rollups
+from tami4_agent.sub_agents.data.rollups import RollupStore
+
+PERF = "mart_platforms_performance"
+TODAY = datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def fake():
+    return FakeBigQueryClient(build_marts(days=30, today=TODAY))
+
+
+@pytest.fixture
+def store(tmp_path, fake, monkeypatch):
+    # The SQLite backend, whether or not DuckDB is installed
+    monkeypatch.setattr(rollups, "_duckdb", lambda: None)
+    fetched = []
+
+    def fetch(sql):
+        fetched.append(sql)
+        return {"status": "SUCCESS", "rows": list(fake.query_and_wait(sql))}
+
+    store = RollupStore(str(tmp_path / "rollups.sqlite"), fetch_fn=fetch)
+    store.fetched = fetched
+    return store
+
+
+def _total_cost(store, start, end):
+    return store.aggregate(PERF, start, end, [], ["cost"])[0]["cost"]
+
+
+def test_covers_the_loaded_window_and_columns(store):
+    store.refresh(PERF, today=TODAY)
+    start, end = TODAY - timedelta(days=30), TODAY - timedelta(days=1)
+    assert store.date_range(PERF) == (start, end)
+    assert store.covers(PERF, start, end, ["date", "platform", "cost", "cpl"])
+    assert not store.covers(PERF, start - timedelta(days=1), end, ["cost"])
+    assert not store.covers(PERF, start, TODAY, ["cost"])
+    assert not store.covers(PERF, start, end, ["campaign_name"])
+
+
+def test_refresh_reloads_only_the_restated_days(store, fake):
+    store.refresh(PERF, today=TODAY)
+    start, end = TODAY - timedelta(days=30), TODAY - timedelta(days=1)
+    before = _total_cost(store, start, end)
+
+    # Late-arriving spend for yesterday
+    changed = fake.conn.execute(
+        "SELECT COUNT(*) FROM mart_platforms_performance WHERE date = ?", [end.isoformat()]
+    ).fetchone()[0]
+    fake.conn.execute("UPDATE mart_platforms_performance SET cost = cost + 100 WHERE date = ?", [end.isoformat()])
+    store.refresh(PERF, today=TODAY)
+
+    restate_from = end + timedelta(days=1) - timedelta(days=rollups.ROLLUP_RESTATE_DAYS)
+    assert f"DATE '{restate_from.isoformat()}'" in store.fetched[-1]
+    assert len(store.aggregate(PERF, end, end, ["platform"], ["cost"])) == len(PLATFORMS)
+    assert _total_cost(store, start, end) == pytest.approx(before + 100 * changed)
+
+
+def test_read_only_store_serves_but_does_not_refresh(tmp_path, store):
+    store.refresh(PERF, today=TODAY)
+    reader = RollupStore(str(tmp_path / "rollups.sqlite"), read_only=True)
+    assert reader.date_range(PERF) == store.date_range(PERF)
+    with pytest.raises(RuntimeError):
+        reader.refresh(PERF, today=TODAY)
@@ -0,0 +1,256 @@
+"""
+Admission control for the agent run endpoints.
+
+Every /run, /run_sse and /run_progressive request takes a slot from its worker's
+limiter and, when several worker processes serve the app, a lease from a SQLite
+table they all share.
+Requests beyond the limits wait in a bounded queue; a full queue, or a wait longer
+than ADMISSION_QUEUE_TIMEOUT_SECONDS, is answered at once with 429 and Retry-After
+instead of piling up until the client times out.
+
+The global limit is derived from the model quota (concurrent Vertex calls, a request
+has up to MODEL_CALLS_PER_REQUEST in flight) and the BigQuery job budget shared by
+all workers, unless ADMISSION_GLOBAL_MAX_INFLIGHT sets it directly.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Concurrent model calls the Vertex quota allows across all workers
+MODEL_MAX_CONCURRENT_CALLS = int(os.getenv("MODEL_MAX_CONCURRENT_CALLS", "24"))
+# Orchestrator + data agent are sequential, specialists run in parallel
+MODEL_CALLS_PER_REQUEST = int(os.getenv("MODEL_CALLS_PER_REQUEST", "3"))
+ADMISSION_GLOBAL_MAX_INFLIGHT = int(os.getenv("ADMISSION_GLOBAL_MAX_INFLIGHT", "0"))
+ADMISSION_WORKER_MAX_INFLIGHT = int(os.getenv("ADMISSION_WORKER_MAX_INFLIGHT", "0"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "0"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+# A lease left behind by a crashed worker expires after this; leases of running requests
+# are renewed every third of it, however long the response streams
+ADMISSION_LEASE_TTL_SECONDS = float(os.getenv("ADMISSION_LEASE_TTL_SECONDS", "300"))
+ADMISSION_DB_PATH = os.getenv("ADMISSION_DB_PATH", ".data/admission.sqlite")
+ADMISSION_PATHS = tuple(p.strip() for p in os.getenv("ADMISSION_PATHS", "/run,/run_sse,/run_progressive").split(",") if p.strip())
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server is busy ({reason}), retry in {math.ceil(retry_after)}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def global_max_inflight(bq_max_jobs: int) -> int:
+    """Requests all workers may run at once: what both the model quota and the BigQuery job budget allow."""
+    if ADMISSION_GLOBAL_MAX_INFLIGHT > 0:
+        return ADMISSION_GLOBAL_MAX_INFLIGHT
+    by_model = MODEL_MAX_CONCURRENT_CALLS // max(1, MODEL_CALLS_PER_REQUEST)
+    return max(1, min(by_model, bq_max_jobs))
+
+
+class GlobalLeases:
+    """
+    Cross-process counting semaphore: one row per running request in a SQLite table
+    shared by all workers. Rows expire after `ttl_seconds` unless renewed, so a crashed
+    worker cannot hold its slots forever.
+    """
+
+    def __init__(self, limit: int, path: str = ADMISSION_DB_PATH, ttl_seconds: float = ADMISSION_LEASE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.limit = max(1, limit)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS leases (id TEXT PRIMARY KEY, pid INTEGER, expires REAL)")
+        # Leases of an earlier process that had this pid
+        self._conn.execute("DELETE FROM leases WHERE pid = ?", (os.getpid(),))
+
+    def try_acquire(self) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+                (active,) = self._conn.execute("SELECT COUNT(*) FROM leases").fetchone()
+                lease_id = None
+                if active < self.limit:
+                    lease_id = uuid.uuid4().hex
+                    self._conn.execute("INSERT INTO leases VALUES (?, ?, ?)", (lease_id, os.getpid(), now + self.ttl_seconds))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return lease_id
+
+    def renew(self, lease_id: str) -> bool:
+        """Pushes the lease's expiry `ttl_seconds` ahead; False if it has already expired and been reaped."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires = ? WHERE id = ?", (time.time() + self.ttl_seconds, lease_id)
+            )
+            return cursor.rowcount > 0
+
+    def release(self, lease_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    def active(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM leases WHERE expires >= ?", (time.time(),)).fetchone()[0]
+
+
+class AdmissionController:
+    """
+    Per-worker limiter: at most `max_inflight` requests run, at most `max_queue` wait,
+    and none waits longer than `queue_timeout`. With `leases`, a request also needs a
+    global lease before it runs.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int,
+        max_queue: int,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        leases: Optional[GlobalLeases] = None,
+    ):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.leases = leases
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._waiting = 0
+        # Moving average of request duration, for Retry-After
+        self._avg_seconds = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _retry_after(self) -> float:
+        return max(1.0, self._avg_seconds * (1 + self._waiting / self.max_inflight))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        metrics.inc("tami4_admission_rejected_total", help="Requests turned away by admission control.", reason=reason)
+        return AdmissionRejected(reason, self._retry_after())
+
+    async def acquire(self) -> Optional[str]:
+        """Waits for a slot (and a global lease); returns the lease id or raises AdmissionRejected."""
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise self._reject("queue_full")
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.queue_timeout
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout")
+        finally:
+            self._waiting -= 1
+
+        lease_id = None
+        if self.leases is not None:
+            delay = 0.02
+            try:
+                while (lease_id := await asyncio.to_thread(self.leases.try_acquire)) is None:
+                    if time.monotonic() + delay > deadline:
+                        raise self._reject("global_limit")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+            except BaseException:
+                self._slots.release()
+                raise
+        metrics.observe("tami4_admission_wait_seconds", time.perf_counter() - started, help="Time requests spent queued for admission.")
+        return lease_id
+
+    async def keep_alive(self, lease_id: str) -> None:
+        """Renews a global lease until cancelled, for requests that outlive the lease TTL."""
+        interval = max(0.1, self.leases.ttl_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(self.leases.renew, lease_id):
+                    logger.warning(f"Admission lease {lease_id} expired before it could be renewed")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew admission lease {lease_id}: {e}")
+
+    async def release(self, lease_id: Optional[str], duration: Optional[float] = None) -> None:
+        if duration is not None:
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * duration
+        try:
+            if lease_id is not None:
+                await asyncio.to_thread(self.leases.release, lease_id)
+        finally:
+            self._slots.release()
+
+
+def build_controller(bq_max_jobs: int, workers: int = WEB_CONCURRENCY) -> AdmissionController:
+    """The limiter for one worker; its share of the global limit, and shared leases when there are several workers."""
+    workers = max(1, workers)
+    limit = global_max_inflight(bq_max_jobs)
+    per_worker = ADMISSION_WORKER_MAX_INFLIGHT or math.ceil(limit / workers)
+    leases = GlobalLeases(limit) if workers > 1 else None
+    return AdmissionController(
+        max_inflight=per_worker,
+        max_queue=ADMISSION_MAX_QUEUE or 2 * per_worker,
+        leases=leases,
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to `paths`. The slot is held (and
+    its global lease renewed) until the response body is complete, so streamed (SSE)
+    runs count for their whole length.
+    """
+
+    def __init__(self, app: Any, controller: AdmissionController, paths: Iterable[str] = ADMISSION_PATHS):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope.get("method") != "POST" or scope.get("path") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            lease_id = await self.controller.acquire()
+        except AdmissionRejected as e:
+            await _send_429(send, e)
+            return
+        started = time.perf_counter()
+        renewal = asyncio.create_task(self.controller.keep_alive(lease_id)) if lease_id is not None else None
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+            await self.controller.release(lease_id, time.perf_counter() - started)
+
+
+async def _send_429(send: Callable, rejection: AdmissionRejected) -> None:
+    body = json.dumps({"status": "ERROR", "error_details": str(rejection), "reason": rejection.reason}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(math.ceil(rejection.retry_after)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
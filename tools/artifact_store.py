@@ -0,0 +1,356 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from google.adk.artifacts.base_artifact_service import BaseArtifactService
+from google.genai import types
+
+from .tracing import metrics
+
+try:
+    from google.adk.artifacts.base_artifact_service import ArtifactVersion
+except ImportError:  # older ADK versions have no artifact version metadata
+    ArtifactVersion = None
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+ARTIFACT_STORE_DIR = os.getenv("ARTIFACT_STORE_DIR", ".data/artifacts")
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(1024 ** 3)))
+ARTIFACT_SESSION_MAX_BYTES = int(os.getenv("ARTIFACT_SESSION_MAX_BYTES", str(64 * 1024 ** 2)))
+# Older versions of the same artifact beyond this are dropped on save
+ARTIFACT_MAX_VERSIONS = int(os.getenv("ARTIFACT_MAX_VERSIONS", "5"))
+ARTIFACT_MAX_AGE_SECONDS = int(os.getenv("ARTIFACT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+ARTIFACT_SWEEP_INTERVAL_SECONDS = 300
+
+URI_SCHEME = "tami4local"
+USER_SCOPE = ""  # scope of "user:" artifacts, which are shared by all of a user's sessions
+
+
+class LocalArtifactService(BaseArtifactService):
+    """
+    Artifact service with SQLite metadata and one file per artifact version on disk.
+
+    Bytes are only read from disk in load_artifact; listing and version metadata never
+    touch them. Storage is bounded: each artifact keeps its `max_versions` newest
+    versions, versions older than `max_age_seconds` are swept, and the least recently
+    used versions are evicted to keep each session under `max_session_bytes` and the
+    whole store under `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = ARTIFACT_STORE_DIR,
+        max_bytes: int = ARTIFACT_STORE_MAX_BYTES,
+        max_session_bytes: int = ARTIFACT_SESSION_MAX_BYTES,
+        max_versions: int = ARTIFACT_MAX_VERSIONS,
+        max_age_seconds: Optional[float] = ARTIFACT_MAX_AGE_SECONDS,
+    ):
+        self.root_dir = os.path.abspath(root_dir)
+        self.max_bytes = max_bytes
+        self.max_session_bytes = max_session_bytes
+        self.max_versions = max(1, max_versions)
+        self.max_age_seconds = max_age_seconds
+        self._blob_dir = os.path.join(self.root_dir, "blobs")
+        os.makedirs(self._blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._conn = sqlite3.connect(os.path.join(self.root_dir, "artifacts.sqlite"), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only an OS crash can lose the last saves
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                app_name TEXT, user_id TEXT, scope TEXT, filename TEXT, version INTEGER,
+                kind TEXT, mime_type TEXT, size INTEGER, path TEXT, custom_metadata TEXT,
+                created REAL, accessed REAL,
+                PRIMARY KEY (app_name, user_id, scope, filename, version)
+            );
+            CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (accessed);
+            CREATE TABLE IF NOT EXISTS artifact_keys (
+                app_name TEXT, user_id TEXT, scope TEXT, filename TEXT, next_version INTEGER,
+                PRIMARY KEY (app_name, user_id, scope, filename)
+            );
+            """
+        )
+
+    # --- Storage helpers ---
+
+    @staticmethod
+    def _scope(filename: str, session_id: Optional[str]) -> str:
+        if filename.startswith("user:"):
+            return USER_SCOPE
+        if session_id is None:
+            raise ValueError("Session ID must be provided for session-scoped artifacts.")
+        return session_id
+
+    def _blob_path(self, app_name: str, user_id: str, scope: str, filename: str, version: int) -> str:
+        digest = hashlib.sha256(f"{app_name}\0{user_id}\0{scope}\0{filename}\0{version}".encode("utf-8")).hexdigest()
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    @staticmethod
+    def _encode(artifact: Union[types.Part, Dict[str, Any]]) -> Tuple[str, Optional[str], bytes]:
+        """(kind, mime type, bytes): inline data is stored raw, any other part as its JSON."""
+        part = types.Part.model_validate(artifact) if isinstance(artifact, dict) else artifact
+        if part.inline_data is not None:
+            return "inline", part.inline_data.mime_type, part.inline_data.data or b""
+        mime_type = "text/plain" if part.text is not None else getattr(part.file_data, "mime_type", None)
+        return "part", mime_type, part.model_dump_json(exclude_none=True).encode("utf-8")
+
+    @staticmethod
+    def _decode(kind: str, mime_type: Optional[str], data: bytes) -> Optional[types.Part]:
+        if kind == "inline":
+            return types.Part(inline_data=types.Blob(mime_type=mime_type, data=data))
+        part = types.Part.model_validate_json(data)
+        # Empty parts mark deleted versions (e.g. session rewinds)
+        return None if part == types.Part() else part
+
+    @staticmethod
+    def _write_blob(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _drop(self, rows: List[Tuple], reason: str) -> None:
+        """Deletes (app_name, user_id, scope, filename, version, path) rows and their blobs."""
+        for app_name, user_id, scope, filename, version, path in rows:
+            self._conn.execute(
+                "DELETE FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? AND version = ?",
+                (app_name, user_id, scope, filename, version),
+            )
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if rows:
+            metrics.inc("tami4_artifact_evictions_total", len(rows), help="Artifact versions evicted from the local store.", reason=reason)
+
+    def _evict(self, app_name: str, user_id: str, scope: str, filename: str, keep_version: int) -> None:
+        cols = "app_name, user_id, scope, filename, version, path"
+        self._drop(self._conn.execute(
+            f"SELECT {cols} FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? "
+            "ORDER BY version DESC LIMIT -1 OFFSET ?",
+            (app_name, user_id, scope, filename, self.max_versions),
+        ).fetchall(), "versions")
+
+        now = time.time()
+        if self.max_age_seconds is not None and now - self._last_sweep > ARTIFACT_SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self._drop(self._conn.execute(
+                f"SELECT {cols} FROM artifacts WHERE created < ?", (now - self.max_age_seconds,)
+            ).fetchall(), "age")
+
+        # Least recently used first, never the version that was just saved
+        not_current = "NOT (app_name = ? AND user_id = ? AND scope = ? AND filename = ? AND version = ?)"
+        current = (app_name, user_id, scope, filename, keep_version)
+        if scope != USER_SCOPE:
+            self._evict_lru(
+                f"app_name = ? AND user_id = ? AND scope = ? AND {not_current}", (app_name, user_id, scope) + current,
+                self.max_session_bytes, "session_budget",
+            )
+        self._evict_lru(not_current, current, self.max_bytes, "global_budget")
+
+    def _evict_lru(self, where: str, params: Tuple, budget: int, reason: str) -> None:
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE {where}", params).fetchone()[0]
+        current_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? AND version = ?",
+            params[-5:],
+        ).fetchone()[0]
+        overflow = total + current_size - budget
+        if overflow <= 0:
+            return
+        victims = []
+        for row in self._conn.execute(
+            f"SELECT app_name, user_id, scope, filename, version, path, size FROM artifacts WHERE {where} ORDER BY accessed",
+            params,
+        ):
+            victims.append(row[:6])
+            overflow -= row[6]
+            if overflow <= 0:
+                break
+        self._drop(victims, reason)
+
+    def _version_row(self, app_name: str, user_id: str, filename: str, session_id: Optional[str], version: Optional[int], columns: str) -> Optional[Tuple]:
+        scope = self._scope(filename, session_id)
+        if version is None:
+            return self._conn.execute(
+                f"SELECT {columns} FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? "
+                "ORDER BY version DESC LIMIT 1",
+                (app_name, user_id, scope, filename),
+            ).fetchone()
+        return self._conn.execute(
+            f"SELECT {columns} FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? AND version = ?",
+            (app_name, user_id, scope, filename, version),
+        ).fetchone()
+
+    # --- Synchronous implementations (run in a worker thread) ---
+
+    def _save(self, app_name: str, user_id: str, filename: str, session_id: Optional[str], artifact: Any, custom_metadata: Optional[Dict[str, Any]]) -> int:
+        scope = self._scope(filename, session_id)
+        kind, mime_type, data = self._encode(artifact)
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock before the version is read, so workers
+            # sharing the store never hand out the same version twice
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT next_version FROM artifact_keys WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ?",
+                    (app_name, user_id, scope, filename),
+                ).fetchone()
+                version = row[0] if row else 0
+                path = self._blob_path(app_name, user_id, scope, filename, version)
+                self._write_blob(path, data)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifact_keys VALUES (?, ?, ?, ?, ?)",
+                    (app_name, user_id, scope, filename, version + 1),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, scope, filename, version, kind, mime_type, len(data), path,
+                     json.dumps(custom_metadata or {}, default=str), now, now),
+                )
+                self._evict(app_name, user_id, scope, filename, version)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def _load(self, app_name: str, user_id: str, filename: str, session_id: Optional[str], version: Optional[int]) -> Optional[types.Part]:
+        with self._lock:
+            row = self._version_row(app_name, user_id, filename, session_id, version, "version, kind, mime_type, path")
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE artifacts SET accessed = ? WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? AND version = ?",
+                (time.time(), app_name, user_id, self._scope(filename, session_id), filename, row[0]),
+            )
+        try:
+            with open(row[3], "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            logger.warning(f"Artifact blob missing for {filename} v{row[0]}")
+            return None
+        return self._decode(row[1], row[2], data)
+
+    def _artifact_version(self, row: Tuple) -> Any:
+        version, mime_type, path, custom_metadata, created = row
+        return ArtifactVersion(
+            version=version,
+            canonical_uri=f"file://{path}",
+            custom_metadata=json.loads(custom_metadata or "{}"),
+            create_time=created,
+            mime_type=mime_type,
+        )
+
+    # --- BaseArtifactService ---
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: Union[types.Part, Dict[str, Any]],
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        return await asyncio.to_thread(self._save, app_name, user_id, filename, session_id, artifact, custom_metadata)
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[types.Part]:
+        return await asyncio.to_thread(self._load, app_name, user_id, filename, session_id, version)
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None) -> List[str]:
+        scopes = (USER_SCOPE, session_id) if session_id is not None else (USER_SCOPE,)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT filename FROM artifacts WHERE app_name = ? AND user_id = ? AND scope IN ({','.join('?' * len(scopes))})",
+                (app_name, user_id) + scopes,
+            ).fetchall()
+        return sorted(r[0] for r in rows)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None) -> None:
+        scope = self._scope(filename, session_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT app_name, user_id, scope, filename, version, path FROM artifacts "
+                "WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ?",
+                (app_name, user_id, scope, filename),
+            ).fetchall()
+            self._drop(rows, "deleted")
+            self._conn.execute(
+                "DELETE FROM artifact_keys WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ?",
+                (app_name, user_id, scope, filename),
+            )
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None) -> List[int]:
+        scope = self._scope(filename, session_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version FROM artifacts WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? ORDER BY version",
+                (app_name, user_id, scope, filename),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    async def list_artifact_versions(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None) -> List[Any]:
+        if ArtifactVersion is None:
+            return []
+        scope = self._scope(filename, session_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, mime_type, path, custom_metadata, created FROM artifacts "
+                "WHERE app_name = ? AND user_id = ? AND scope = ? AND filename = ? ORDER BY version",
+                (app_name, user_id, scope, filename),
+            ).fetchall()
+        return [self._artifact_version(r) for r in rows]
+
+    async def get_artifact_version(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[Any]:
+        if ArtifactVersion is None:
+            return None
+        with self._lock:
+            row = self._version_row(app_name, user_id, filename, session_id, version, "version, mime_type, path, custom_metadata, created")
+        return self._artifact_version(row) if row is not None else None
+
+    def total_bytes(self, session_id: Optional[str] = None) -> int:
+        with self._lock:
+            if session_id is None:
+                return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE scope = ?", (session_id,)).fetchone()[0]
+
+
+def artifact_service_uri(root_dir: str = ARTIFACT_STORE_DIR) -> str:
+    """Registers the tami4local:// scheme with ADK's service registry and returns the store's URI."""
+    from google.adk.cli.service_registry import get_service_registry
+
+    def factory(uri: str, **_: Any) -> LocalArtifactService:
+        return LocalArtifactService(root_dir=urlparse(uri).path or ARTIFACT_STORE_DIR)
+
+    get_service_registry().register_artifact_service(URI_SCHEME, factory)
+    return f"{URI_SCHEME}://{os.path.abspath(root_dir)}"
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with LRU eviction and an optional per-entry TTL.
+
+    Entries are evicted when `max_entries` is exceeded (least recently used first)
+    or when they are older than `ttl_seconds` at lookup time. When `max_bytes` is set,
+    `sizeof(value)` is summed over entries and the LRU tail is evicted to stay under it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Hashable) -> Any:
+        _, value = self._data.pop(key)
+        self.total_bytes -= self._sizes.pop(key, 0)
+        return value
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[0]):
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (self._clock(), value)
+            if self.max_bytes is not None:
+                self._sizes[key] = self._sizeof(value)
+                self.total_bytes += self._sizes[key]
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self._data) > 1
+            ):
+                self._drop(next(iter(self._data)))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and not self._expired(item[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
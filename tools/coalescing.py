@@ -0,0 +1,212 @@
+"""
+Singleflight for the root agent: concurrent requests that ask the same question share
+one execution of the orchestrator pipeline.
+
+A request's key is its normalized text (case, punctuation, niqqud, brand aliases and
+filler words removed) plus the date window it resolves to, so "ביצועי תמי4 ב-30 הימים
+האחרונים" and "ביצועי תמי 4 ב 30 ימים אחרונים?" coalesce. The first request leads;
+duplicates arriving while it runs wait for it, copy its artifacts into their own
+session and return its final answer. Only the first turn of a session coalesces: a
+follow-up ("כן", "show chart again") means something different in every conversation.
+Coalescing is per worker process.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from ..sub_agents.data.templates import resolve_window, strip_window
+from .response_cache import BYPASS_STATE_KEY
+from .tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+COALESCING_ENABLED = os.getenv("COALESCING_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+# Followers give up and run on their own after this; also when a leader counts as lost
+COALESCING_MAX_WAIT_SECONDS = float(os.getenv("COALESCING_MAX_WAIT_SECONDS", "180"))
+
+# The MARTS tables hold תמי4 data only, so naming the brand does not change the answer
+_BRAND_RE = re.compile(r"תמי\s*-?\s*4|tami\s*-?\s*4", re.IGNORECASE)
+_NIQQUD_RE = re.compile("[\u0591-\u05c7]")
+_STOPWORDS = {
+    "מה", "של", "את", "לי", "תן", "הראה", "תראה", "בבקשה", "אני", "רוצה", "אפשר", "גם", "ב",
+    "what", "is", "are", "the", "of", "me", "show", "give", "please", "for", "our", "a", "in",
+    # Left over from window phrases; the window itself is part of the key
+    "אחרונים", "האחרונים", "האחרון", "אחרון", "last", "past",
+}
+
+
+def normalize_words(text: str) -> List[str]:
+    """Words of `text` without case, niqqud, punctuation, brand aliases and filler words."""
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    normalized = _BRAND_RE.sub(" ", _NIQQUD_RE.sub("", normalized))
+    return [w for w in re.findall(r"\w+", normalized) if w not in _STOPWORDS]
+
+
+def request_key(text: str, today: Optional[date] = None) -> Optional[str]:
+    """
+    Canonical form of a user request: normalized words plus the resolved date window.
+    None when the window is invalid.
+    """
+    window = resolve_window(text, today)
+    if window is None:
+        return None
+    start, end, _ = window
+    return json.dumps([normalize_words(strip_window(text)), start.isoformat(), end.isoformat()], ensure_ascii=False)
+
+
+class _Flight:
+    def __init__(self, invocation_id: str):
+        self.invocation_id = invocation_id
+        self.started = time.monotonic()
+        self.result: "asyncio.Future[Optional[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.started > COALESCING_MAX_WAIT_SECONDS
+
+
+class SingleFlight:
+    """In-flight executions by request key; the first caller leads, the rest wait for its result."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._leading: Dict[str, str] = {}  # invocation_id -> key
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: str, invocation_id: str) -> Optional[_Flight]:
+        """Registers `invocation_id` as leader and returns None, or returns the flight to wait for."""
+        flight = self._flights.get(key)
+        if flight is not None and not flight.expired and not flight.result.done():
+            return flight
+        self._flights[key] = _Flight(invocation_id)
+        self._leading[invocation_id] = key
+        # A leader that raises never reaches after_agent; release its followers when its task ends
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: self.finish(invocation_id, None))
+        return None
+
+    def finish(self, invocation_id: str, result: Optional[Dict[str, Any]]) -> None:
+        key = self._leading.pop(invocation_id, None)
+        if key is None:
+            return
+        flight = self._flights.get(key)
+        if flight is not None and flight.invocation_id == invocation_id:
+            del self._flights[key]
+            if not flight.result.done():
+                flight.result.set_result(result)
+
+
+singleflight = SingleFlight()
+
+
+def _user_text(callback_context: Any) -> str:
+    content = getattr(callback_context, "user_content", None)
+    return "".join(p.text or "" for p in (getattr(content, "parts", None) or []))
+
+
+def _has_history(callback_context: Any) -> bool:
+    """Whether the session has turns before this one; a follow-up only makes sense in its conversation."""
+    session = getattr(getattr(callback_context, "_invocation_context", None), "session", None)
+    return any(event.invocation_id != callback_context.invocation_id for event in getattr(session, "events", None) or [])
+
+
+def _leader_result(callback_context: Any) -> Optional[Dict[str, Any]]:
+    """The leader's final answer and the artifact versions its invocation saved."""
+    ctx = getattr(callback_context, "_invocation_context", None)
+    session = getattr(ctx, "session", None)
+    if session is None:
+        return None
+    text, artifacts = None, {}
+    for event in session.events:
+        if event.invocation_id != callback_context.invocation_id:
+            continue
+        artifacts.update(getattr(event.actions, "artifact_delta", None) or {})
+        parts = getattr(event.content, "parts", None) or []
+        if event.author == callback_context.agent_name and not event.partial and any(p.text for p in parts):
+            if not any(p.function_call for p in parts):
+                text = "".join(p.text or "" for p in parts)
+    if text is None:
+        return None
+    return {
+        "text": text,
+        "artifacts": artifacts,
+        "app_name": ctx.app_name,
+        "user_id": ctx.user_id,
+        "session_id": session.id,
+    }
+
+
+async def _copy_artifacts(callback_context: Any, result: Dict[str, Any]) -> None:
+    ctx = getattr(callback_context, "_invocation_context", None)
+    service = getattr(ctx, "artifact_service", None)
+    if service is None or not result["artifacts"]:
+        return
+    for filename, version in result["artifacts"].items():
+        part = await service.load_artifact(
+            app_name=result["app_name"], user_id=result["user_id"], session_id=result["session_id"],
+            filename=filename, version=version,
+        )
+        if part is not None:
+            await callback_context.save_artifact(filename, part)
+
+
+async def coalesce_request(callback_context: Any) -> Optional[types.Content]:
+    """
+    before_agent_callback: leads a new flight for this request, or waits for the
+    identical one in flight and answers with its result.
+    """
+    if not COALESCING_ENABLED or callback_context.state.get(BYPASS_STATE_KEY):
+        return None
+    text = _user_text(callback_context)
+    if not text.strip() or _has_history(callback_context):
+        return None
+    try:
+        key = request_key(text)
+    except Exception as e:
+        # The agents deal with whatever made the request unkeyable
+        logger.info(f"Not coalescing a request without a key: {e}")
+        return None
+    if key is None:
+        return None
+    flight = singleflight.join(key, callback_context.invocation_id)
+    if flight is None:
+        return None
+
+    remaining = COALESCING_MAX_WAIT_SECONDS - (time.monotonic() - flight.started)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(flight.result), timeout=max(remaining, 0.1))
+    except asyncio.TimeoutError:
+        result = None
+    if result is None:
+        # The leader failed or is too slow; this request runs on its own
+        return None
+    try:
+        await _copy_artifacts(callback_context, result)
+    except Exception as e:
+        logger.warning(f"Could not copy coalesced artifacts, running the request instead: {e}")
+        return None
+    metrics.inc("tami4_coalesced_requests_total", help="Requests answered by an identical in-flight request.")
+    return types.Content(role="model", parts=[types.Part(text=result["text"])])
+
+
+async def finish_flight(callback_context: Any) -> None:
+    """after_agent_callback: hands the leader's result to the requests waiting on it."""
+    try:
+        result = _leader_result(callback_context)
+    except Exception as e:
+        logger.warning(f"Could not collect the coalesced result: {e}")
+        result = None
+    singleflight.finish(callback_context.invocation_id, result)
+    return None
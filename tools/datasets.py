@@ -0,0 +1,147 @@
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from .payload import _infer_dtype, encode_columnar, payload_rows
+from .tracing import SIZE_BUCKETS, metrics, span
+
+logger = logging.getLogger(__name__)
+
+# Results with at least this many rows are stored as a session artifact and passed
+# around as a lightweight handle instead of inline JSON.
+DATASET_ARTIFACT_MIN_ROWS = int(os.getenv("DATASET_ARTIFACT_MIN_ROWS", "50"))
+DATASET_PREVIEW_ROWS = int(os.getenv("DATASET_PREVIEW_ROWS", "5"))
+
+ARTIFACT_REF_FORMAT = "artifact_ref/v1"
+PARQUET_MIME = "application/vnd.apache.parquet"
+JSON_MIME = "application/json"
+
+
+def is_artifact_ref(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("format") == ARTIFACT_REF_FORMAT
+
+
+def _has_parquet() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _summarize(columns: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-column schema summary small enough to inline in prompts."""
+    summary = {}
+    for col in columns:
+        values = [r.get(col) for r in rows]
+        present = [v for v in values if v is not None]
+        dtype = _infer_dtype(values)
+        info: Dict[str, Any] = {"dtype": dtype, "nulls": len(values) - len(present)}
+        if dtype in ("int", "float") and present:
+            total = sum(present)
+            info.update(min=min(present), max=max(present), sum=round(total, 4), mean=round(total / len(present), 4))
+        elif dtype == "date" and present:
+            info.update(min=min(map(str, present)), max=max(map(str, present)))
+        elif present:
+            counts: Dict[Any, int] = {}
+            for v in present:
+                counts[v] = counts.get(v, 0) + 1
+            info.update(distinct=len(counts), top=sorted(counts, key=counts.get, reverse=True)[:5])
+        summary[col] = info
+    return summary
+
+
+def _serialize(columns: List[str], rows: List[Dict[str, Any]]) -> Tuple[bytes, str, str]:
+    if _has_parquet():
+        import pandas as pd
+
+        buf = io.BytesIO()
+        pd.DataFrame(rows, columns=columns).to_parquet(buf, index=False)
+        return buf.getvalue(), PARQUET_MIME, "parquet"
+    body = json.dumps(encode_columnar(rows, columns), ensure_ascii=False, separators=(",", ":"), default=str)
+    return body.encode("utf-8"), JSON_MIME, "json"
+
+
+async def store_dataset(context: Any, columns: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Saves a result set as a session artifact and returns its handle:
+    artifact filename/version, row_count, columns, dtypes, per-column summary and a preview.
+    `context` is any ADK context with save_artifact (ToolContext / CallbackContext).
+    """
+    body, mime_type, ext = _serialize(columns, rows)
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    filename = f"dataset_{digest}.{ext}"
+    with span("artifact.save", "artifact", filename=filename, bytes=len(body), rows=len(rows)):
+        version = await context.save_artifact(
+            filename=filename, artifact=types.Part(inline_data=types.Blob(data=body, mime_type=mime_type))
+        )
+    metrics.observe("tami4_artifact_bytes", len(body), SIZE_BUCKETS, help="Size of saved artifacts.", mime_type=mime_type)
+    summary = _summarize(columns, rows)
+    return {
+        "format": ARTIFACT_REF_FORMAT,
+        "artifact": filename,
+        "version": version,
+        "mime_type": mime_type,
+        "bytes": len(body),
+        "row_count": len(rows),
+        "columns": columns,
+        "dtypes": {c: s["dtype"] for c, s in summary.items()},
+        "summary": summary,
+        "preview": encode_columnar(rows[:DATASET_PREVIEW_ROWS], columns),
+    }
+
+
+async def load_dataset(handle: Dict[str, Any], context: Any) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Loads (columns, dict-rows) for a handle produced by store_dataset."""
+    part = await context.load_artifact(filename=handle["artifact"], version=handle.get("version"))
+    if part is None or part.inline_data is None:
+        raise FileNotFoundError(f"Dataset artifact not found: {handle['artifact']}")
+    body = part.inline_data.data
+    if (part.inline_data.mime_type or handle.get("mime_type")) == PARQUET_MIME:
+        import pandas as pd
+
+        df = pd.read_parquet(io.BytesIO(body))
+        df = df.astype(object).where(df.notna(), None)
+        return list(df.columns), df.to_dict(orient="records")
+    payload = json.loads(body.decode("utf-8"))
+    return list(payload.get("columns") or []), payload_rows(payload)[1]
+
+
+async def resolve_payload(data_payload: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Returns `data_payload` with an artifact handle in its "data" member replaced by the
+    loaded rows (as columnar/v1); other payloads are returned unchanged.
+    """
+    if not isinstance(data_payload, dict):
+        return data_payload
+    if is_artifact_ref(data_payload):
+        columns, rows = await load_dataset(data_payload, context)
+        return {"status": "SUCCESS", "data": encode_columnar(rows, columns)}
+    data = data_payload.get("data")
+    if is_artifact_ref(data):
+        columns, rows = await load_dataset(data, context)
+        return dict(data_payload, data=encode_columnar(rows, columns))
+    return data_payload
+
+
+async def offload_large_result(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """
+    after_tool_callback: stores large execute_sql results as an artifact and hands the
+    model the handle (schema, summary, preview) instead of the rows.
+    """
+    if getattr(tool, "name", None) != "execute_sql" or not isinstance(tool_response, dict):
+        return None
+    rows = tool_response.get("rows")
+    if not rows or len(rows) < DATASET_ARTIFACT_MIN_ROWS or not isinstance(rows[0], dict):
+        return None
+    columns = list(dict.fromkeys(k for r in rows for k in r))
+    try:
+        handle = await store_dataset(tool_context, columns, rows)
+    except Exception as e:
+        logger.warning(f"Could not store result as an artifact, returning it inline: {e}")
+        return None
+    response = {k: v for k, v in tool_response.items() if k != "rows"}
+    response["data"] = handle
+    return response
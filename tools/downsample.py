@@ -0,0 +1,180 @@
+"""
+Data reduction before plotting.
+
+A chart is FIGSIZE x DPI pixels wide, so a series with more points than that only costs
+render time, and a bar chart with hundreds of categories is unreadable. Before a frame
+reaches a renderer it is reduced to a size that does not depend on the payload:
+
+- `reduce_lines`: one row per (x, group) with the mean seaborn would estimate, the top
+  groups by the metric, and every series longer than the point budget downsampled with
+  LTTB (Largest-Triangle-Three-Buckets), which keeps peaks and dips that striding or
+  averaging would lose;
+- `top_n`: vectorized groupby of the categories, the N largest by the metric, the rest
+  summed into an "Other" bucket; a date axis with more periods than bars fit is
+  resampled to weeks, months, quarters or years instead.
+
+Both are linear in the number of rows.
+"""
+import os
+from typing import List, Optional
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Environment Config
+# Points per line series; about one per two pixels of a 10in x 160dpi figure
+PLOT_MAX_POINTS = int(os.getenv("PLOT_MAX_POINTS", "800"))
+PLOT_MAX_SERIES = int(os.getenv("PLOT_MAX_SERIES", "15"))
+PLOT_TOP_N = int(os.getenv("PLOT_TOP_N", "15"))
+# Bars per date axis; about 25 pixels per bar on a 10in x 160dpi figure
+PLOT_MAX_BARS = int(os.getenv("PLOT_MAX_BARS", "60"))
+PLOT_MAX_SCATTER_POINTS = int(os.getenv("PLOT_MAX_SCATTER_POINTS", "5000"))
+# Series longer than this are drawn without markers
+PLOT_MARKER_MAX_POINTS = int(os.getenv("PLOT_MARKER_MAX_POINTS", "60"))
+
+OTHER = "Other"
+# Coarser and coarser periods for a date axis with too many bars
+_RESAMPLE_FREQS = ("W", "M", "Q", "Y")
+
+
+def lttb(x: "np.ndarray", y: "np.ndarray", n: int) -> "np.ndarray":
+    """Indices of the `n` points LTTB keeps from the series (x ascending, no NaNs)."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n - 2 buckets between the first and the last point, which are always kept
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else size
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Twice the area of the triangle (previous point, candidate, next bucket's mean)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _positions(values: "pd.Series") -> "np.ndarray":
+    """Numeric positions of x values for LTTB (datetimes as ns, categories by order)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+
+def _downsample(series_df: "pd.DataFrame", x_col: str, y_cols: List[str], max_points: int) -> "pd.DataFrame":
+    if len(series_df) <= max_points:
+        return series_df
+    x = _positions(series_df[x_col])
+    keep = set()
+    for y_c in y_cols:
+        y = series_df[y_c].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(y))
+        keep.update(valid[lttb(x[valid], y[valid], max_points)].tolist())
+    return series_df.iloc[sorted(keep)]
+
+
+def reduce_lines(
+    df: "pd.DataFrame",
+    x_col: str,
+    y_cols: List[str],
+    group_by: Optional[str] = None,
+    max_points: int = PLOT_MAX_POINTS,
+    max_series: int = PLOT_MAX_SERIES,
+) -> "pd.DataFrame":
+    """Line-chart frame: mean per (x, group), the top `max_series` groups, LTTB per series."""
+    keys = [x_col] + ([group_by] if group_by else [])
+    agg = df.groupby(keys, sort=True, observed=True, dropna=True)[y_cols].mean().reset_index()
+    if not group_by:
+        return _downsample(agg, x_col, y_cols, max_points).reset_index(drop=True)
+
+    totals = agg.groupby(group_by, observed=True)[y_cols[0]].sum()
+    if len(totals) > max_series:
+        agg = agg[agg[group_by].isin(totals.nlargest(max_series).index)]
+    parts = [_downsample(part, x_col, y_cols, max_points) for _, part in agg.groupby(group_by, sort=False, observed=True)]
+    return pd.concat(parts, ignore_index=True) if parts else agg
+
+
+def _fold(values: "pd.Series", keep: "pd.Index") -> "pd.Series":
+    return values.where(values.isin(keep), OTHER) if len(keep) else values
+
+
+def _resample_dates(values: "pd.Series", max_periods: int) -> "pd.Series":
+    """The start of the finest week/month/quarter/year period that leaves at most `max_periods` values."""
+    if getattr(values.dt, "tz", None) is not None:
+        values = values.dt.tz_localize(None)
+    for freq in _RESAMPLE_FREQS:
+        periods = values.dt.to_period(freq).dt.start_time
+        if periods.nunique() <= max_periods:
+            break
+    return periods
+
+
+def top_n(
+    df: "pd.DataFrame",
+    cat_col: str,
+    y_cols: List[str],
+    group_by: Optional[str] = None,
+    n: int = PLOT_TOP_N,
+    max_periods: int = PLOT_MAX_BARS,
+) -> "pd.DataFrame":
+    """
+    Bar-chart frame: y summed per category (and group), the `n` categories (and groups)
+    with the largest y_cols[0] total, the rest summed into "Other". Dates are not ranked:
+    they stay in order, summed into weeks (months, ...) when there are more than
+    `max_periods` of them. The frame's columns are the keys and the summed metrics.
+    """
+    keys = [cat_col] + ([group_by] if group_by else [])
+    y_cols = [c for c in y_cols if c not in keys]
+    y_cols = y_cols[:1] if group_by else y_cols
+    if y_cols:
+        agg = df.groupby(keys, sort=True, observed=True, dropna=False)[y_cols].sum().reset_index()
+    else:
+        # The only metric is the category axis itself: compare row counts
+        y_cols = ["count"]
+        agg = df.groupby(keys, sort=True, observed=True, dropna=False).size().rename("count").reset_index()
+    temporal = pd.api.types.is_datetime64_any_dtype(agg[cat_col])
+    if temporal and agg[cat_col].nunique() > max_periods:
+        agg[cat_col] = _resample_dates(agg[cat_col], max_periods)
+        agg = agg.groupby(keys, sort=True, observed=True, dropna=False)[y_cols].sum().reset_index()
+
+    folded = False
+    if not temporal and agg[cat_col].nunique() > n:
+        totals = agg.groupby(cat_col, observed=True)[y_cols[0]].sum().sort_values(ascending=False, kind="stable")
+        agg[cat_col] = _fold(agg[cat_col].astype(str), totals.index[:n].astype(str))
+        folded = True
+    if group_by and agg[group_by].nunique() > n:
+        totals = agg.groupby(group_by, observed=True)[y_cols[0]].sum()
+        agg[group_by] = _fold(agg[group_by].astype(str), totals.nlargest(n).index.astype(str))
+        folded = True
+    if not folded:
+        return agg
+
+    agg = agg.groupby(keys, sort=False, observed=True, dropna=False)[y_cols].sum().reset_index()
+    if not temporal:
+        # Largest first, "Other" last
+        order = agg.groupby(cat_col, sort=False)[y_cols[0]].sum()
+        order = order.drop(OTHER, errors="ignore").sort_values(ascending=False, kind="stable").index.tolist()
+        order += [OTHER] if (agg[cat_col] == OTHER).any() else []
+        agg = agg.set_index(cat_col).loc[order].reset_index()
+    return agg
+
+
+def sample_points(df: "pd.DataFrame", max_points: int = PLOT_MAX_SCATTER_POINTS) -> "pd.DataFrame":
+    """A deterministic sample of a scatter plot's rows."""
+    return df if len(df) <= max_points else df.sample(n=max_points, random_state=0).sort_index()
+
+
+def marker_for(df: "pd.DataFrame", group_by: Optional[str] = None) -> Optional[str]:
+    """Markers for short series only; on long ones they hide the line and slow rendering."""
+    longest = df.groupby(group_by, observed=True).size().max() if group_by and len(df) else len(df)
+    return "o" if longest <= PLOT_MARKER_MAX_POINTS else None
@@ -0,0 +1,40 @@
+import importlib
+import threading
+import types
+from typing import Callable, Optional
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module proxy that performs the real import on first attribute access.
+
+    Keeps heavy optional libraries (pandas, matplotlib, ...) off the import path of
+    the server so cold starts only pay for them when a tool actually needs them.
+    """
+
+    def __init__(self, name: str, setup: Optional[Callable[[types.ModuleType], None]] = None):
+        super().__init__(name)
+        self._lazy_setup = setup
+        self._lazy_module: Optional[types.ModuleType] = None
+        self._lazy_lock = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    module = importlib.import_module(self.__name__)
+                    if self._lazy_setup is not None:
+                        self._lazy_setup(module)
+                    self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __reduce__(self):
+        # Picklable for process pools: the worker re-creates its own proxy
+        return (LazyModule, (self.__name__, self._lazy_setup))
+
+
+def lazy_import(name: str, setup: Optional[Callable[[types.ModuleType], None]] = None) -> LazyModule:
+    return LazyModule(name, setup)
@@ -0,0 +1,57 @@
+"""
+Single-process ownership of periodic background work.
+
+With several serving workers (WEB_CONCURRENCY > 1) every process would otherwise run
+the same refreshes (rollup store, schema catalog) against BigQuery. The process that
+holds an exclusive lock on REFRESH_LOCK_PATH is the leader and does them; the others
+read what it writes. The lock is released with the process, so another worker takes
+over on its next attempt.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: one process per host is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+REFRESH_LOCK_PATH = os.getenv("REFRESH_LOCK_PATH", ".data/refresh.lock").strip()
+# A process that is not the leader retries taking the lock at most this often
+LEADER_RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+_fd: Optional[int] = None
+_next_attempt = 0.0
+_lock = threading.Lock()
+
+
+def is_leader() -> bool:
+    """True if this process holds the refresh lock, taking it if it is free."""
+    global _fd, _next_attempt
+    if fcntl is None or not REFRESH_LOCK_PATH:
+        return True
+    with _lock:
+        if _fd is not None:
+            return True
+        if time.monotonic() < _next_attempt:
+            return False
+        _next_attempt = time.monotonic() + LEADER_RETRY_SECONDS
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(REFRESH_LOCK_PATH)), exist_ok=True)
+            fd = os.open(REFRESH_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Could not open {REFRESH_LOCK_PATH}, refreshing in this process: {e}")
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        _fd = fd
+        logger.info(f"Process {os.getpid()} owns the background refreshes")
+        return True
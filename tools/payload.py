@@ -0,0 +1,203 @@
+import json
+import math
+import os
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+# Wire format shared by data_agent, the specialists and the plot tool:
+# {
+#   "format": "columnar/v1",
+#   "row_count": 3,
+#   "columns": ["date", "platform", "cost"],
+#   "dtypes": {"date": "date", "platform": "string", "cost": "float"},
+#   "data": {"date": [...], "platform": [0, 1, 0], "cost": [...]},
+#   "dictionaries": {"platform": ["facebook", "google"]}
+# }
+# Dictionary-encoded columns hold integer codes into `dictionaries[col]` (null stays null).
+COLUMNAR_FORMAT = "columnar/v1"
+
+PAYLOAD_FORMAT = os.getenv("PAYLOAD_FORMAT", "columnar").strip().lower()
+PAYLOAD_SIGNIFICANT_DIGITS = int(os.getenv("PAYLOAD_SIGNIFICANT_DIGITS", "6"))
+
+
+def is_columnar(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("format") == COLUMNAR_FORMAT
+
+
+def _infer_dtype(values: List[Any]) -> str:
+    kinds = set()
+    for v in values:
+        if v is None or (isinstance(v, float) and math.isnan(v)):
+            continue
+        if isinstance(v, bool):
+            kinds.add("bool")
+        elif isinstance(v, int):
+            kinds.add("int")
+        elif isinstance(v, float):
+            kinds.add("float")
+        elif isinstance(v, (date, datetime)):
+            kinds.add("date")
+        elif isinstance(v, str) and len(v) >= 10 and v[4:5] == "-" and v[7:8] == "-" and v[:4].isdigit():
+            kinds.add("date")
+        else:
+            kinds.add("string")
+    if not kinds:
+        return "null"
+    if kinds <= {"int", "float"}:
+        return "float" if "float" in kinds else "int"
+    return kinds.pop() if len(kinds) == 1 else "string"
+
+
+def _round(v: Any, digits: int) -> Any:
+    if isinstance(v, float):
+        if math.isnan(v) or math.isinf(v):
+            return None
+        return float(f"{v:.{digits}g}")
+    return v
+
+
+def encode_columnar(
+    rows: List[Any],
+    columns: Optional[List[str]] = None,
+    significant_digits: int = PAYLOAD_SIGNIFICANT_DIGITS,
+    dictionary_ratio: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Encodes dict-rows (or list-rows with `columns`) into the columnar/v1 payload.
+
+    String columns whose distinct count is at most `dictionary_ratio` of the rows are
+    dictionary-encoded; floats are rounded to `significant_digits`.
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(k for r in rows for k in r)) if rows and isinstance(rows[0], dict) else []
+    if rows and isinstance(rows[0], dict):
+        arrays = {c: [r.get(c) for r in rows] for c in columns}
+    else:
+        arrays = {c: [r[i] if i < len(r) else None for r in rows] for i, c in enumerate(columns)}
+
+    dtypes, data, dictionaries = {}, {}, {}
+    for col in columns:
+        values = arrays[col]
+        dtype = _infer_dtype(values)
+        dtypes[col] = dtype
+        if dtype == "float":
+            values = [_round(v, significant_digits) for v in values]
+        elif dtype == "date":
+            values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+        elif dtype == "string":
+            distinct = list(dict.fromkeys(v for v in values if v is not None))
+            if len(values) > 1 and len(distinct) <= dictionary_ratio * len(values):
+                codes = {v: i for i, v in enumerate(distinct)}
+                dictionaries[col] = distinct
+                values = [None if v is None else codes[v] for v in values]
+        data[col] = values
+
+    payload = {
+        "format": COLUMNAR_FORMAT,
+        "row_count": len(rows),
+        "columns": columns,
+        "dtypes": dtypes,
+        "data": data,
+    }
+    if dictionaries:
+        payload["dictionaries"] = dictionaries
+    return payload
+
+
+def decode_columnar(payload: Dict[str, Any]) -> Tuple[List[str], Dict[str, List[Any]]]:
+    """Returns (columns, {column: values}) with dictionary codes expanded."""
+    columns = list(payload.get("columns") or [])
+    dictionaries = payload.get("dictionaries") or {}
+    arrays = {}
+    for col in columns:
+        values = list((payload.get("data") or {}).get(col) or [])
+        lookup = dictionaries.get(col)
+        if lookup is not None:
+            values = [None if v is None else lookup[v] for v in values]
+        arrays[col] = values
+    return columns, arrays
+
+
+def columnar_to_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    columns, arrays = decode_columnar(payload)
+    n = payload.get("row_count")
+    if n is None:
+        n = len(arrays[columns[0]]) if columns else 0
+    return [{c: arrays[c][i] for c in columns} for i in range(n)]
+
+
+def payload_rows(data_payload: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    (columns, dict-rows) from any data_agent payload variant: columnar/v1, dict rows,
+    or `rows_compact` list-rows. Accepts the full agent output or its "data" member.
+    """
+    if not isinstance(data_payload, dict):
+        return [], []
+    data = data_payload if is_columnar(data_payload) else data_payload.get("data", data_payload)
+    if is_columnar(data):
+        return list(data.get("columns") or []), columnar_to_rows(data)
+    cols = list(data.get("columns") or [])
+    if data.get("rows_compact"):
+        return cols, [dict(zip(cols, r)) for r in data["rows_compact"]]
+    rows = data.get("rows") or []
+    if rows and isinstance(rows[0], dict):
+        return cols or list(rows[0].keys()), rows
+    return cols, [dict(zip(cols, r)) for r in rows]
+
+
+def compact_data(columns: List[str], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The agent-contract "data" member in the configured PAYLOAD_FORMAT."""
+    if PAYLOAD_FORMAT == "columnar":
+        return encode_columnar(rows, columns)
+    return {"columns": columns, "rows": rows}
+
+
+def compact_tool_response(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """after_tool_callback: re-encodes row-oriented tool results (execute_sql) as columnar/v1."""
+    if PAYLOAD_FORMAT != "columnar" or not isinstance(tool_response, dict):
+        return None
+    rows = tool_response.get("rows")
+    if not rows or not isinstance(rows[0], dict):
+        return None
+    compacted = {k: v for k, v in tool_response.items() if k != "rows"}
+    compacted["data"] = encode_columnar(rows)
+    return compacted
+
+
+def find_request_payload(llm_request: Any) -> Optional[Tuple[int, int, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Locates the orchestrator's request JSON carrying a data_payload in a specialist's
+    model request. Returns (content index, part index, request, data_payload).
+    """
+    contents = getattr(llm_request, "contents", None) or []
+    for ci in range(len(contents) - 1, -1, -1):
+        if contents[ci].role != "user":
+            continue
+        for pi, part in enumerate(contents[ci].parts or []):
+            if not part.text:
+                continue
+            try:
+                request = json.loads(part.text)
+            except ValueError:
+                continue
+            if not isinstance(request, dict) or "data_payload" not in request:
+                continue
+            data_payload = request["data_payload"]
+            if isinstance(data_payload, str):
+                try:
+                    data_payload = json.loads(data_payload)
+                except ValueError:
+                    continue
+            if isinstance(data_payload, dict):
+                return ci, pi, request, data_payload
+    return None
+
+
+def replace_request_text(llm_request: Any, content_index: int, part_index: int, text: str) -> None:
+    """Swaps one text part of a model request (contents may share objects with session events, so never mutate)."""
+    content = llm_request.contents[content_index]
+    parts = list(content.parts)
+    parts[part_index] = types.Part(text=text)
+    llm_request.contents[content_index] = types.Content(role=content.role, parts=parts)
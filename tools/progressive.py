@@ -0,0 +1,219 @@
+"""
+Progressive results for the streaming endpoint in main.py.
+
+Turns the ADK events of one run into structured Server-Sent Events as soon as each
+pipeline stage finishes, instead of waiting for the orchestrator's final answer:
+
+    event: stage         {"stage": "data" | "specialists" | "plots", "status": "started"}
+    event: key_metrics   totals, KPIs and period changes once data_agent returns
+    event: insights      the specialists' JSON outputs once run_specialists returns
+    event: graphs        artifact filenames and URLs once plot_and_save_artifacts returns
+    event: answer_delta  streamed text of the final answer (when the model streams)
+    event: answer        the final six-section answer
+    event: error / done
+
+Every payload carries `elapsed_ms` since the request started.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from google.genai import types
+
+from ..sub_agents.performance.analytics import compute_performance_metrics
+from .datasets import resolve_payload
+from .payload import payload_rows
+from .tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+STAGES = {"data_agent": "data", "run_specialists": "specialists", "plot_and_save_artifacts": "plots"}
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _parse(response: Any) -> Any:
+    """AgentTool responses are {"result": "<final text>"}; sub-agents answer in JSON."""
+    if isinstance(response, dict) and set(response) == {"result"}:
+        response = response["result"]
+    if isinstance(response, str):
+        try:
+            return json.loads(response)
+        except ValueError:
+            return response
+    return response
+
+
+class _SessionArtifacts:
+    """The load_artifact() of a callback context, for resolving dataset handles outside a run."""
+
+    def __init__(self, service: Any, app_name: str, user_id: str, session_id: str):
+        self._service = service
+        self._key = dict(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def load_artifact(self, filename: str, version: Optional[int] = None) -> Optional[types.Part]:
+        return await self._service.load_artifact(filename=filename, version=version, **self._key)
+
+
+class ProgressiveRun:
+    """Maps the events of one run onto (event, payload) chunks."""
+
+    def __init__(self, app_name: str, user_id: str, session_id: str, artifact_service: Any = None, root_agent_name: str = ""):
+        self.app_name = app_name
+        self.user_id = user_id
+        self.session_id = session_id
+        self.root_agent_name = root_agent_name
+        self._artifacts = _SessionArtifacts(artifact_service, app_name, user_id, session_id) if artifact_service else None
+        self._started = time.perf_counter()
+        self._first_content: Optional[float] = None
+
+    def _elapsed_ms(self) -> int:
+        return round((time.perf_counter() - self._started) * 1000)
+
+    def _chunk(self, event: str, data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        data = dict(data, elapsed_ms=self._elapsed_ms())
+        if event in ("key_metrics", "insights", "graphs", "answer") and self._first_content is None:
+            self._first_content = time.perf_counter() - self._started
+            metrics.observe("tami4_time_to_first_content_seconds", self._first_content, help="Time until the first stage result is streamed.")
+        return event, data
+
+    def artifact_url(self, filename: str, version: Optional[int] = None) -> str:
+        url = (
+            f"/apps/{quote(self.app_name)}/users/{quote(self.user_id)}/sessions/{quote(self.session_id)}"
+            f"/artifacts/{quote(filename)}"
+        )
+        return url if version is None else f"{url}/versions/{version}"
+
+    async def _key_metrics(self, data_payload: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(data_payload, dict) or data_payload.get("status") != "SUCCESS":
+            return None
+        if self._artifacts is not None:
+            data_payload = await resolve_payload(data_payload, self._artifacts)
+        columns, rows = payload_rows(data_payload)
+        computed = await asyncio.to_thread(compute_performance_metrics, columns, rows)
+        if computed is None:
+            return None
+        return {
+            "key_metrics": computed["key_metrics"],
+            "window": computed.get("window"),
+            "row_count": computed["row_count"],
+            "assumptions": data_payload.get("assumptions") or [],
+        }
+
+    async def on_event(self, event: Any) -> List[Tuple[str, Dict[str, Any]]]:
+        chunks: List[Tuple[str, Dict[str, Any]]] = []
+        for call in event.get_function_calls() if hasattr(event, "get_function_calls") else []:
+            if call.name in STAGES:
+                chunks.append(self._chunk("stage", {"stage": STAGES[call.name], "status": "started"}))
+
+        for response in event.get_function_responses() if hasattr(event, "get_function_responses") else []:
+            result = _parse(response.response)
+            if response.name == "data_agent":
+                chunks.append(self._chunk("stage", {"stage": "data", "status": "done"}))
+                if isinstance(result, dict) and result.get("status") == "ERROR":
+                    chunks.append(self._chunk("error", {"stage": "data", "error": result.get("error")}))
+                    continue
+                try:
+                    key_metrics = await self._key_metrics(result)
+                except Exception as e:
+                    logger.warning(f"Could not compute streamed key metrics: {e}")
+                    key_metrics = None
+                if key_metrics is not None:
+                    chunks.append(self._chunk("key_metrics", key_metrics))
+            elif response.name == "run_specialists" and isinstance(result, dict):
+                insights = {
+                    name: out.get("result") if out.get("status") == "SUCCESS" else {"error": out.get("error")}
+                    for name, out in (result.get("results") or {}).items()
+                }
+                chunks.append(self._chunk("insights", {"specialists": insights, "warnings": result.get("warnings") or []}))
+            elif response.name == "plot_and_save_artifacts" and isinstance(result, dict):
+                graphs = [
+                    dict(a, url=self.artifact_url(a["filename"], a.get("version")))
+                    for a in result.get("artifacts") or [] if a.get("filename")
+                ]
+                chunks.append(self._chunk("graphs", {"artifacts": graphs, "warnings": result.get("warnings") or []}))
+
+        if event.author == self.root_agent_name and event.content and event.content.parts:
+            text = "".join(p.text or "" for p in event.content.parts if not getattr(p, "thought", False))
+            if text and not event.get_function_calls():
+                chunks.append(self._chunk("answer_delta" if event.partial else "answer", {"text": text}))
+        return chunks
+
+    async def stream(self, events: AsyncIterator[Any]) -> AsyncIterator[str]:
+        """SSE text for the run's events, ending with a `done` (or `error`) event."""
+        yield format_sse(*self._chunk("session", {"app_name": self.app_name, "user_id": self.user_id, "session_id": self.session_id}))
+        try:
+            async for event in events:
+                for name, data in await self.on_event(event):
+                    yield format_sse(name, data)
+        except Exception as e:
+            logger.error(f"Progressive run failed: {e}", exc_info=True)
+            yield format_sse(*self._chunk("error", {"stage": "run", "error": {"message": str(e)}}))
+            return
+        yield format_sse(*self._chunk("done", {
+            "time_to_first_content_ms": round(self._first_content * 1000) if self._first_content is not None else None,
+        }))
+
+
+def _session_service(uri: str) -> Any:
+    try:
+        from google.adk.cli.service_registry import get_service_registry
+    except ImportError:  # older ADK versions have no service registry
+        if uri.startswith("memory://"):
+            from google.adk.sessions import InMemorySessionService
+
+            return InMemorySessionService()
+        from google.adk.sessions import DatabaseSessionService
+
+        return DatabaseSessionService(db_url=uri)
+    service = get_service_registry().create_session_service(uri)
+    if service is None:
+        raise ValueError(f"Unsupported session service URI: {uri}")
+    return service
+
+
+def build_runner(agent: Any, app_name: str, session_service_uri: str, artifact_service_uri: Optional[str] = None) -> Any:
+    """
+    A Runner over the same session and artifact stores as the ADK app (the app keeps its
+    own runners private). Sessions are shared when the stores are persistent.
+    """
+    from google.adk.runners import Runner
+
+    from .artifact_store import LocalArtifactService
+
+    artifact_service = None
+    if artifact_service_uri:
+        from google.adk.cli.service_registry import get_service_registry
+
+        artifact_service = get_service_registry().create_artifact_service(artifact_service_uri)
+    return Runner(
+        app_name=app_name,
+        agent=agent,
+        session_service=_session_service(session_service_uri),
+        artifact_service=artifact_service or LocalArtifactService(),
+    )
+
+
+async def stream_run(runner: Any, user_id: str, message: str, session_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Runs `message` in the session (a new one when session_id is None) and yields SSE text."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+
+    session = None
+    if session_id:
+        session = await runner.session_service.get_session(app_name=runner.app_name, user_id=user_id, session_id=session_id)
+    if session is None:
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id, session_id=session_id)
+    progressive = ProgressiveRun(runner.app_name, user_id, session.id, runner.artifact_service, runner.agent.name)
+    events = runner.run_async(
+        user_id=user_id,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+        run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+    )
+    async for chunk in progressive.stream(events):
+        yield chunk
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from google.adk.models.llm_response import LlmResponse
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").strip().lower()
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Session state flag that bypasses the cache, e.g. sent per request as
+# state_delta={"response_cache_bypass": true} on /run or set by run_specialists(use_cache=False)
+BYPASS_STATE_KEY = "response_cache_bypass"
+
+# Config fields that do not change what the model answers
+_IGNORED_CONFIG_FIELDS = {"system_instruction", "tools", "tool_config", "http_options", "labels"}
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: Optional[float] = RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._entries.set(key, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SqliteBackend:
+    """Persists responses across restarts and workers; evicts least recently used rows."""
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: Optional[float] = RESPONSE_CACHE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, value, now, now))
+            if self.ttl_seconds is not None:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+
+def _canonical_text(text: str) -> str:
+    """JSON text is re-serialized with sorted keys so equivalent payloads hash the same."""
+    stripped = text.strip()
+    try:
+        return json.dumps(json.loads(stripped), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    except ValueError:
+        return " ".join(stripped.split())
+
+
+def _content_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    parts = getattr(value, "parts", None)
+    if parts is not None:
+        return "".join(p.text or "" for p in parts)
+    return str(value)
+
+
+def _dump(value: Any) -> Any:
+    return value.model_dump(mode="json", exclude_none=True) if hasattr(value, "model_dump") else value
+
+
+class ResponseCache:
+    """
+    Caches final model responses keyed on
+    (instruction hash, model, generation config, canonicalized contents hash).
+
+    Use `before_model` / `after_model` as an LlmAgent's model callbacks.
+    """
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # Key of the in-flight request, per (invocation, agent), for after_model
+        self._pending = LRUCache(max_entries=1024, ttl_seconds=3600)
+
+    def key_for(self, llm_request: Any) -> str:
+        config = getattr(llm_request, "config", None)
+        config_dump = {k: v for k, v in (_dump(config) or {}).items() if k not in _IGNORED_CONFIG_FIELDS}
+        contents = [
+            {
+                "role": c.role,
+                "parts": [
+                    _canonical_text(p.text) if p.text is not None else json.dumps(_dump(p), sort_keys=True, default=str)
+                    for p in (c.parts or [])
+                ],
+            }
+            for c in getattr(llm_request, "contents", None) or []
+        ]
+        parts = {
+            "instruction": hashlib.sha256(_content_text(getattr(config, "system_instruction", None)).encode("utf-8")).hexdigest(),
+            "model": getattr(llm_request, "model", None),
+            "config": config_dump,
+            "contents": hashlib.sha256(json.dumps(contents, ensure_ascii=False).encode("utf-8")).hexdigest(),
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> Optional[LlmResponse]:
+        """before_model_callback: returns the cached response, skipping the model call."""
+        if not RESPONSE_CACHE_ENABLED or callback_context.state.get(BYPASS_STATE_KEY):
+            return None
+        key = self.key_for(llm_request)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"Response cache hit for {callback_context.agent_name}")
+            return LlmResponse.model_validate_json(cached)
+        self.misses += 1
+        self._pending.set((callback_context.invocation_id, callback_context.agent_name), key)
+        return None
+
+    def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        """after_model_callback: stores complete, successful text responses."""
+        if getattr(llm_response, "partial", False):
+            return None
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name))
+        content = getattr(llm_response, "content", None)
+        if key is None or llm_response.error_code or content is None or not content.parts:
+            return None
+        if any(p.function_call for p in content.parts):
+            return None
+        try:
+            self.backend.set(key, llm_response.model_dump_json(exclude_none=True))
+        except Exception as e:
+            logger.warning(f"Could not store response in the cache: {e}")
+        return None
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def _build_backend() -> Any:
+    if RESPONSE_CACHE_BACKEND == "sqlite":
+        try:
+            return SqliteBackend()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not open response cache at {RESPONSE_CACHE_PATH}, using memory: {e}")
+    return MemoryBackend()
+
+
+# Shared by the specialist agents
+response_cache = ResponseCache(_build_backend())
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from .response_cache import BYPASS_STATE_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_agent_output(output: Any) -> Any:
+    """AgentTool returns the sub-agent's final text; specialists answer in raw JSON."""
+    if not isinstance(output, str):
+        return output
+    text = output.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    try:
+        return json.loads(text)
+    except ValueError:
+        return output
+
+
+def build_run_specialists(agents: Dict[str, Any]) -> Callable:
+    """
+    Builds the `run_specialists` tool over the given {name: agent} mapping.
+
+    The selected specialists are independent once data_agent has returned, so they are
+    dispatched concurrently and the call takes as long as the slowest one.
+    """
+    agent_tools = {name: AgentTool(agent=agent) for name, agent in agents.items()}
+
+    async def run_specialists(
+        request: str,
+        specialists: List[str],
+        tool_context: ToolContext,
+        research_request: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Runs the selected specialist agents in parallel and returns all their JSON outputs.
+
+        Args:
+            request: JSON text with brand_context, user_request and data_payload for the specialists.
+            specialists: Any of "performance", "creative", "research".
+            tool_context: ADK context, shared with the specialist runs.
+            research_request: Optional separate question for "research" (defaults to `request`).
+            use_cache: Set to False to force fresh specialist answers instead of cached ones.
+
+        Returns:
+            A dictionary with one entry per specialist: status, result (parsed JSON) or error, elapsed_ms.
+        """
+        selected = [name for name in dict.fromkeys(specialists or []) if name in agent_tools]
+        unknown = [name for name in specialists or [] if name not in agent_tools]
+        if not selected:
+            return {
+                "status": "ERROR",
+                "error": {"message": f"No known specialists requested. Expected any of: {sorted(agent_tools)}"},
+            }
+
+        async def _run(name: str) -> Dict[str, Any]:
+            started = time.perf_counter()
+            args = {"request": research_request if name == "research" and research_request else request}
+            try:
+                output = await agent_tools[name].run_async(args=args, tool_context=tool_context)
+                return {
+                    "status": "SUCCESS",
+                    "result": _parse_agent_output(output),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                }
+            except Exception as e:
+                logger.error(f"Specialist {name} failed: {e}", exc_info=True)
+                return {
+                    "status": "ERROR",
+                    "error": {"message": str(e)},
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                }
+
+        # The specialist runs inherit the session state, so the opt-out applies to this call only
+        previous_bypass = tool_context.state.get(BYPASS_STATE_KEY, False)
+        if not use_cache:
+            tool_context.state[BYPASS_STATE_KEY] = True
+        try:
+            outputs = await asyncio.gather(*(_run(name) for name in selected))
+        finally:
+            if not use_cache:
+                tool_context.state[BYPASS_STATE_KEY] = previous_bypass
+        results = dict(zip(selected, outputs))
+        warnings = [f"Unknown specialist ignored: {name}" for name in unknown]
+        warnings += [f"{name} failed: {out['error']['message']}" for name, out in results.items() if out["status"] == "ERROR"]
+        return {
+            "status": "SUCCESS" if any(out["status"] == "SUCCESS" for out in outputs) else "ERROR",
+            "results": results,
+            "warnings": warnings,
+        }
+
+    return run_specialists
@@ -0,0 +1,380 @@
+import bisect
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Environment Config
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+# Finished spans are appended here as one JSON object per line; opt-in (empty disables
+# the export, e.g. TRACE_EXPORT_PATH=.traces/spans.jsonl)
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "").strip()
+# The file is rotated to <path>.1 (replacing the previous one) once it reaches this size
+TRACE_EXPORT_MAX_BYTES = int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+
+# --- Metrics ---------------------------------------------------------------
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process histograms and counters, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def observe(self, metric: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, help: str = "", **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            if key not in series:
+                series[key] = _Histogram(buckets)
+            series[key].observe(value)
+            if help:
+                self._help.setdefault(metric, help)
+
+    def inc(self, metric: str, value: float = 1, help: str = "", **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+            if help:
+                self._help.setdefault(metric, help)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        def fmt(labels: Tuple, extra: Tuple = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+            return "{" + ",".join(escaped) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{fmt(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {hist.sum:g}")
+                    lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# --- Spans -----------------------------------------------------------------
+
+class _JsonlExporter:
+    """Appends spans to `path`, keeping at most `path` and one rotated `path`.1 of max_bytes each."""
+
+    def __init__(self, path: str, max_bytes: int = TRACE_EXPORT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        os.replace(self.path, self.path + ".1")
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        size = len(line.encode("utf-8"))
+        with self._lock:
+            try:
+                if self._file is not None and self.max_bytes > 0 and self._size + size > self.max_bytes:
+                    self._rotate()
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                    self._size = self._file.tell()
+                self._file.write(line)
+                self._size += size
+            except OSError as e:
+                logger.warning(f"Could not export span to {self.path}: {e}")
+
+
+_exporter = _JsonlExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+_current_span: ContextVar[Optional["Span"]] = ContextVar("tami4_current_span", default=None)
+
+
+class Span:
+    """A timed unit of work; children share the trace_id of the span current at creation."""
+
+    def __init__(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None, parent: Optional["Span"] = None):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "OK"
+        self.start_time = time.time()
+        self.duration_ms: Optional[float] = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+        return self
+
+    def end(self, status: Optional[str] = None) -> None:
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if status:
+            self.status = status
+        if _current_span.get() is self:
+            _current_span.set(self.parent)
+        metrics.observe(
+            "tami4_span_duration_seconds", self.duration_ms / 1000,
+            help="Duration of traced agent, model, tool, query and render spans.",
+            kind=self.kind, name=self.name, status=self.status,
+        )
+        if _exporter is not None:
+            _exporter.export(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan(Span):
+    def __init__(self):
+        self.attributes = {}
+        self.duration_ms = 0.0
+
+    def set(self, **attributes: Any) -> "Span":
+        return self
+
+    def end(self, status: Optional[str] = None) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, kind: str = "internal", **attributes: Any) -> Span:
+    """Starts a span under the current one and makes it current; finish with span.end()."""
+    if not TRACING_ENABLED:
+        return _NOOP
+    span = Span(name, kind, {k: v for k, v in attributes.items() if v is not None}, parent=_current_span.get())
+    _current_span.set(span)
+    return span
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+    s = start_span(name, kind, **attributes)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=f"{type(e).__name__}: {e}")
+        s.end("ERROR")
+        raise
+    s.end()
+
+
+# --- ADK callbacks ---------------------------------------------------------
+
+# Spans opened by a before_* callback and closed by the matching after_* callback.
+# Bounded so spans whose closing callback never runs do not accumulate.
+_open_spans = LRUCache(max_entries=4096, ttl_seconds=3600)
+_instrumented = set()
+
+
+def _agent_key(kind: str, callback_context: Any) -> Tuple:
+    return (kind, getattr(callback_context, "invocation_id", None), getattr(callback_context, "agent_name", None))
+
+
+def _tool_key(tool: Any, tool_context: Any) -> Tuple:
+    call_id = getattr(tool_context, "function_call_id", None) or getattr(tool, "name", None)
+    return ("tool", getattr(tool_context, "invocation_id", None), call_id)
+
+
+def _finish(key: Tuple, status: Optional[str] = None, **attributes: Any) -> None:
+    s = _open_spans.pop(key)
+    if s is not None:
+        s.set(**attributes)
+        s.end(status)
+
+
+def _start_agent(callback_context: Any) -> None:
+    key = _agent_key("agent", callback_context)
+    _open_spans.set(key, start_span(f"agent.{key[2]}", "agent", agent=key[2], invocation_id=key[1]))
+
+
+def _start_model(callback_context: Any, llm_request: Any) -> None:
+    key = _agent_key("model", callback_context)
+    contents = getattr(llm_request, "contents", None) or []
+    _open_spans.set(key, start_span(
+        "llm.generate", "model", agent=key[2], model=getattr(llm_request, "model", None), contents=len(contents),
+    ))
+
+
+def _start_tool(tool: Any, args: Dict[str, Any], tool_context: Any) -> None:
+    name = getattr(tool, "name", "tool")
+    _open_spans.set(_tool_key(tool, tool_context), start_span(
+        f"tool.{name}", "tool", tool=name, agent=getattr(tool_context, "agent_name", None),
+    ))
+
+
+def _after_agent(callback_context: Any) -> None:
+    _finish(_agent_key("agent", callback_context))
+    return None
+
+
+def _after_model(callback_context: Any, llm_response: Any) -> None:
+    if getattr(llm_response, "partial", False):
+        return None
+    key = _agent_key("model", callback_context)
+    attrs: Dict[str, Any] = {}
+    usage = getattr(llm_response, "usage_metadata", None)
+    if usage is not None:
+        tokens = {
+            "prompt": getattr(usage, "prompt_token_count", None),
+            "output": getattr(usage, "candidates_token_count", None),
+            "cached": getattr(usage, "cached_content_token_count", None),
+            "total": getattr(usage, "total_token_count", None),
+        }
+        for kind, count in tokens.items():
+            if count:
+                attrs[f"{kind}_tokens"] = count
+                metrics.inc("tami4_llm_tokens_total", count, help="LLM tokens by agent and kind.", agent=key[2], type=kind)
+    error = getattr(llm_response, "error_code", None)
+    _finish(key, "ERROR" if error else None, error_code=error, **attrs)
+    return None
+
+
+def _after_tool(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> None:
+    attrs: Dict[str, Any] = {}
+    status = None
+    if isinstance(tool_response, dict):
+        attrs["response_bytes"] = len(json.dumps(tool_response, ensure_ascii=False, default=str))
+        attrs["cache_hit"] = tool_response.get("cache_hit")
+        if isinstance(tool_response.get("rows"), list):
+            attrs["rows"] = len(tool_response["rows"])
+        if tool_response.get("status") == "ERROR":
+            status = "ERROR"
+    _finish(_tool_key(tool, tool_context), status, **attrs)
+    return None
+
+
+async def _call(callback: Callable, **kwargs: Any) -> Any:
+    result = callback(**kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _as_list(callbacks: Any) -> List[Callable]:
+    if callbacks is None:
+        return []
+    return list(callbacks) if isinstance(callbacks, (list, tuple)) else [callbacks]
+
+
+def _traced_before(start: Callable, finish: Optional[Callable], callbacks: List[Callable]) -> Callable:
+    """
+    Opens the span, then runs the agent's own before_* callbacks (first non-None wins).
+    When one short-circuits and ADK will not call the matching after_* callback,
+    `finish` closes the span here.
+    """
+    async def before(**kwargs: Any) -> Any:
+        start(**kwargs)
+        for callback in callbacks:
+            result = await _call(callback, **kwargs)
+            if result is not None:
+                if finish is not None:
+                    finish(kwargs, result)
+                return result
+        return None
+
+    return before
+
+
+def instrument_agent(agent: Any) -> Any:
+    """
+    Adds agent, model and tool spans to an LlmAgent, keeping its existing callbacks.
+    Returns the agent so it can wrap a constructor call.
+    """
+    if not TRACING_ENABLED or id(agent) in _instrumented:
+        return agent
+    _instrumented.add(id(agent))
+
+    agent.before_agent_callback = _traced_before(
+        _start_agent,
+        lambda kw, result: _finish(_agent_key("agent", kw["callback_context"]), short_circuit=True),
+        _as_list(agent.before_agent_callback),
+    )
+    agent.after_agent_callback = [_after_agent] + _as_list(agent.after_agent_callback)
+
+    agent.before_model_callback = _traced_before(
+        _start_model,
+        lambda kw, result: _finish(_agent_key("model", kw["callback_context"]), short_circuit=True),
+        _as_list(agent.before_model_callback),
+    )
+    agent.after_model_callback = [_after_model] + _as_list(agent.after_model_callback)
+
+    # ADK still runs after_tool callbacks when a before_tool callback answers the call
+    agent.before_tool_callback = _traced_before(_start_tool, None, _as_list(agent.before_tool_callback))
+    agent.after_tool_callback = [_after_tool] + _as_list(agent.after_tool_callback)
+    return agent
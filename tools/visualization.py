@@ -1,21 +1,141 @@
+import asyncio
+import hashlib
 import io
+import json
 import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from google.genai import types
 from google.adk.tools.tool_context import ToolContext
 
+from .cache import LRUCache
+from .lazy import lazy_import
+from .datasets import resolve_payload
+from .downsample import marker_for, reduce_lines, sample_points, top_n
+from .payload import decode_columnar, is_columnar
+from .tracing import SIZE_BUCKETS, metrics, span
+
+# Plotting libraries are imported on first use to keep them out of the cold start.
+pd = lazy_import("pandas")
+matplotlib = lazy_import("matplotlib", setup=lambda m: m.use("Agg"))
+sns = lazy_import("seaborn")
+
 logger = logging.getLogger(__name__)
 
-def _payload_to_df(data_payload: Dict[str, Any]) -> pd.DataFrame:
+# Rendering backend: "thread" (default), "process", or "inline" (on the event loop).
+PLOT_EXECUTOR = os.getenv("PLOT_EXECUTOR", "thread").strip().lower()
+PLOT_MAX_WORKERS = int(os.getenv("PLOT_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[Executor] = None
+
+def _get_executor() -> Optional[Executor]:
+    """Lazily creates the shared rendering pool (None means render inline)."""
+    global _executor
+    if PLOT_EXECUTOR == "inline":
+        return None
+    if _executor is None:
+        if PLOT_EXECUTOR == "process":
+            # Forking a process that runs threads (event loop, refreshers, gRPC) can deadlock
+            _executor = ProcessPoolExecutor(
+                max_workers=PLOT_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PLOT_MAX_WORKERS, thread_name_prefix="plot")
+    return _executor
+
+async def _render(fn, *args) -> bytes:
+    """Runs a figure renderer off the event loop so other sessions keep being served."""
+    executor = _get_executor()
+    with span("plot.render", "render", renderer=fn.__name__, executor=PLOT_EXECUTOR) as s:
+        if executor is None:
+            png_bytes = fn(*args)
+        else:
+            png_bytes = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        s.set(png_bytes=len(png_bytes))
+    return png_bytes
+
+# Everything that affects the rendered bytes besides the data and the spec.
+FIGSIZE = (10, 6)
+DPI = 160
+RENDER_SETTINGS = {"figsize": FIGSIZE, "dpi": DPI, "format": "png"}
+
+# Content-addressed cache of rendered charts: hash(data, spec, settings) -> PNG bytes,
+# plus the artifact reference already saved for that hash under each session and filename.
+PLOT_CACHE_MAX_ENTRIES = int(os.getenv("PLOT_CACHE_MAX_ENTRIES", "256"))
+PLOT_CACHE_MAX_BYTES = int(os.getenv("PLOT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+_png_cache = LRUCache(max_entries=PLOT_CACHE_MAX_ENTRIES, max_bytes=PLOT_CACHE_MAX_BYTES)
+_artifact_refs = LRUCache(max_entries=PLOT_CACHE_MAX_ENTRIES * 4)
+
+def _content_hash(df: "pd.DataFrame", fn, *args) -> str:
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    h.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    settings = dict(RENDER_SETTINGS, matplotlib=matplotlib.__version__)
+    h.update(json.dumps([fn.__name__, args, settings], sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def _session_key(tool_context: ToolContext) -> Optional[tuple]:
+    """(app, user, session) the artifact lives in; None if the context does not expose it."""
+    ctx = getattr(tool_context, "_invocation_context", None)
+    session = getattr(ctx, "session", None)
+    if session is None:
+        return None
+    return (getattr(ctx, "app_name", None), getattr(ctx, "user_id", None), getattr(session, "id", None))
+
+async def _is_latest(tool_context: ToolContext, session_key: tuple, ref: Dict[str, Any]) -> bool:
+    """Whether `ref` is still the newest stored version of its filename."""
+    service = getattr(getattr(tool_context, "_invocation_context", None), "artifact_service", None)
+    if service is None:
+        return False
+    app_name, user_id, session_id = session_key
+    try:
+        versions = await service.list_versions(
+            app_name=app_name, user_id=user_id, filename=ref["filename"], session_id=session_id
+        )
+    except Exception as e:
+        logger.info("Could not list versions of %s: %s", ref["filename"], e)
+        return False
+    return bool(versions) and max(versions) == ref["version"]
+
+async def _render_artifact(tool_context: ToolContext, filename: str, title: str, fn, df: "pd.DataFrame", *args) -> Dict[str, Any]:
+    """
+    Renders and saves one chart, reusing identical earlier work: a known artifact in the
+    same session that is still the latest version of its filename skips both rendering
+    and saving; a known PNG skips rendering.
+    """
+    digest = _content_hash(df, fn, *args)
+    session_key = _session_key(tool_context)
+    ref_key = (session_key, filename, digest)
+    if session_key is not None:
+        ref = _artifact_refs.get(ref_key)
+        if ref is not None and await _is_latest(tool_context, session_key, ref):
+            return dict(ref, cached=True)
+
+    png_bytes = _png_cache.get(digest)
+    if png_bytes is None:
+        png_bytes = await _render(fn, df, *args)
+        _png_cache.set(digest, png_bytes)
+
+    ref = await _save_png(tool_context, filename, title, png_bytes)
+    if session_key is not None:
+        _artifact_refs.set(ref_key, ref)
+    return ref
+
+def _payload_to_df(data_payload: Dict[str, Any]) -> "pd.DataFrame":
     """
-    Converts a flexible data payload (dict-rows or list-rows) into a pandas DataFrame.
+    Converts a flexible data payload (columnar, dict-rows or list-rows) into a pandas DataFrame.
     """
-    # 1. Try "data" key wrapper first
-    data = data_payload.get("data", data_payload)
+    # 1. Try "data" key wrapper first (a bare columnar payload has its own "data" member)
+    data = data_payload if is_columnar(data_payload) else data_payload.get("data", data_payload)
+
+    # Case 0: Columnar payload (column arrays, dictionary-encoded strings)
+    if is_columnar(data):
+        cols, arrays = decode_columnar(data)
+        return pd.DataFrame(arrays, columns=cols)
     
     cols = data.get("columns") or []
     
@@ -39,35 +159,289 @@ def _payload_to_df(data_payload: Dict[str, Any]) -> pd.DataFrame:
     return pd.DataFrame(rows, columns=cols)
 
 
-def _fig_to_png_bytes(fig: plt.Figure) -> bytes:
+# Name parts of date/time columns: `date`, `event_day`, `week_start`, `created_at`, ... but
+# not `days_active` or `update_count`
+_TEMPORAL_NAME_RE = re.compile(r"(?:^|_)(?:date|day|week|month|time|timestamp|datetime|dt|ts|at)(?:_|$)|date$")
+
+
+def _looks_temporal(col: str) -> bool:
+    return bool(_TEMPORAL_NAME_RE.search(re.sub(r"\W+", "_", str(col).lower())))
+
+
+def _is_text(values: "pd.Series") -> bool:
+    return pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+
+
+def _prepare_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    One-time dtype inference shared by every plot spec in a call: numeric strings become
+    numbers, and text columns with a date-like name are parsed to datetimes (sorted).
+    Numeric columns are never read as dates, whatever their name.
+    """
+    df = df.copy()
+    time_cols = []
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            time_cols.append(col)
+            continue
+        if not _is_text(df[col]):
+            continue
+        converted = pd.to_numeric(df[col], errors="coerce")
+        if converted.notna().sum() == df[col].notna().sum():
+            df[col] = converted
+        elif _looks_temporal(col):
+            try:
+                df[col] = pd.to_datetime(df[col])
+                time_cols.append(col)
+            except Exception:
+                pass  # Keep as is if not convertible
+    if time_cols:
+        df = df.sort_values(time_cols[0], kind="stable").reset_index(drop=True)
+    return df
+
+
+def _resolve_spec(df: "pd.DataFrame", spec: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Validates a plot spec against the frame and fills in defaults."""
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    time_cols = df.select_dtypes(include=["datetime", "datetimetz"]).columns.tolist()
+
+    y = spec.get("y") or spec.get("metrics") or []
+    y_cols = [c for c in ([y] if isinstance(y, str) else y) if c in numeric_cols]
+    if not y_cols:
+        if not numeric_cols:
+            raise ValueError("No numeric columns found to plot.")
+        y_cols = numeric_cols[:1]
+
+    x_col = spec.get("x")
+    if not x_col or x_col not in df.columns:
+        x_col = time_cols[0] if time_cols else df.columns[0]
+
+    chart_type = (spec.get("chart_type") or spec.get("type") or "").lower()
+    if chart_type not in ("line", "bar", "scatter"):
+        chart_type = "line" if x_col in time_cols else "bar"
+
+    group_by = spec.get("group_by") or spec.get("hue")
+    if group_by not in df.columns or group_by in (x_col, *y_cols):
+        group_by = None
+
+    title = spec.get("title") or f"{', '.join(y_cols)} by {x_col}"
+    slug = "".join(ch if ch.isalnum() else "_" for ch in title.lower()).strip("_")[:40] or chart_type
+    filename = spec.get("filename") or f"plot_{index + 1}_{slug}.png"
+    if not filename.endswith(".png"):
+        filename += ".png"
+
+    return {
+        "chart_type": chart_type,
+        "x": x_col,
+        "y": y_cols,
+        "group_by": group_by,
+        "title": title,
+        "filename": filename,
+    }
+
+
+def _new_figure() -> "matplotlib.figure.Figure":
+    """Creates a pyplot-free figure (the Agg backend is selected on first matplotlib use)."""
+    matplotlib.__version__  # trigger the lazy import and backend setup
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=FIGSIZE)
+
+
+def warm_up() -> None:
+    """Imports the plotting stack and primes font caches by rendering a tiny chart."""
+    df = pd.DataFrame({"x": [0, 1], "y": [0.0, 1.0]})
+    _render_spec_png(df, {"chart_type": "line", "x": "x", "y": ["y"], "group_by": None, "title": "warm-up"})
+
+
+def _fig_to_png_bytes(fig: "matplotlib.figure.Figure") -> bytes:
     """Converts a Matplotlib figure to PNG bytes."""
     buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", dpi=160)
-    plt.close(fig)
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=DPI)
     return buf.getvalue()
 
 
+# Renderers use the object-oriented Figure API (no pyplot global state), so they are
+# safe to run concurrently in threads and picklable for a process pool.
+def _render_trend_png(df: "pd.DataFrame", x_col: str, y_cols: List[str]) -> bytes:
+    fig = _new_figure()
+    ax = fig.subplots()
+    marker = marker_for(df)
+    for y_c in y_cols:
+        sns.lineplot(data=df, x=x_col, y=y_c, label=y_c, ax=ax, marker=marker, errorbar=None)
+
+    ax.set_title(f"Trends over time ({', '.join(y_cols)})")
+    ax.set_xlabel(x_col)
+    ax.set_ylabel("Value")
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    return _fig_to_png_bytes(fig)
+
+
+def _render_bar_png(top_df: "pd.DataFrame", cat_col: str, y_cols: List[str]) -> bytes:
+    fig = _new_figure()
+    ax = fig.subplots()
+    top_df.plot(kind="bar", x=cat_col, y=y_cols, ax=ax)
+    ax.set_title(f"Comparison by {cat_col}")
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment("right")
+    fig.tight_layout()
+    return _fig_to_png_bytes(fig)
+
+
+def _reduce(df: "pd.DataFrame", spec: Dict[str, Any]) -> "pd.DataFrame":
+    """The frame a resolved spec is drawn from, bounded in size whatever the payload (tools/downsample.py)."""
+    if spec["chart_type"] == "line":
+        return reduce_lines(df, spec["x"], spec["y"], spec["group_by"])
+    if spec["chart_type"] == "bar":
+        return top_n(df, spec["x"], spec["y"], spec["group_by"])
+    return sample_points(df)
+
+
+def _render_spec_png(df: "pd.DataFrame", spec: Dict[str, Any]) -> bytes:
+    """Renders one resolved plot spec (line / bar / scatter) from its reduced frame."""
+    x_col, y_cols, group_by = spec["x"], spec["y"], spec["group_by"]
+    fig = _new_figure()
+    ax = fig.subplots()
+
+    if spec["chart_type"] == "line":
+        marker = marker_for(df, group_by)
+        if group_by:
+            long_df = df.melt(id_vars=[x_col, group_by], value_vars=y_cols, var_name="metric")
+            sns.lineplot(
+                data=long_df, x=x_col, y="value", hue=group_by,
+                style="metric" if len(y_cols) > 1 else None, ax=ax, marker=marker, errorbar=None,
+            )
+        else:
+            for y_c in y_cols:
+                sns.lineplot(data=df, x=x_col, y=y_c, label=y_c, ax=ax, marker=marker, errorbar=None)
+        ax.set_ylabel(y_cols[0] if len(y_cols) == 1 else "Value")
+    elif spec["chart_type"] == "scatter":
+        sns.scatterplot(data=df, x=x_col, y=y_cols[0], hue=group_by, ax=ax)
+    else:
+        # Keeps the reduced frame's order (largest first, "Other" last)
+        if group_by:
+            agg = df.groupby([x_col, group_by], sort=False)[y_cols[0]].sum().unstack(group_by)
+        else:
+            agg = df.groupby(x_col, sort=False)[y_cols].sum()
+        if isinstance(agg.index, pd.DatetimeIndex):
+            agg.index = agg.index.strftime("%Y-%m-%d")
+        agg.plot(kind="bar", ax=ax)
+        ax.set_ylabel(y_cols[0] if len(y_cols) == 1 or group_by else "Value")
+
+    ax.set_title(spec["title"])
+    ax.set_xlabel(x_col)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment("right")
+    fig.tight_layout()
+    return _fig_to_png_bytes(fig)
+
+
+async def _save_png(tool_context: ToolContext, filename: str, title: str, png_bytes: bytes) -> Dict[str, Any]:
+    artifact_part = types.Part(
+        inline_data=types.Blob(data=png_bytes, mime_type="image/png")
+    )
+    with span("artifact.save", "artifact", filename=filename, bytes=len(png_bytes)):
+        version = await tool_context.save_artifact(filename=filename, artifact=artifact_part)
+    metrics.observe("tami4_artifact_bytes", len(png_bytes), SIZE_BUCKETS, help="Size of saved artifacts.", mime_type="image/png")
+    return {
+        "filename": filename,
+        "title": title,
+        "mime_type": "image/png",
+        "version": version
+    }
+
+
+def _fatigue_source(df: "pd.DataFrame") -> Optional["pd.DataFrame"]:
+    """Top fatigue scores as a (creative, fatigue_score) frame for a bar chart."""
+    from ..sub_agents.creative.fatigue import fatigue_frame
+
+    scores = fatigue_frame(df)
+    if scores is None:
+        return None
+    scores = scores.dropna(subset=["fatigue_score"]).head(15)
+    return scores[[scores.columns[0], "fatigue_score"]]
+
+
+async def _plot_specs(df: "pd.DataFrame", plots: List[Dict[str, Any]], tool_context: ToolContext) -> Dict[str, Any]:
+    """Batch path: one prepared DataFrame, one artifact per spec, rendered concurrently."""
+    df = _prepare_frame(df)
+    warnings = []
+    resolved = []
+    fatigue_df = None
+    for i, spec in enumerate(plots):
+        source = df
+        if (spec or {}).get("chart_type") == "fatigue":
+            if fatigue_df is None:
+                # Scoring every creative's daily series is CPU-bound: keep it off the event loop
+                fatigue_df = await asyncio.to_thread(_fatigue_source, df)
+            if fatigue_df is None:
+                warnings.append(f"Plot {i + 1} skipped: fatigue needs a daily series with a creative id, impressions and clicks.")
+                continue
+            source = fatigue_df
+            spec = dict(spec, chart_type="bar", x=fatigue_df.columns[0], y=["fatigue_score"], group_by=None)
+            spec.setdefault("title", "Creative fatigue score (top 15)")
+        try:
+            r = _resolve_spec(source, spec or {}, i)
+        except ValueError as e:
+            warnings.append(f"Plot {i + 1} skipped: {e}")
+            continue
+        # Ship only the columns this spec needs to the renderer
+        cols = list(dict.fromkeys([r["x"], *r["y"], *([r["group_by"]] if r["group_by"] else [])]))
+        resolved.append((r, _reduce(source[cols], r)))
+
+    refs = await asyncio.gather(
+        *(_render_artifact(tool_context, r["filename"], r["title"], _render_spec_png, sub_df, r) for r, sub_df in resolved),
+        return_exceptions=True,
+    )
+
+    artifacts = []
+    for (r, _), ref in zip(resolved, refs):
+        if isinstance(ref, Exception):
+            warnings.append(f"Plot '{r['title']}' failed: {ref}")
+            continue
+        artifacts.append(ref)
+
+    if not artifacts:
+        return {"status": "ERROR", "error": {"message": "No plots could be rendered."}, "warnings": warnings}
+    return {"status": "SUCCESS", "artifacts": artifacts, "warnings": warnings}
+
+
 async def plot_and_save_artifacts(
-    plotting_handoff: Dict[str, Any],
     data_payload: Dict[str, Any],
     tool_context: ToolContext,
+    plots: Optional[List[Dict[str, Any]]] = None,
+    plotting_handoff: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Generates plots based on data and saves them as artifacts in the session.
     
     Args:
-        plotting_handoff: Instructions for plotting (preferred metrics, x-axis, etc.).
-        data_payload: The actual data to plot.
+        data_payload: The actual data to plot (inline data or an artifact_ref/v1 handle).
         tool_context: ADK context for saving artifacts.
+        plots: List of plot specs, one artifact per spec. Each spec has:
+            chart_type ("line" | "bar" | "scatter"), x (column), y (column or list of columns),
+            group_by (optional column), title (English), filename (optional).
+        plotting_handoff: Legacy instructions (preferred metrics, x-axis, etc.), used when
+            `plots` is not given to produce a trend chart and a bar comparison.
         
     Returns:
         A dictionary containing the status and a list of generated artifact references.
     """
     try:
+        # Large results arrive as an artifact handle; load the rows from the session
+        data_payload = await resolve_payload(data_payload, tool_context)
         df = _payload_to_df(data_payload)
         if df.empty:
             return {"status": "ERROR", "error": {"message": "Empty DataFrame, cannot plot."}}
 
+        if plots:
+            return await _plot_specs(df, plots, tool_context)
+
+        plotting_handoff = plotting_handoff or {}
+
         # Basic configurations
         metrics = plotting_handoff.get("preferred_metrics", [])
         x_col = plotting_handoff.get("preferred_time_column")
@@ -91,6 +465,9 @@ async def plot_and_save_artifacts(
         warnings = []
 
         # --- Plot Generation Logic ---
+        # Both figures are rendered concurrently off the event loop (or reused from
+        # the chart cache); only the artifact saves are awaited here.
+        renders = []
         # 1. Time Series Plot (if x_col looks like time)
         if "date" in x_col.lower() or "day" in x_col.lower():
             try:
@@ -99,63 +476,21 @@ async def plot_and_save_artifacts(
             except Exception:
                 pass  # Keep as is if not convertible
 
-            fig, ax = plt.subplots(figsize=(10, 6))
-            for y_c in y_cols:
-                sns.lineplot(data=df, x=x_col, y=y_c, label=y_c, ax=ax, marker="o")
-            
-            ax.set_title(f"Trends over time ({', '.join(y_cols)})")
-            ax.set_xlabel(x_col)
-            ax.set_ylabel("Value")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-
-            # Save Artifact
-            filename = "trend_plot.png"
-            png_bytes = _fig_to_png_bytes(fig)
-            
-            artifact_part = types.Part(
-                inline_data=types.Blob(data=png_bytes, mime_type="image/png")
-            )
-            version = await tool_context.save_artifact(filename=filename, artifact=artifact_part)
-            
-            artifacts.append({
-                "filename": filename,
-                "title": "Trend Analysis",
-                "mime_type": "image/png",
-                "version": version
-            })
+            trend_df = reduce_lines(df, x_col, y_cols)
+            renders.append(_render_artifact(tool_context, "trend_plot.png", "Trend Analysis", _render_trend_png, trend_df, x_col, y_cols))
 
         # 2. Bar Chart (Comparison)
-        fig, ax = plt.subplots(figsize=(10, 6))
         # Determine a categorical column for grouping if possible
         cat_cols = df.select_dtypes(include=["object", "string", "category"]).columns.tolist()
         cat_col = cat_cols[0] if cat_cols else x_col
 
-        # If too many categories, take top 10
-        if df[cat_col].nunique() > 15:
-            top_df = df.head(15)
-        else:
-            top_df = df
+        # Totals per category; past the top 15 (by the first metric) they are summed into "Other"
+        top_df = top_n(df, cat_col, y_cols)
+        bar_cols = [c for c in top_df.columns if c != cat_col]
 
-        top_df.plot(kind="bar", x=cat_col, y=y_cols, ax=ax)
-        ax.set_title(f"Comparison by {cat_col}")
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        renders.append(_render_artifact(tool_context, "bar_comparison.png", "Metric Comparison", _render_bar_png, top_df, cat_col, bar_cols))
 
-        filename = "bar_comparison.png"
-        png_bytes = _fig_to_png_bytes(fig)
-        
-        artifact_part = types.Part(
-            inline_data=types.Blob(data=png_bytes, mime_type="image/png")
-        )
-        version = await tool_context.save_artifact(filename=filename, artifact=artifact_part)
-        
-        artifacts.append({
-            "filename": filename,
-            "title": "Metric Comparison",
-            "mime_type": "image/png",
-            "version": version
-        })
+        artifacts.extend(await asyncio.gather(*renders))
 
         return {
             "status": "SUCCESS",
@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from .sub_agents.data import catalog
+from .sub_agents.data.agent import agent as data_agent
+from .sub_agents.data.rollups import start_refresh_thread
+from .sub_agents.data.tools import get_bigquery_client
+from .tools import visualization
+
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv("PREWARM", "true").strip().lower() not in ("0", "false", "no")
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def _steps() -> List[Tuple[str, Callable[[], object]]]:
+    steps = [("plotting", visualization.warm_up)]
+    for toolset in data_agent.tools:
+        if hasattr(toolset, "warm_up"):
+            steps.append(("bigquery_toolset", toolset.warm_up))
+    steps.append(("bigquery_client", get_bigquery_client))
+    return steps
+
+
+def prewarm() -> Dict[str, float]:
+    """
+    Initializes everything that is otherwise constructed on first use (plotting stack,
+    credentials, BigQuery toolset and client). Returns seconds spent per step.
+    """
+    timings = {}
+    for name, step in _steps():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Prewarm step {name} failed (will retry on first use): {e}")
+        timings[name] = time.perf_counter() - started
+    logger.info(f"Prewarm finished: {timings}")
+    return timings
+
+
+def start_background_prewarm() -> None:
+    """
+    Runs prewarm() once per process in a daemon thread, so serving is never blocked,
+    and starts the periodic schema catalog snapshot and, when a store is configured,
+    the local rollup refresh.
+    """
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+    for name, start in (("rollup_refresh", start_refresh_thread), ("schema_catalog_refresh", catalog.start_refresh_thread)):
+        try:
+            start()
+        except Exception as e:
+            logger.warning(f"Could not start {name} (serving without it): {e}")
+    if PREWARM_ENABLED:
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()